@@ -0,0 +1,468 @@
+"""
+Benchmark de carga da API (vturb/api.py).
+
+Gera uma árvore sintética de `analytics` (milhares de pastas, alguns CSVs
+grandes), sobe `uvicorn vturb.api:app` sobre ela e dispara requisições contra
+`/`, `/list` e `/analytics/{video_name}` com concorrência controlada. Relata
+requisições por segundo, latência (p50/p90/p99), vazão e memória do servidor,
+além de micro-benchmarks do catálogo em processo. Com --baseline, compara o
+resultado com um benchmark anterior e aponta as regressões.
+
+Uso:
+    python benchmarks/api_benchmark.py --folders 10000 --concurrency 1,16,64 --name base
+    python benchmarks/api_benchmark.py --folders 10000 --concurrency 1,16,64 --baseline benchmarks/results/api-base.json
+"""
+import os
+import csv
+import sys
+import json
+import time
+import random
+import socket
+import hashlib
+import argparse
+import datetime
+import threading
+import subprocess
+import http.client
+from email.utils import formatdate
+from urllib.parse import quote
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from fake_vturb import CSV_HEADER
+from procmem import MemorySampler
+from vturb.catalog import Catalog, csv_entry, write_encoded_variants, manifest_path
+from vturb.tracing import percentile
+
+# Árvores geradas ficam em cache (uma por combinação de parâmetros) para não serem recriadas a cada execução
+DEFAULT_DATA_DIR = os.path.join(BENCHMARKS_DIR, "data")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+COMPLETE_MARKER = ".complete.json"
+
+# Regressão: vazão caiu ou p99 cresceu mais de 25% (e mais de 5 ms); memória de pico cresceu mais de 25% e 20 MB
+REGRESSION_RATIO = 1.25
+LATENCY_REGRESSION_MIN_MS = 5
+MEMORY_REGRESSION_MIN_MB = 20
+
+
+# Árvore sintética
+
+def folder_name(index):
+    return f"VSL IA {index:05d}"
+
+
+def is_large(index, large_every):
+    return bool(large_every) and index % large_every == 0
+
+
+def write_csv(path, rows, rng):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for row in range(1, rows + 1):
+            views = rng.randint(10, 50_000)
+            plays = rng.randint(0, views)
+            writer.writerow([
+                f"utm_content-{row:06d}", views, rng.randint(0, views), plays, rng.randint(0, plays),
+                f"{plays / views * 100:.1f}%".replace(".", ","), f"{rng.uniform(0, 100):.1f}%".replace(".", ","),
+                rng.randint(0, plays // 10 + 1), "01/01/2024 12:00:00",
+            ])
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def generate_tree(workdir, folders, rows, large_every, large_rows, seed, encoded):
+    """
+    Cria `workdir/analytics` com uma pasta e um CSV por vídeo, e liga `assets`
+    e `docs` do repositório (usados pela página de documentação em `/`).
+
+    Com `encoded`, grava também as variantes comprimidas e o manifesto, como o
+    extrator faz; sem ele, a API constrói o catálogo varrendo o diretório.
+    """
+    analytics_dir = os.path.join(workdir, "analytics")
+    os.makedirs(analytics_dir, exist_ok=True)
+    for linked in ("assets", "docs"):
+        link = os.path.join(workdir, linked)
+        if not os.path.lexists(link):
+            os.symlink(os.path.join(REPO_ROOT, linked), link)
+
+    manifest = {}
+    for index in range(folders):
+        name = folder_name(index)
+        folder = os.path.join(analytics_dir, name)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{name}-utm_content.csv")
+        row_count = large_rows if is_large(index, large_every) else rows
+        write_csv(path, row_count, random.Random(f"{seed}:{index}"))
+        if encoded:
+            sha256 = _file_sha256(path)
+            entry = csv_entry(name, path, sha256, rows=row_count)
+            entry["encodings"] = write_encoded_variants(analytics_dir, path, sha256)
+            manifest[name] = entry
+
+    if encoded:
+        # Manifesto gravado de uma vez (record_csv o regravaria inteiro a cada vídeo)
+        os.makedirs(os.path.dirname(manifest_path(analytics_dir)), exist_ok=True)
+        with open(manifest_path(analytics_dir), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+    return analytics_dir
+
+
+def prepare_tree(args):
+    """Diretório de trabalho com a árvore sintética, reaproveitado se já foi gerado com os mesmos parâmetros"""
+    params = {
+        "folders": args.folders, "rows": args.rows, "large_every": args.large_every,
+        "large_rows": args.large_rows, "seed": args.seed, "encoded": args.encoded,
+    }
+    key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+    workdir = os.path.abspath(os.path.join(args.data_dir, f"api-{args.folders}-{key}"))
+    marker = os.path.join(workdir, COMPLETE_MARKER)
+    if os.path.exists(marker) and not args.regenerate:
+        print(f"Reaproveitando a árvore sintética em {workdir}")
+        return workdir, params
+
+    print(f"Gerando a árvore sintética em {workdir} ({args.folders} pastas)...")
+    started = time.perf_counter()
+    generate_tree(workdir, args.folders, args.rows, args.large_every, args.large_rows, args.seed, args.encoded)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    print(f"Árvore gerada em {time.perf_counter() - started:.1f}s")
+    return workdir, params
+
+
+# Servidor
+
+def free_port(host):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class ApiServer:
+    """`uvicorn vturb.api:app` em um processo separado, com o diretório de trabalho na árvore sintética"""
+    def __init__(self, workdir, workers=1, host="127.0.0.1"):
+        self.workdir = workdir
+        self.workers = workers
+        self.host = host
+        self.port = free_port(host)
+        self.process = None
+        self.log_file = None
+
+    def start(self, timeout=120):
+        """
+        Inicia o servidor e aguarda a primeira resposta de /list.
+
+        Returns:
+            float: Tempo até a primeira resposta (inclui a construção do catálogo)
+        """
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+        self.log_file = open(os.path.join(self.workdir, "uvicorn.log"), "w", encoding="utf-8")
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "vturb.api:app",
+                "--host", self.host, "--port", str(self.port),
+                "--workers", str(self.workers), "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=self.workdir, env=env, stdout=self.log_file, stderr=subprocess.STDOUT,
+        )
+        while time.perf_counter() - started < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"O servidor encerrou na inicialização; veja {self.log_file.name}")
+            try:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+                connection.request("GET", "/list")
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"O servidor não respondeu em {timeout}s")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log_file:
+            self.log_file.close()
+
+
+# Cenários de carga: cada um sorteia o caminho e os cabeçalhos da próxima requisição
+
+def _analytics_path(name):
+    return f"/analytics/{quote(name)}"
+
+
+SCENARIOS = {
+    "root": lambda rng, names, large: ("/", {"Accept-Encoding": "gzip"}),
+    "list": lambda rng, names, large: ("/list", {}),
+    "list_page": lambda rng, names, large: (f"/list?limit=100&metadata=true&prefix={quote(rng.choice(names)[:-2])}", {}),
+    "analytics": lambda rng, names, large: (_analytics_path(rng.choice(names)), {}),
+    "analytics_gzip": lambda rng, names, large: (_analytics_path(rng.choice(names)), {"Accept-Encoding": "gzip"}),
+    "analytics_conditional": lambda rng, names, large: (
+        _analytics_path(rng.choice(names)), {"If-Modified-Since": formatdate(time.time(), usegmt=True)}
+    ),
+    "analytics_large": lambda rng, names, large: (_analytics_path(rng.choice(large or names)), {}),
+    "analytics_range": lambda rng, names, large: (_analytics_path(rng.choice(large or names)), {"Range": "bytes=0-65535"}),
+}
+DEFAULT_SCENARIOS = ("root", "list", "list_page", "analytics", "analytics_gzip", "analytics_conditional", "analytics_large")
+
+
+def _load_worker(host, port, scenario, names, large, seed, warmup_until, deadline, results):
+    rng = random.Random(seed)
+    latencies, statuses, errors, transferred = [], {}, 0, 0
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        path, headers = SCENARIOS[scenario](rng, names, large)
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=60)
+            status, body = None, b""
+        elapsed = time.perf_counter() - started
+        if started < warmup_until:
+            continue
+        latencies.append(elapsed)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status is None or status >= 500:
+            errors += 1
+        transferred += len(body)
+    connection.close()
+    results.append((latencies, statuses, errors, transferred))
+
+
+def run_scenario(server, scenario, concurrency, duration, warmup, names, large, seed):
+    """
+    Mantém `concurrency` conexões persistentes disparando requisições do
+    cenário durante `duration` segundos (após `warmup` segundos descartados).
+    """
+    sampler = MemorySampler(root_pid=server.process.pid, include_root=True, interval=0.25).start()
+    warmup_until = time.perf_counter() + warmup
+    deadline = warmup_until + duration
+    results, threads = [], []
+    for worker in range(concurrency):
+        thread = threading.Thread(
+            target=_load_worker, name=f"load-{worker}",
+            args=(server.host, server.port, scenario, names, large, f"{seed}:{scenario}:{worker}", warmup_until, deadline, results),
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    sampler.stop()
+
+    latencies = sorted(value for result in results for value in result[0])
+    statuses = {}
+    for result in results:
+        for status, count in result[1].items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    transferred = sum(result[3] for result in results)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(result[2] for result in results),
+        "statuses": statuses,
+        "rps": round(len(latencies) / duration, 1),
+        "mb_per_s": round(transferred / duration / 2**20, 2),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p90_ms": ms(percentile(latencies, 0.90)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "server_memory": sampler.summary(),
+    }
+
+
+# Micro-benchmarks do catálogo, em processo
+
+def _timeit(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {"runs": repeat, "mean_ms": round(sum(timings) / repeat * 1000, 4), "min_ms": round(min(timings) * 1000, 4)}
+
+
+def run_micro(analytics_dir, names, seed):
+    rng = random.Random(f"{seed}:micro")
+    results = {"catalog_scan": _timeit(lambda: Catalog(analytics_dir).refresh(force=True), 3)}
+    catalog = Catalog(analytics_dir)
+    catalog.refresh(force=True)
+    results["catalog_names"] = _timeit(catalog.names, 200)
+    results["catalog_get"] = _timeit(lambda: catalog.get(rng.choice(names)), 2000)
+    results["list_json"] = _timeit(lambda: json.dumps({"folders": catalog.names(), "count": len(catalog)}), 50)
+    return results
+
+
+# Comparação com a linha de base
+
+def compare_results(baseline, result):
+    """
+    Returns:
+        list: Descrição de cada regressão encontrada
+    """
+    regressions = []
+    previous = {f"{item['scenario']}@{item['concurrency']}": item for item in baseline.get("load", [])}
+    for item in result["load"]:
+        key = f"{item['scenario']}@{item['concurrency']}"
+        before = previous.get(key)
+        if not before:
+            continue
+        if before["rps"] and item["rps"] * REGRESSION_RATIO < before["rps"]:
+            regressions.append(f"{key}: {before['rps']} -> {item['rps']} req/s")
+        if (
+            before["p99_ms"] and item["p99_ms"]
+            and item["p99_ms"] > before["p99_ms"] * REGRESSION_RATIO
+            and item["p99_ms"] - before["p99_ms"] > LATENCY_REGRESSION_MIN_MS
+        ):
+            regressions.append(f"{key}: p99 {before['p99_ms']} ms -> {item['p99_ms']} ms")
+        before_mb, after_mb = before["server_memory"]["peak_mb"], item["server_memory"]["peak_mb"]
+        if before_mb and after_mb and after_mb > before_mb * REGRESSION_RATIO and after_mb - before_mb > MEMORY_REGRESSION_MIN_MB:
+            regressions.append(f"{key}: memória de pico {before_mb} MB -> {after_mb} MB")
+
+    for name, item in result.get("micro", {}).items():
+        before = baseline.get("micro", {}).get(name)
+        if before and item["min_ms"] > before["min_ms"] * REGRESSION_RATIO and item["min_ms"] - before["min_ms"] > 0.01:
+            regressions.append(f"micro {name}: {before['min_ms']} ms -> {item['min_ms']} ms")
+    return regressions
+
+
+def print_result(result, regressions):
+    print()
+    print(f"Inicialização do servidor (até a primeira resposta de /list): {result['startup_seconds']}s")
+    print()
+    print(f"{'cenário':<24} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'MB/s':>8} {'mem MB':>8} {'erros':>6}")
+    for item in result["load"]:
+        print(
+            f"{item['scenario']:<24} {item['concurrency']:>5} {item['rps']:>9} {item['p50_ms'] or '-':>9} "
+            f"{item['p90_ms'] or '-':>9} {item['p99_ms'] or '-':>9} {item['mb_per_s']:>8} "
+            f"{item['server_memory']['peak_mb'] or '-':>8} {item['errors']:>6}"
+        )
+    if result.get("micro"):
+        print()
+        print(f"{'micro-benchmark':<24} {'média ms':>10} {'mín ms':>10}")
+        for name, item in result["micro"].items():
+            print(f"{name:<24} {item['mean_ms']:>10} {item['min_ms']:>10}")
+    if regressions:
+        print()
+        print("REGRESSÕES:")
+        for regression in regressions:
+            print(f"  - {regression}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga da API de analytics")
+    parser.add_argument("--folders", type=int, default=10_000, help="Pastas (vídeos) da árvore sintética")
+    parser.add_argument("--rows", type=int, default=50, help="Linhas de cada CSV")
+    parser.add_argument("--large-every", type=int, default=1_000, help="Uma pasta a cada N recebe um CSV grande (0 desativa)")
+    parser.add_argument("--large-rows", type=int, default=100_000, help="Linhas dos CSVs grandes")
+    parser.add_argument("--encoded", action="store_true", help="Grava o manifesto e as variantes comprimidas, como o extrator")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Diretório das árvores sintéticas")
+    parser.add_argument("--regenerate", action="store_true", help="Gera a árvore novamente mesmo se já existir")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn")
+    parser.add_argument("--concurrency", default="1,16", help="Níveis de concorrência, separados por vírgula")
+    parser.add_argument("--duration", type=float, default=10, help="Duração de cada cenário, em segundos")
+    parser.add_argument("--warmup", type=float, default=1, help="Aquecimento descartado antes de cada cenário, em segundos")
+    parser.add_argument(
+        "--scenarios", default=",".join(DEFAULT_SCENARIOS),
+        help=f"Cenários separados por vírgula (disponíveis: {', '.join(SCENARIOS)})",
+    )
+    parser.add_argument("--skip-micro", action="store_true", help="Não executa os micro-benchmarks do catálogo")
+    parser.add_argument("--name", help="Nome do resultado (padrão: data e hora)")
+    parser.add_argument("--output", help="Arquivo JSON do resultado (padrão: benchmarks/results/api-<nome>.json)")
+    parser.add_argument("--baseline", help="Resultado anterior usado como linha de base")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Sai com código 1 se houver regressões")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Cenários desconhecidos: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    name = args.name or datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    output = os.path.abspath(args.output or os.path.join(DEFAULT_RESULTS_DIR, f"api-{name}.json"))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    workdir, params = prepare_tree(args)
+    names = [folder_name(index) for index in range(args.folders)]
+    large = [folder_name(index) for index in range(args.folders) if is_large(index, args.large_every)]
+
+    server = ApiServer(workdir, workers=args.workers)
+    load = []
+    try:
+        startup = server.start()
+        for scenario in scenarios:
+            for concurrency in levels:
+                print(f"Cenário {scenario} com concorrência {concurrency}...")
+                load.append(run_scenario(server, scenario, concurrency, args.duration, args.warmup, names, large, args.seed))
+    finally:
+        server.stop()
+
+    result = {
+        "name": name,
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "tree": params,
+        "server": {"workers": args.workers},
+        "duration": args.duration,
+        "startup_seconds": round(startup, 3),
+        "load": load,
+        "micro": {} if args.skip_micro else run_micro(os.path.join(workdir, "analytics"), names, args.seed),
+    }
+
+    regressions = []
+    if baseline:
+        regressions = compare_results(baseline, result)
+        result["baseline"] = baseline.get("name")
+        result["regressions"] = regressions
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print_result(result, regressions)
+    print()
+    print(f"Resultado salvo em: {output}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
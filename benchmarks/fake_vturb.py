@@ -0,0 +1,459 @@
+"""
+Site local que imita as páginas do VTurb usadas pelo bot (login, pastas,
+vídeo, analytics/tráfego e exportação do CSV), com a mesma estrutura de DOM
+que os XPaths de `vturb/app.py` procuram.
+
+Permite medir o bot sem acessar a plataforma real: latência, quantidade de
+pastas/vídeos/linhas e falhas injetadas são configuráveis, e os dados e as
+falhas são determinísticos para uma mesma semente.
+
+Uso avulso:
+    python benchmarks/fake_vturb.py --port 8765 --folders 3 --videos 5
+"""
+import csv
+import io
+import json
+import time
+import html
+import random
+import secrets
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote
+
+SESSION_COOKIE = "vturb_session"
+
+CSV_HEADER = [
+    "utm_content", "Visualizações", "Visualizações únicas", "Plays", "Plays únicos",
+    "Taxa de play", "Engajamento", "Conversões", "Atualizado em",
+]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>{title} - VTurb (local)</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 4px 8px; }}
+tr[data-id] {{ cursor: pointer; }}
+[hidden] {{ display: none; }}
+</style></head>
+<body>
+{body}
+</body>
+</html>"""
+
+LOGIN_BODY = """<h1>Entrar</h1>
+{error}
+<form id="login" method="post" action="/signin">
+  <input name="email" type="email" placeholder="E-mail">
+  <input name="password" type="password" placeholder="Senha">
+  <button type="button" onclick="document.getElementById('login').submit()">Entrar</button>
+</form>"""
+
+TRAFFIC_BODY = """<h1><span title="{title}">{title}</span></h1>
+<nav><a href="/videos/{video_id}/analytics">Analytics</a> / Tráfego</nav>
+{combobox}
+<div id="group-options" hidden>
+  <span onclick="selectGroup('utm_source')">utm_source</span>
+  <span onclick="selectGroup('utm_medium')">utm_medium</span>
+  <span onclick="selectGroup('utm_content')">utm_content</span>
+</div>
+<div id="traffic-table">Carregando...</div>
+<button id="download-menu" onclick="document.getElementById('formats').hidden = false"><strong>Baixar Métricas</strong></button>
+<div id="formats" hidden>
+  <button onclick="exportMetrics('csv')"><span>CSV</span></button>
+  <button onclick="exportMetrics('xlsx')"><span>XLSX</span></button>
+</div>
+<script>
+var group = 'utm_source';
+function loadTable() {{
+  return fetch('/api/videos/{video_id}/traffic?group=' + group)
+    .then(function (response) {{ return response.json(); }})
+    .then(function (data) {{
+      var rows = data.rows.map(function (row) {{
+        return '<tr><td>' + row.key + '</td><td>' + row.views + '</td><td>' + row.plays + '</td></tr>';
+      }});
+      document.getElementById('traffic-table').innerHTML =
+        '<table><tr><th>' + group + '</th><th>Visualizações</th><th>Plays</th></tr>' + rows.join('') + '</table>';
+    }});
+}}
+function selectGroup(value) {{
+  group = value;
+  document.getElementById('group-button').textContent = value;
+  document.getElementById('group-options').hidden = true;
+  loadTable();
+}}
+function exportMetrics(format) {{
+  document.getElementById('formats').hidden = true;
+  window.location.href = '/api/videos/{video_id}/export.' + format + '?group=' + group;
+}}
+loadTable();
+</script>"""
+
+
+class FakeSiteConfig:
+    """
+    Parâmetros do site local.
+
+    Args:
+        folders: Quantidade de pastas
+        videos_per_folder: Vídeos em cada pasta
+        rows: Linhas do CSV exportado de cada vídeo
+        latency: Atraso, em segundos, de cada página HTML
+        api_latency: Atraso das chamadas de dados (tabela de tráfego e exportação)
+        jitter: Variação máxima somada aos atrasos (determinística pela semente)
+        page_failure_rate: Fração das visitas à página de tráfego que chegam sem o
+            dropdown de UTM (página que "não carregou")
+        export_failure_rate: Fração das exportações que respondem 503
+        seed: Semente dos dados e das falhas
+    """
+    def __init__(self, folders=3, videos_per_folder=5, rows=50, latency=0.05, api_latency=0.2,
+                 jitter=0.0, page_failure_rate=0.0, export_failure_rate=0.0, seed=42,
+                 email="bench@vturb.local", password="bench"):
+        self.folders = folders
+        self.videos_per_folder = videos_per_folder
+        self.rows = rows
+        self.latency = latency
+        self.api_latency = api_latency
+        self.jitter = jitter
+        self.page_failure_rate = page_failure_rate
+        self.export_failure_rate = export_failure_rate
+        self.seed = seed
+        self.email = email
+        self.password = password
+
+    def to_dict(self):
+        return {key: value for key, value in vars(self).items() if key != "password"}
+
+
+class FakeVTurbSite:
+    """Servidor HTTP do site local, executado em uma thread própria"""
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeSiteConfig()
+        self.sessions = set()
+        self.counters = {}
+        self.stats = {"requests": 0, "page_failures": 0, "export_failures": 0, "exports": 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self):
+        return f"{self.base_url}/signin"
+
+    @property
+    def folders_url(self):
+        return f"{self.base_url}/folders"
+
+    @property
+    def export_url_template(self):
+        return f"{self.base_url}/api/videos/{{video_id}}/export.csv?group=utm_content"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-vturb", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # Dados
+
+    def folder_ids(self):
+        return [f"folder-{index:02d}" for index in range(1, self.config.folders + 1)]
+
+    def video_ids(self, folder_id):
+        folder = folder_id.split("-")[-1]
+        return [f"v{folder}{index:03d}" for index in range(1, self.config.videos_per_folder + 1)]
+
+    def has_video(self, video_id):
+        return any(video_id in self.video_ids(folder_id) for folder_id in self.folder_ids())
+
+    @staticmethod
+    def video_title(video_id):
+        return f"VSL IA {video_id[1:3]}-{video_id[3:]}"
+
+    def _random(self, *parts):
+        return random.Random(":".join(str(part) for part in (self.config.seed,) + parts))
+
+    def video_counters(self, video_id):
+        """Visualizações e downloads exibidos na listagem"""
+        rng = self._random("listing", video_id)
+        return rng.randint(1_000, 200_000), rng.randint(10, 5_000)
+
+    def csv_rows(self, video_id, group):
+        rng = self._random("csv", video_id, group)
+        rows = []
+        for index in range(1, self.config.rows + 1):
+            views = rng.randint(10, 50_000)
+            plays = rng.randint(0, views)
+            rows.append([
+                f"{group}-{index:04d}", views, rng.randint(0, views), plays, rng.randint(0, plays),
+                f"{plays / views * 100:.1f}%".replace(".", ","), f"{rng.uniform(0, 100):.1f}%".replace(".", ","),
+                rng.randint(0, plays // 10 + 1), "01/01/2024 12:00:00",
+            ])
+        return rows
+
+    # Latência e falhas
+
+    def _attempt(self, kind, key):
+        """Número da requisição (por tipo e vídeo), para decisões determinísticas por tentativa"""
+        with self.lock:
+            self.stats["requests"] += 1
+            count = self.counters.get((kind, key), 0) + 1
+            self.counters[(kind, key)] = count
+        return count
+
+    def delay(self, kind, key, base):
+        attempt = self._attempt(kind, key)
+        jitter = self._random("jitter", kind, key, attempt).uniform(0, self.config.jitter) if self.config.jitter else 0
+        if base + jitter > 0:
+            time.sleep(base + jitter)
+        return attempt
+
+    def should_fail(self, kind, key, attempt, rate):
+        if rate <= 0:
+            return False
+        failed = self._random("fail", kind, key, attempt).random() < rate
+        if failed:
+            with self.lock:
+                self.stats[f"{kind}_failures"] += 1
+        return failed
+
+    def snapshot_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+def _make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass  # O bot já registra cada etapa; o log de acesso só poluiria a saída do benchmark
+
+        # Respostas
+
+        def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(data)
+
+        def _page(self, title, body, status=200):
+            self._send(status, PAGE_TEMPLATE.format(title=html.escape(title), body=body))
+
+        def _redirect(self, location, headers=None):
+            self._send(303, "", headers={"Location": location, **(headers or {})})
+
+        def _not_found(self):
+            self._page("Não encontrado", "<h1>Página não encontrada</h1>", status=404)
+
+        def _authenticated(self):
+            cookies = self.headers.get("Cookie", "")
+            for part in cookies.split(";"):
+                name, _, value = part.strip().partition("=")
+                if name == SESSION_COOKIE and value in site.sessions:
+                    return True
+            return False
+
+        # Rotas
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            if path != "/signin":
+                return self._not_found()
+            site.delay("page", "login", site.config.latency)
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            email = form.get("email", [""])[0]
+            password = form.get("password", [""])[0]
+            if email != site.config.email or password != site.config.password:
+                error = '<p class="error">E-mail ou senha inválidos</p>'
+                return self._page("Entrar", LOGIN_BODY.format(error=error), status=401)
+            token = secrets.token_hex(16)
+            with site.lock:
+                site.sessions.add(token)
+            self._redirect("/folders", {"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/; HttpOnly"})
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            query = parse_qs(url.query)
+
+            if not parts:
+                return self._redirect("/folders")
+            if parts == ["signin"]:
+                site.delay("page", "login", site.config.latency)
+                return self._page("Entrar", LOGIN_BODY.format(error=""))
+            if parts == ["__stats"]:
+                return self._send(200, json.dumps(site.snapshot_stats()), "application/json")
+            if not self._authenticated():
+                if parts[0] == "api":
+                    return self._send(401, json.dumps({"detail": "não autenticado"}), "application/json")
+                return self._redirect("/signin")
+
+            if parts == ["folders"]:
+                return self._folders()
+            if len(parts) == 2 and parts[0] == "folders":
+                return self._folder(parts[1])
+            if parts[0] == "videos" and len(parts) >= 2 and site.has_video(parts[1]):
+                video_id = parts[1]
+                if len(parts) == 2:
+                    return self._video(video_id)
+                if parts[2:] == ["analytics"]:
+                    return self._analytics(video_id)
+                if parts[2:] == ["analytics", "traffic"]:
+                    return self._traffic(video_id)
+            if parts[:2] == ["api", "videos"] and len(parts) == 4 and site.has_video(parts[2]):
+                group = query.get("group", ["utm_source"])[0]
+                if parts[3] == "traffic":
+                    return self._traffic_data(parts[2], group)
+                if parts[3].startswith("export."):
+                    return self._export(parts[2], group, parts[3].split(".", 1)[1])
+            return self._not_found()
+
+        def _folders(self):
+            site.delay("page", "folders", site.config.latency)
+            rows = []
+            for index, folder_id in enumerate(site.folder_ids(), start=1):
+                videos = site.video_ids(folder_id)
+                views = sum(site.video_counters(video_id)[0] for video_id in videos)
+                downloads = sum(site.video_counters(video_id)[1] for video_id in videos)
+                name = f"Pasta VSL IA {index:02d}"
+                rows.append(
+                    f'<tr data-id="{folder_id}" onclick="window.location.href=\'/folders/{folder_id}\'">'
+                    f'<td title="{name}">{name}</td><td>{views}</td><td>{downloads}</td></tr>'
+                )
+            self._page("Pastas", f"<h1>Pastas</h1><table>{''.join(rows)}</table>")
+
+        def _folder(self, folder_id):
+            if folder_id not in site.folder_ids():
+                return self._not_found()
+            site.delay("page", folder_id, site.config.latency)
+            rows = []
+            for video_id in site.video_ids(folder_id):
+                title = site.video_title(video_id)
+                views, downloads = site.video_counters(video_id)
+                rows.append(
+                    f'<tr data-id="{video_id}"><td title="{title}"><a href="/videos/{video_id}">{title}</a></td>'
+                    f"<td>{views}</td><td>{downloads}</td></tr>"
+                )
+            self._page(folder_id, f'<h1>Vídeos</h1><a href="/folders">Voltar</a><table>{"".join(rows)}</table>')
+
+        def _video(self, video_id):
+            site.delay("page", video_id, site.config.latency)
+            title = site.video_title(video_id)
+            self._page(title, f'<h1>{title}</h1><video controls></video><a href="/videos/{video_id}/analytics">Analytics</a>')
+
+        def _analytics(self, video_id):
+            site.delay("page", video_id, site.config.latency)
+            title = site.video_title(video_id)
+            self._page(title, f'<h1>{title}</h1><a href="/videos/{video_id}/analytics/traffic">Tráfego</a>')
+
+        def _traffic(self, video_id):
+            attempt = site.delay("page", f"traffic:{video_id}", site.config.latency)
+            combobox = '<button id="group-button" role="combobox" onclick="document.getElementById(\'group-options\').hidden = false">utm_source</button>'
+            if site.should_fail("page", video_id, attempt, site.config.page_failure_rate):
+                combobox = '<p class="error">Não foi possível carregar os filtros</p>'
+            title = site.video_title(video_id)
+            self._page(title, TRAFFIC_BODY.format(title=title, video_id=video_id, combobox=combobox))
+
+        def _traffic_data(self, video_id, group):
+            site.delay("api", f"traffic:{video_id}", site.config.api_latency)
+            rows = [{"key": row[0], "views": row[1], "plays": row[3]} for row in site.csv_rows(video_id, group)]
+            self._send(200, json.dumps({"group": group, "rows": rows}), "application/json")
+
+        def _export(self, video_id, group, extension):
+            attempt = site.delay("api", f"export:{video_id}", site.config.api_latency)
+            if extension != "csv":
+                return self._send(415, json.dumps({"detail": "formato não suportado"}), "application/json")
+            if site.should_fail("export", video_id, attempt, site.config.export_failure_rate):
+                return self._send(503, json.dumps({"detail": "exportação indisponível"}), "application/json")
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(site.csv_rows(video_id, group))
+            file_name = f"{video_id}-{group}.csv"
+            with site.lock:
+                site.stats["exports"] += 1
+            self._send(200, buffer.getvalue(), "text/csv; charset=utf-8", {
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(file_name)}",
+            })
+
+    return Handler
+
+
+def add_site_arguments(parser):
+    """Argumentos do site local, compartilhados com o benchmark"""
+    defaults = FakeSiteConfig()
+    parser.add_argument("--folders", type=int, default=defaults.folders, help="Quantidade de pastas")
+    parser.add_argument("--videos", type=int, default=defaults.videos_per_folder, help="Vídeos por pasta")
+    parser.add_argument("--rows", type=int, default=defaults.rows, help="Linhas do CSV de cada vídeo")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Atraso de cada página HTML, em segundos")
+    parser.add_argument("--api-latency", type=float, default=defaults.api_latency, help="Atraso das chamadas de dados, em segundos")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="Variação máxima somada aos atrasos, em segundos")
+    parser.add_argument("--page-failure-rate", type=float, default=defaults.page_failure_rate,
+                        help="Fração das páginas de tráfego servidas sem o dropdown de UTM")
+    parser.add_argument("--export-failure-rate", type=float, default=defaults.export_failure_rate,
+                        help="Fração das exportações que respondem 503")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Semente dos dados e das falhas")
+
+
+def site_config_from_args(args):
+    return FakeSiteConfig(
+        folders=args.folders, videos_per_folder=args.videos, rows=args.rows,
+        latency=args.latency, api_latency=args.api_latency, jitter=args.jitter,
+        page_failure_rate=args.page_failure_rate, export_failure_rate=args.export_failure_rate,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Site local que imita o VTurb para testes do bot")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_site_arguments(parser)
+    args = parser.parse_args(argv)
+
+    site = FakeVTurbSite(site_config_from_args(args), host=args.host, port=args.port)
+    print(f"Site local do VTurb em {site.base_url}")
+    print(f"  VTURB_LOGIN_URL={site.login_url}")
+    print(f"  VTURB_FOLDERS_URL={site.folders_url}")
+    print(f"  VTURB_EXPORT_URL_TEMPLATE={site.export_url_template}")
+    print(f"  EMAIL_LOGIN={site.config.email} PASSWORD_LOGIN={site.config.password}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
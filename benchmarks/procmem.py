@@ -0,0 +1,100 @@
+"""Memória (RSS) de uma árvore de processos, amostrada durante os benchmarks"""
+import os
+import threading
+
+try:
+    import psutil  # Opcional: sem ele a memória é lida de /proc (apenas Linux)
+except ImportError:
+    psutil = None
+
+
+def descendant_pids(root_pid):
+    """Processos descendentes de `root_pid` (ex.: chromedriver e Chrome, ou os workers do uvicorn)"""
+    if psutil:
+        try:
+            return [child.pid for child in psutil.Process(root_pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # O nome do processo (2º campo) pode conter espaços; o pai vem logo após o ")"
+                parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    descendants, frontier = [], [root_pid]
+    while frontier:
+        pid = frontier.pop()
+        children = [child for child, parent in parents.items() if parent == pid]
+        descendants.extend(children)
+        frontier.extend(children)
+    return descendants
+
+
+def rss_bytes(pid):
+    if psutil:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class MemorySampler:
+    """
+    Amostra periodicamente a memória somada de uma árvore de processos.
+
+    Args:
+        root_pid: Processo raiz (padrão: o processo atual)
+        include_root: Soma também a memória do processo raiz; o benchmark do bot
+            mede apenas os filhos (driver e navegador), o da API mede o servidor inteiro
+        interval: Intervalo entre as amostras, em segundos
+    """
+    def __init__(self, root_pid=None, include_root=False, interval=0.5):
+        self.root_pid = root_pid or os.getpid()
+        self.include_root = include_root
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def sample(self):
+        pids = descendant_pids(self.root_pid) + ([self.root_pid] if self.include_root else [])
+        if pids:
+            self.samples.append((len(pids), sum(rss_bytes(pid) for pid in pids)))
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.sample()
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return {"samples": 0, "peak_mb": None, "mean_mb": None, "peak_processes": None}
+        values = [rss for _, rss in self.samples]
+        return {
+            "samples": len(values),
+            "peak_mb": round(max(values) / 2**20, 1),
+            "mean_mb": round(sum(values) / len(values) / 2**20, 1),
+            "peak_processes": max(count for count, _ in self.samples),
+        }
@@ -0,0 +1,208 @@
+"""
+Benchmark de ponta a ponta do bot contra o site local (fake_vturb.py).
+
+Executa `main()` do bot em um diretório de trabalho temporário, com o Chrome de
+verdade, e relata vídeos por minuto, latência por etapa (p50/p95, a partir do
+relatório de desempenho da execução) e memória dos processos do navegador.
+Com --baseline, compara o resultado com um benchmark anterior e aponta as
+regressões.
+
+Uso:
+    python benchmarks/run_benchmark.py --folders 2 --videos 10 --workers 2
+    python benchmarks/run_benchmark.py --baseline benchmarks/results/base.json --fail-on-regression
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import datetime
+import tempfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+VTURB_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "vturb")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_vturb import FakeVTurbSite, add_site_arguments, site_config_from_args
+from procmem import MemorySampler
+
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+DRIVER_CACHE_FILENAME = ".driver_cache.json"
+
+# Uma queda de vazão maior que esta razão em relação à linha de base é uma regressão
+THROUGHPUT_REGRESSION_RATIO = 1.25
+# Memória de pico do navegador: regressão se crescer mais que 25% e mais que 50 MB
+MEMORY_REGRESSION_RATIO = 1.25
+MEMORY_REGRESSION_MIN_MB = 50
+
+
+def prepare_environment(site, workdir, args):
+    """
+    Aponta o bot para o site local e para o diretório de trabalho. Variáveis que
+    poderiam levar o bot à plataforma real (ou a uma sessão salva) ficam vazias:
+    o load_dotenv do bot não sobrescreve variáveis já definidas.
+    """
+    os.environ.update({
+        "EMAIL_LOGIN": site.config.email,
+        "PASSWORD_LOGIN": site.config.password,
+        "VTURB_LOGIN_URL": site.login_url,
+        "VTURB_FOLDERS_URL": site.folders_url,
+        "VTURB_DOWNLOAD_DIR": os.path.join(workdir, "downloads"),
+        "VTURB_ANALYTICS_DIR": os.path.join(workdir, "analytics"),
+        "VTURB_METRICS_FILE": os.path.join(workdir, "metrics", "vturb_bot.prom"),
+        "VTURB_EXPORT_URL_TEMPLATE": site.export_url_template,
+        "VTURB_DOWNLOAD_TIMEOUT": str(args.download_timeout),
+        "VTURB_RETRY_BACKOFF": str(args.retry_backoff),
+        "VTURB_LOG_LEVEL": args.log_level,
+        "VTURB_HEADLESS": "1",
+        "VTURB_TRAFFIC_URL_TEMPLATE": "",
+        "VTURB_PROFILE_DIR": "",
+        "VTURB_COOKIES_PATH": "",
+        "VTURB_DATASET_DIR": "",
+        "VTURB_METRICS_PUSHGATEWAY": "",
+    })
+
+
+def bot_arguments(args):
+    argv = ["--full", "--workers", str(args.workers), "--export-mode", args.export_mode]
+    if args.lean:
+        argv.append("--lean")
+    return argv
+
+
+def compare_results(baseline, result):
+    """
+    Compara com a linha de base: p95 das etapas (mesmo critério do relatório de
+    desempenho do bot), vazão e memória de pico do navegador.
+
+    Returns:
+        tuple: (comparação por etapa, lista de regressões)
+    """
+    from tracing import compare_reports
+
+    comparison = compare_reports(baseline, result)
+    regressions = [f"{path}: p95 {item['previous_p95']}s -> {item['p95']}s" for path, item in comparison.items() if item["regression"]]
+
+    before, after = baseline.get("videos_per_minute"), result["videos_per_minute"]
+    if before and after is not None and after * THROUGHPUT_REGRESSION_RATIO < before:
+        regressions.append(f"vazão: {before} -> {after} vídeos/min")
+
+    before = (baseline.get("browser_memory") or {}).get("peak_mb")
+    after = result["browser_memory"]["peak_mb"]
+    if before and after and after > before * MEMORY_REGRESSION_RATIO and after - before > MEMORY_REGRESSION_MIN_MB:
+        regressions.append(f"memória de pico do navegador: {before} MB -> {after} MB")
+    return comparison, regressions
+
+
+def print_result(result, regressions):
+    print()
+    print(f"Vídeos processados: {result['videos']['processed']} | falhas: {result['videos']['failed']} | "
+          f"duração: {result['duration']:.1f}s | vazão: {result['videos_per_minute']} vídeos/min")
+    memory = result["browser_memory"]
+    if memory["peak_mb"] is not None:
+        print(f"Memória do navegador: pico {memory['peak_mb']} MB, média {memory['mean_mb']} MB "
+              f"({memory['peak_processes']} processos)")
+    print()
+    print(f"{'etapa':<45} {'n':>5} {'p50':>8} {'p95':>8} {'erros':>6}")
+    for path, stats in result["steps"].items():
+        print(f"{path:<45} {stats['count']:>5} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['errors']:>6}")
+    if regressions:
+        print()
+        print("REGRESSÕES:")
+        for regression in regressions:
+            print(f"  - {regression}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do bot contra o site local do VTurb")
+    add_site_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1, help="Sessões de navegador em paralelo")
+    parser.add_argument("--export-mode", choices=("ui", "http"), default="ui")
+    parser.add_argument("--lean", action="store_true", help="Executa o bot no modo enxuto")
+    parser.add_argument("--download-timeout", type=float, default=10)
+    parser.add_argument("--retry-backoff", type=float, default=0.5)
+    parser.add_argument("--log-level", type=str.upper, choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="INFO")
+    parser.add_argument("--name", help="Nome do resultado (padrão: data e hora)")
+    parser.add_argument("--output", help="Arquivo JSON do resultado (padrão: benchmarks/results/<nome>.json)")
+    parser.add_argument("--baseline", help="Resultado anterior usado como linha de base")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Sai com código 1 se houver regressões")
+    parser.add_argument("--keep-workdir", action="store_true", help="Mantém o diretório de trabalho (logs, CSVs, relatórios)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    name = args.name or datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    output = os.path.abspath(args.output or os.path.join(DEFAULT_RESULTS_DIR, f"{name}.json"))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    workdir = tempfile.mkdtemp(prefix="vturb-bench-")
+    original_cwd = os.getcwd()
+    # Reaproveita o caminho do chromedriver já resolvido, para que a inicialização do navegador não consulte a rede
+    if os.path.exists(os.path.join(original_cwd, DRIVER_CACHE_FILENAME)):
+        shutil.copy2(os.path.join(original_cwd, DRIVER_CACHE_FILENAME), workdir)
+
+    with FakeVTurbSite(site_config_from_args(args)) as site:
+        prepare_environment(site, workdir, args)
+        # O bot grava logs, bancos e relatórios no diretório atual: isola-os no diretório de trabalho
+        os.chdir(workdir)
+        sys.path.insert(0, VTURB_DIR)
+        import app
+        from tracing import latest_report
+        from logger import close_logs
+
+        sampler = MemorySampler().start()
+        started = time.perf_counter()
+        try:
+            app.main(bot_arguments(args))
+        finally:
+            duration = time.perf_counter() - started
+            sampler.stop()
+            close_logs()
+            os.chdir(original_cwd)
+        report = latest_report(os.path.join(workdir, "perf_reports")) or {"steps": {}}
+        site_stats = site.snapshot_stats()
+
+    processed = app.RUN_VIDEOS.values.get(("processed",), 0)
+    result = {
+        "name": name,
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "site": site.config.to_dict(),
+        "bot": {"workers": args.workers, "export_mode": args.export_mode, "lean": args.lean},
+        "duration": round(duration, 3),
+        "videos": {status: app.RUN_VIDEOS.values.get((status,), 0) for status in ("processed", "skipped", "failed")},
+        "videos_per_minute": round(processed / duration * 60, 2) if duration else None,
+        "browser_memory": sampler.summary(),
+        "site_stats": site_stats,
+        "steps": report["steps"],
+        "slowest": report.get("slowest", []),
+    }
+
+    regressions = []
+    if baseline:
+        result["baseline"] = baseline.get("name")
+        result["comparison"], regressions = compare_results(baseline, result)
+        result["regressions"] = regressions
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print_result(result, regressions)
+    print()
+    print(f"Resultado salvo em: {output}")
+    if args.keep_workdir:
+        print(f"Diretório de trabalho mantido em: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
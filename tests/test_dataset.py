@@ -0,0 +1,52 @@
+import os
+import sys
+import datetime
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.dataset as ds  # noqa: E402
+
+# Os módulos do extrator usam imports planos (executados a partir de vturb/)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vturb"))
+
+import dataset  # noqa: E402
+
+
+def _append(tmp_path, directory, content, day):
+    csv_path = tmp_path / f"video-{day}.csv"
+    csv_path.write_text(content, encoding="utf-8")
+    return dataset.append_csv(directory, "Vídeo A", str(csv_path), extracted_at=datetime.datetime(2026, 10, day, 10))
+
+
+def _read(directory, **kwargs):
+    schema = dataset.load_schema(directory)
+    return ds.dataset(directory, schema=schema, format="parquet", partitioning="hive").to_table(**kwargs)
+
+
+def test_dimension_columns_are_text_even_when_first_values_are_numeric(tmp_path):
+    directory = str(tmp_path / "dataset")
+    _append(tmp_path, directory, "utm_content,Visualizações\n123,10\n", 1)
+    _append(tmp_path, directory, "utm_content,Visualizações\nabc,5\n", 2)
+
+    schema = dataset.load_schema(directory)
+    assert schema.field("utm_content").type == pa.string()
+    assert schema.field("visualizacoes").type == pa.float64()
+    assert sorted(_read(directory)["utm_content"].to_pylist()) == ["123", "abc"]
+
+
+def test_conflicting_values_widen_the_column_instead_of_becoming_null(tmp_path, monkeypatch):
+    directory = str(tmp_path / "dataset")
+    # Dimensão gravada como número (conjunto de dados anterior à regra das dimensões)
+    monkeypatch.setattr(dataset, "is_dimension", lambda column: False)
+    _append(tmp_path, directory, "utm_content,Visualizações\n123,10\n", 1)
+    assert dataset.load_schema(directory).field("utm_content").type == pa.float64()
+
+    _append(tmp_path, directory, "utm_content,Visualizações\nabc,n/d\n", 2)
+
+    schema = dataset.load_schema(directory)
+    assert schema.field("utm_content").type == pa.string()
+    assert schema.field("visualizacoes").type == pa.string()
+    table = _read(directory, filter=ds.field("utm_content").isin(["abc", "123"]))
+    assert sorted(table["utm_content"].to_pylist()) == ["123", "abc"]
+    assert sorted(table["visualizacoes"].to_pylist()) == ["10", "n/d"]
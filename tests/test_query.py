@@ -0,0 +1,88 @@
+import os
+import sys
+import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+# Os módulos do extrator usam imports planos (executados a partir de vturb/)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vturb"))
+
+import dataset  # noqa: E402
+from query import QueryEngine, QueryError  # noqa: E402
+
+CSV_CONTENT = "utm_content,Visualizações\nx,10\ny,5\n"
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, monkeypatch):
+    """
+    Conjunto de dados com o mesmo CSV em duas datas de extração do mesmo vídeo,
+    como gravado antes da deduplicação entre partições
+    """
+    csv_path = tmp_path / "video.csv"
+    csv_path.write_text(CSV_CONTENT, encoding="utf-8")
+    directory = str(tmp_path / "dataset")
+    monkeypatch.setattr(dataset, "find_part", lambda *args: None)
+    for day in (1, 2):
+        dataset.append_csv(directory, "Vídeo A", str(csv_path), extracted_at=datetime.datetime(2026, 10, day, 10))
+    return directory
+
+
+def test_latest_counts_each_row_once_when_content_repeats_across_dates(dataset_dir):
+    engine = QueryEngine(dataset_dir)
+
+    grouped = engine.run(group_by="utm_content", metrics=["visualizacoes"])
+    totals = {row["utm_content"]: row["visualizacoes_sum"] for row in grouped["rows"]}
+    assert totals == {"x": 10.0, "y": 5.0}
+
+    rows = engine.run(columns=["utm_content", "extracted_date"])
+    assert rows["count"] == 2
+    assert {row["extracted_date"] for row in rows["rows"]} == {"2026-10-02"}
+
+
+def test_all_extractions_without_latest(dataset_dir):
+    engine = QueryEngine(dataset_dir)
+
+    grouped = engine.run(group_by="utm_content", metrics=["visualizacoes"], latest=False)
+    totals = {row["utm_content"]: row["visualizacoes_sum"] for row in grouped["rows"]}
+    assert totals == {"x": 20.0, "y": 10.0}
+
+
+def test_append_skips_content_already_stored_on_another_date(tmp_path):
+    csv_path = tmp_path / "video.csv"
+    csv_path.write_text(CSV_CONTENT, encoding="utf-8")
+    directory = str(tmp_path / "dataset")
+
+    first = dataset.append_csv(directory, "Vídeo A", str(csv_path), extracted_at=datetime.datetime(2026, 10, 1, 10))
+    second = dataset.append_csv(directory, "Vídeo A", str(csv_path), extracted_at=datetime.datetime(2026, 10, 2, 10))
+
+    assert first["written"] and not second["written"]
+    assert second["path"] == first["path"]
+
+
+@pytest.fixture
+def numeric_utm_dataset_dir(tmp_path, monkeypatch):
+    """Conjunto de dados anterior à regra das dimensões: utm_content gravado como número"""
+    csv_path = tmp_path / "video.csv"
+    csv_path.write_text("utm_content,Visualizações\n123,10\n456,5\n", encoding="utf-8")
+    directory = str(tmp_path / "dataset")
+    monkeypatch.setattr(dataset, "is_dimension", lambda column: False)
+    dataset.append_csv(directory, "Vídeo A", str(csv_path), extracted_at=datetime.datetime(2026, 10, 1, 10))
+    return directory
+
+
+def test_utm_filter_is_cast_to_the_column_type(numeric_utm_dataset_dir):
+    engine = QueryEngine(numeric_utm_dataset_dir)
+
+    assert engine.run(utm=["123"])["count"] == 1
+    with pytest.raises(QueryError):
+        engine.run(utm=["abc"])
+
+
+def test_default_metrics_exclude_the_group_by_column(numeric_utm_dataset_dir):
+    engine = QueryEngine(numeric_utm_dataset_dir)
+
+    result = engine.run(group_by="utm_content")
+    assert result["columns"] == ["utm_content", "visualizacoes_sum"]
@@ -1,20 +1,110 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, HTMLResponse
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
 import os
-from pathlib import Path
+import time
+import asyncio
+import gzip
+import json
+import zlib
+import base64
+import binascii
+import datetime
+import hashlib
+import threading
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
 import markdown2  # Precisamos instalar esta biblioteca: pip install markdown2
 import re
+from functools import lru_cache
+
+from vturb.catalog import Catalog, encoded_path
+from vturb.metrics import Registry, CONTENT_TYPE
+from vturb.bulk_export import EXPORT_FORMATS
+from vturb.query import QueryEngine, QueryError
+from vturb.snapshots import load_history, get_snapshot, object_path, compute_delta
+from vturb.changes import ChangeFeed
+
+try:
+    import brotli  # Opcional: habilita a variante pré-comprimida em brotli da documentação
+except ImportError:
+    brotli = None
+
+
+# Base directory for analytics files
+ANALYTICS_DIR = "./analytics"
+# Conjunto de dados Parquet gravado pelo extrator (consultas)
+DATASET_DIR = os.path.join(ANALYTICS_DIR, ".dataset")
+HTML_TEMPLATE_PATH = "./assets/doc.html"
+DOCS_PATH = "docs/api.md"
+
+# Maior página aceita na listagem paginada
+MAX_LIST_LIMIT = 1000
+
+# Log de alterações: intervalo de verificação do long-poll/SSE, espera máxima e
+# intervalo dos comentários que mantêm a conexão SSE aberta
+CHANGES_POLL_INTERVAL = 0.5
+MAX_CHANGES_WAIT = 60
+MAX_CHANGES_LIMIT = 1000
+SSE_KEEPALIVE_SECONDS = 15
+
+# Página de documentação renderizada, invalidada pelo mtime dos arquivos de origem
+_docs_cache = {"mtimes": None, "page": None}
+_docs_lock = threading.Lock()
+
+# Índice em memória dos vídeos/CSVs disponíveis, mantido pelo manifesto do extrator
+catalog = Catalog(ANALYTICS_DIR)
+
+# Consultas vetorizadas sobre o conjunto de dados, com resultados em cache
+query_engine = QueryEngine(DATASET_DIR)
+
+# Log de alterações gravado pelo extrator, lido de forma incremental
+change_feed = ChangeFeed(ANALYTICS_DIR)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Constrói o catálogo na inicialização, para que a primeira requisição já seja O(1)"""
+    catalog.refresh(force=True)
+    yield
 
 
 app = FastAPI(
     title="Vturb Analytics API",
     description="API para acessar arquivos CSV de análise do VTurb",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Base directory for analytics files
-ANALYTICS_DIR = "./analytics"
-HTML_TEMPLATE_PATH = "./assets/doc.html"
+# Métricas da API, expostas em /metrics
+metrics_registry = Registry()
+REQUESTS = metrics_registry.counter(
+    "vturb_api_requests_total", "Requisições por endpoint e status", ["method", "endpoint", "status"]
+)
+REQUEST_DURATION = metrics_registry.histogram(
+    "vturb_api_request_duration_seconds", "Latência das requisições por endpoint", ["method", "endpoint"]
+)
+CATALOG_VIDEOS = metrics_registry.gauge("vturb_api_catalog_videos", "Vídeos disponíveis no catálogo")
+CATALOG_VIDEOS.set_function(lambda: len(catalog))
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Conta as requisições e mede a latência, agrupando pelo modelo da rota (ex.: /analytics/{video_name})"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = route.path if route else "nao_encontrado"
+        REQUESTS.inc(method=request.method, endpoint=endpoint, status=status)
+        REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method, endpoint=endpoint)
+
 
 def process_markdown_for_better_display(html_content):
     """
@@ -61,21 +151,16 @@ def process_markdown_for_better_display(html_content):
     
     return html_content
 
-@app.get("/", response_class=HTMLResponse)
-def read_root():
-    """Endpoint raiz para renderizar a documentação da API"""
-    # Caminho para o arquivo markdown de documentação
-    docs_path = "docs/api.md"
-    
-    try:
-        # Lê o conteúdo do arquivo markdown
-        with open(docs_path, "r", encoding="utf-8") as f:
-            markdown_content = f.read()
-    except FileNotFoundError:
-        return HTMLResponse(
-            content="<h1>Documentação não encontrada</h1><p>O arquivo de documentação não foi encontrado. Por favor, verifique se o arquivo api_documentation.md existe.</p>",
-            status_code=404
-        )
+def render_docs_page():
+    """
+    Renderiza a página de documentação completa (markdown + template HTML).
+
+    Raises:
+        FileNotFoundError: Se o markdown ou o template não existirem
+    """
+    # Lê o conteúdo do arquivo markdown
+    with open(DOCS_PATH, "r", encoding="utf-8") as f:
+        markdown_content = f.read()
     
     # Converte o markdown para HTML usando markdown2
     html_content = markdown2.markdown(
@@ -86,26 +171,106 @@ def read_root():
     # Processa o HTML para melhorar a exibição
     html_content = process_markdown_for_better_display(html_content)
     
+    # Carrega o template HTML e substitui o marcador de conteúdo pelo HTML gerado
+    with open(HTML_TEMPLATE_PATH, "r", encoding="utf-8") as f:
+        template = f.read()
+    return template.replace("{content}", html_content)
+
+
+def get_docs_page():
+    """
+    Página de documentação em cache, com as variantes pré-comprimidas.
+    É renderizada novamente apenas quando o markdown ou o template mudam.
+
+    Returns:
+        dict: Corpo em cada codificação ("identity", "gzip", "br"), ETag e Last-Modified
+    """
+    mtimes = tuple(os.stat(path).st_mtime for path in (DOCS_PATH, HTML_TEMPLATE_PATH))
+    with _docs_lock:
+        if _docs_cache["mtimes"] != mtimes:
+            body = render_docs_page().encode("utf-8")
+            digest = hashlib.sha256(body).hexdigest()[:32]
+            variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+            if brotli:
+                variants["br"] = brotli.compress(body)
+            _docs_cache["page"] = {
+                "variants": variants,
+                "etag": f'"{digest}"',
+                "last_modified": formatdate(max(mtimes), usegmt=True),
+                "mtime": int(max(mtimes)),
+            }
+            _docs_cache["mtimes"] = mtimes
+        return _docs_cache["page"]
+
+
+def _not_modified(request, etag, mtime):
+    """Avalia If-None-Match (prioritário) e If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _preferred_encoding(request, available):
+    """Escolhe a codificação aceita pelo cliente entre as disponíveis (br > zstd > gzip > identity)"""
+    accepted = [
+        part.split(";")[0].strip()
+        for part in request.headers.get("accept-encoding", "").split(",")
+        if not part.strip().endswith("q=0")
+    ]
+    for encoding in ("br", "zstd", "gzip"):
+        if encoding in available and encoding in accepted:
+            return encoding
+    return "identity"
+
+
+@app.get("/", response_class=HTMLResponse)
+def read_root(request: Request):
+    """Endpoint raiz para renderizar a documentação da API"""
     try:
-        # Carrega o template HTML
-        with open(HTML_TEMPLATE_PATH, "r", encoding="utf-8") as f:
-            template = f.read()
-        
-        # Substitui o marcador de conteúdo pelo HTML gerado
-        complete_html = template.replace("{content}", html_content)
-    except FileNotFoundError:
-        # Fallback caso o template não seja encontrado
+        page = get_docs_page()
+    except FileNotFoundError as e:
+        if e.filename and os.path.abspath(e.filename) == os.path.abspath(HTML_TEMPLATE_PATH):
+            # Fallback caso o template não seja encontrado
+            return HTMLResponse(
+                content=f"<h1>Template HTML não encontrado</h1><p>O arquivo de template HTML não foi encontrado em {HTML_TEMPLATE_PATH}.</p>",
+                status_code=404
+            )
         return HTMLResponse(
-            content=f"<h1>Template HTML não encontrado</h1><p>O arquivo de template HTML não foi encontrado em {HTML_TEMPLATE_PATH}.</p>",
+            content="<h1>Documentação não encontrada</h1><p>O arquivo de documentação não foi encontrado. Por favor, verifique se o arquivo api_documentation.md existe.</p>",
             status_code=404
         )
-    
-    return HTMLResponse(content=complete_html)
+
+    headers = {
+        "ETag": page["etag"],
+        "Last-Modified": page["last_modified"],
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, page["etag"], page["mtime"]):
+        return Response(status_code=304, headers=headers)
+
+    encoding = _preferred_encoding(request, page["variants"])
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return HTMLResponse(content=page["variants"][encoding], headers=headers)
 
 @app.get("/analytics/{video_name}")
-def get_csv_file(video_name: str):
+def get_csv_file(video_name: str, request: Request):
     """
     Busca e retorna o arquivo CSV de uma pasta específica.
+
+    O ETag é o hash do conteúdo: requisições com If-None-Match/If-Modified-Since
+    de um arquivo que não mudou recebem 304. Sem Range, a variante comprimida
+    gravada pelo extrator é servida quando o cliente a aceita; com Range, o CSV
+    original é servido em partes.
     
     Args:
         video_name: Nome da pasta contendo o arquivo CSV do video
@@ -115,41 +280,414 @@ def get_csv_file(video_name: str):
     """
     # Sanitize folder name to prevent directory traversal
     folder_name = os.path.basename(video_name)
-    folder_path = os.path.join(ANALYTICS_DIR, folder_name)
+    entry = catalog.get(folder_name)
     
     # Check if folder exists
-    if not os.path.exists(folder_path) or not os.path.isdir(folder_path):
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"Pasta '{folder_name}' não encontrada")
     
-    # Find CSV files in the folder
-    csv_files = list(Path(folder_path).glob("*.csv"))
-    
-    if not csv_files:
+    if not entry["path"]:
         raise HTTPException(status_code=404, detail=f"Nenhum arquivo CSV encontrado na pasta '{folder_name}'")
     
-    # Return the first CSV file found (according to requirements)
-    csv_file_path = str(csv_files[0])
-    file_name = os.path.basename(csv_file_path)
-    
+    encoding = "identity"
+    if "range" not in request.headers:
+        encoding = _preferred_encoding(request, catalog.encodings(entry))
+
+    # ETag forte por representação: o mesmo conteúdo comprimido tem outro ETag
+    content_hash = catalog.content_hash(entry)
+    etag = f'"{content_hash}"' if encoding == "identity" else f'"{content_hash}-{encoding}"'
+    # Last-Modified vem sempre do CSV registrado (o mesmo valor usado no If-Modified-Since),
+    # não do arquivo da variante servida
+    headers = {
+        "ETag": etag, "Last-Modified": formatdate(int(entry["mtime"]), usegmt=True),
+        "Cache-Control": "no-cache", "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, etag, int(entry["mtime"])):
+        return Response(status_code=304, headers=headers)
+
+    path = entry["path"]
+    if encoding != "identity":
+        path = encoded_path(ANALYTICS_DIR, content_hash, encoding)
+        headers["Content-Encoding"] = encoding
+
+    # Return the most recent CSV file of the folder (FileResponse trata Range e If-Range)
     return FileResponse(
-        path=csv_file_path, 
-        filename=file_name,
-        media_type="text/csv"
+        path=path, 
+        filename=entry["file"],
+        media_type="text/csv",
+        headers=headers
     )
 
+def _encode_cursor(sort, order, key):
+    data = json.dumps({"sort": sort, "order": order, "key": key}, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor, sort, order):
+    """Chave da última entrada da página anterior, validada contra a ordenação pedida"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = data["key"]
+        if data["sort"] != sort or data["order"] != order:
+            raise HTTPException(status_code=400, detail="Cursor gerado com outra ordenação; repita sort e order da primeira página")
+        if sort == "updated":
+            mtime, name = key
+            return (float(mtime), str(name))
+        return str(key)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _list_item(entry):
+    """Metadados do CSV mais recente de uma pasta (nulos se a pasta não tem CSV)"""
+    mtime = entry.get("mtime") if entry["path"] else None
+    return {
+        "name": entry["name"],
+        "file": entry.get("file") if entry["path"] else None,
+        "size": entry.get("size") if entry["path"] else None,
+        "rows": entry.get("rows") if entry["path"] else None,
+        "mtime": mtime,
+        "updated_at": datetime.datetime.fromtimestamp(mtime).isoformat(timespec="seconds") if mtime else None,
+    }
+
+
 @app.get("/list")
-def list_available_videos():
+def list_available_videos(
+    limit: int | None = Query(None, ge=1, le=MAX_LIST_LIMIT),
+    cursor: str | None = None,
+    prefix: str | None = None,
+    contains: str | None = None,
+    sort: Literal["name", "updated"] = "name",
+    order: Literal["asc", "desc"] = "asc",
+    metadata: bool = False,
+):
     """
-    Lista todos os videos disponíveis no diretório de analises
-    
+    Lista os videos disponíveis no diretório de analises.
+
+    Sem parâmetros, retorna todos os vídeos em ordem alfabética. Com `limit`, a
+    resposta é paginada: `next_cursor` deve ser enviado em `cursor` para obter a
+    página seguinte (com os mesmos `sort` e `order`).
+
+    Args:
+        limit: Tamanho da página (todos os vídeos se ausente)
+        cursor: Cursor devolvido pela página anterior
+        prefix: Apenas nomes iniciados por este trecho
+        contains: Apenas nomes que contêm este trecho (sem diferenciar maiúsculas)
+        sort: "name" ou "updated" (data do CSV mais recente)
+        order: "asc" ou "desc"
+        metadata: Inclui em `items` o arquivo, tamanho, linhas e data de cada CSV
+
     Returns:
         dict: Lista de videos disponíveis
     """
+    after = _decode_cursor(cursor, sort, order) if cursor else None
     try:
-        folders = [
-            folder for folder in os.listdir(ANALYTICS_DIR) 
-            if os.path.isdir(os.path.join(ANALYTICS_DIR, folder))
-        ]
-        return {"folders": folders, "count": len(folders)}
+        entries, last_key, total = catalog.page(
+            limit, after=after, sort=sort, descending=order == "desc", prefix=prefix, contains=contains,
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao listar pastas: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao listar pastas: {str(e)}")
+
+    response = {
+        "folders": [entry["name"] for entry in entries],
+        "count": len(entries),
+        "total": total,
+        "next_cursor": _encode_cursor(sort, order, last_key) if last_key is not None else None,
+    }
+    if metadata:
+        response["items"] = [_list_item(entry) for entry in entries]
+    return response
+
+
+class ExportRequest(BaseModel):
+    names: list[str] | None = None
+    contains: str | None = None
+    format: Literal["zip", "csv", "ndjson"] = "zip"
+
+
+def _select_entries(names, contains):
+    """
+    Entradas do catálogo a exportar: os nomes informados (ou todos os vídeos),
+    filtrados pelo trecho `contains` (sem diferenciar maiúsculas)
+    """
+    if names:
+        names = [os.path.basename(name) for name in names]
+        missing = [name for name in names if catalog.get(name) is None]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Pastas não encontradas: {', '.join(missing)}")
+    else:
+        names = catalog.names()
+    if contains:
+        names = [name for name in names if contains.lower() in name.lower()]
+
+    entries = [catalog.get(name) for name in dict.fromkeys(names)]
+    return [entry for entry in entries if entry and entry["path"]]
+
+
+def _compress_stream(chunks, encoding):
+    """Comprime os pedaços da resposta à medida que são gerados"""
+    if encoding == "br":
+        compressor = brotli.Compressor()
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+        compress, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def _export_response(request, format, names, contains):
+    entries = _select_entries(names, contains)
+    if not entries:
+        raise HTTPException(status_code=404, detail="Nenhum arquivo CSV encontrado para os filtros informados")
+
+    generate, media_type, filename = EXPORT_FORMATS[format]
+    chunks = generate(entries)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    # O zip já é comprimido; CSV e NDJSON são comprimidos conforme o Accept-Encoding
+    if format != "zip":
+        headers["Vary"] = "Accept-Encoding"
+        encoding = _preferred_encoding(request, {"gzip", "br"} if brotli else {"gzip"})
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+            chunks = _compress_stream(chunks, encoding)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+@app.get("/export")
+def export_videos(
+    request: Request,
+    format: Literal["zip", "csv", "ndjson"] = "zip",
+    names: list[str] | None = Query(None),
+    contains: str | None = None,
+):
+    """
+    Exporta os CSVs de vários vídeos em uma única resposta, gerada aos poucos.
+
+    Args:
+        format: "zip" (um CSV por vídeo), "csv" (CSV único com a coluna video) ou "ndjson"
+        names: Nomes dos vídeos (pode ser repetido); todos os vídeos se ausente
+        contains: Filtra os vídeos cujo nome contém o trecho informado
+
+    Returns:
+        StreamingResponse: Arquivo no formato solicitado
+    """
+    return _export_response(request, format, names, contains)
+
+
+@app.post("/export")
+def export_videos_by_body(request: Request, body: ExportRequest):
+    """Igual a GET /export, com os filtros no corpo (para listas grandes de nomes)"""
+    return _export_response(request, body.format, body.names, body.contains)
+
+
+@app.get("/query")
+def query_analytics(
+    videos: list[str] | None = Query(None),
+    utm: list[str] | None = Query(None),
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    columns: list[str] | None = Query(None),
+    group_by: str | None = None,
+    metrics: list[str] | None = Query(None),
+    agg: Literal["sum", "mean", "min", "max", "count"] = "sum",
+    top: int | None = Query(None, ge=1),
+    latest: bool = True,
+    limit: int = Query(1000, ge=1, le=100000),
+):
+    """
+    Consulta e agrega os dados de analytics no servidor, sem baixar os CSVs.
+
+    Args:
+        videos: Nomes dos vídeos (pode ser repetido); todos se ausente
+        utm: Valores de utm_content (pode ser repetido)
+        start, end: Intervalo de datas de extração (AAAA-MM-DD, inclusivo)
+        columns: Colunas retornadas quando não há agregação
+        group_by: Coluna de agrupamento (ex.: utm_content)
+        metrics: Colunas agregadas; todas as numéricas se ausente e houver group_by
+        agg: Função de agregação
+        top: Retorna apenas os N grupos com maior valor da primeira métrica
+        latest: Usa apenas a extração mais recente de cada vídeo
+        limit: Máximo de linhas retornadas sem agregação
+
+    Returns:
+        dict: Colunas, linhas (registros) e quantidade
+    """
+    if not query_engine.available():
+        raise HTTPException(status_code=503, detail="Consultas indisponíveis: pyarrow não está instalado no servidor")
+    try:
+        return query_engine.run(
+            videos=videos, utm=utm, start=start, end=end, columns=columns,
+            group_by=group_by, metrics=metrics, agg=agg, top=top, latest=latest, limit=limit,
+        )
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/history/{video_name}")
+def get_video_history(video_name: str):
+    """
+    Lista as versões extraídas de um vídeo (uma por execução em que o CSV foi baixado).
+
+    Returns:
+        dict: Nome do vídeo e versões, da mais antiga para a mais recente
+    """
+    folder_name = os.path.basename(video_name)
+    history = load_history(ANALYTICS_DIR, folder_name)
+    if not history:
+        raise HTTPException(status_code=404, detail=f"Nenhuma versão registrada para '{folder_name}'")
+    return {"video": folder_name, "snapshots": history, "count": len(history)}
+
+
+@app.get("/history/{video_name}/{version}")
+def get_video_snapshot(video_name: str, version: int):
+    """Baixa o CSV de uma versão específica do vídeo"""
+    folder_name = os.path.basename(video_name)
+    entry = get_snapshot(ANALYTICS_DIR, folder_name, version)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Versão {version} de '{folder_name}' não encontrada")
+    return FileResponse(
+        path=object_path(ANALYTICS_DIR, entry["sha256"]),
+        filename=entry["file"],
+        media_type="text/csv"
+    )
+
+
+@lru_cache(maxsize=256)
+def _cached_delta(from_sha256, to_sha256, key):
+    # As versões são imutáveis (endereçadas pelo hash), então o resultado nunca expira
+    return compute_delta(object_path(ANALYTICS_DIR, from_sha256), object_path(ANALYTICS_DIR, to_sha256), key)
+
+
+@app.get("/delta/{video_name}")
+def get_video_delta(
+    video_name: str,
+    from_version: int | None = None,
+    to_version: int | None = None,
+    key: str | None = None,
+):
+    """
+    Diferença entre duas versões de um vídeo, calculada no servidor.
+
+    Args:
+        video_name: Nome do vídeo
+        from_version: Versão inicial (padrão: a penúltima)
+        to_version: Versão final (padrão: a mais recente)
+        key: Coluna que identifica as linhas (padrão: a primeira coluna do CSV)
+
+    Returns:
+        dict: Versões comparadas, linhas adicionadas/removidas e colunas alteradas
+    """
+    folder_name = os.path.basename(video_name)
+    history = {entry["version"]: entry for entry in load_history(ANALYTICS_DIR, folder_name)}
+    if not history:
+        raise HTTPException(status_code=404, detail=f"Nenhuma versão registrada para '{folder_name}'")
+
+    to_version = to_version or max(history)
+    from_version = from_version or max([version for version in history if version < to_version], default=to_version)
+    for version in (from_version, to_version):
+        if version not in history:
+            raise HTTPException(status_code=404, detail=f"Versão {version} de '{folder_name}' não encontrada")
+
+    source, target = history[from_version], history[to_version]
+    result = {"video": folder_name, "from": source, "to": target, "identical": source["sha256"] == target["sha256"]}
+    if result["identical"]:
+        # Mesmo conteúdo: não é preciso ler os arquivos
+        return {**result, "key": key, "added": [], "removed": [], "changed": [], "unchanged": None}
+    try:
+        return {**result, **_cached_delta(source["sha256"], target["sha256"], key)}
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Coluna '{key}' não encontrada nas versões comparadas")
+
+
+def _check_changes_cursor(since):
+    if since > change_feed.latest():
+        # O log foi recriado (ex.: analytics restaurado de um backup): o cursor não vale mais
+        raise HTTPException(
+            status_code=410,
+            detail="Cursor posterior à última alteração registrada; sincronize novamente pelo /list e use o 'latest' retornado por /changes",
+        )
+
+
+@app.get("/changes")
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=MAX_CHANGES_LIMIT),
+    wait: float = Query(0, ge=0, le=MAX_CHANGES_WAIT),
+):
+    """
+    Alterações registradas pelo extrator depois do cursor `since`.
+
+    Com `wait`, a requisição fica aberta (long-poll) até surgir uma alteração
+    ou o tempo se esgotar.
+
+    Args:
+        since: Sequência da última alteração já processada pelo cliente (0 para todas)
+        limit: Máximo de alterações retornadas
+        wait: Segundos a aguardar por alterações novas se não houver nenhuma
+
+    Returns:
+        dict: Alterações, cursor para a próxima chamada, sequência mais recente
+        e se há mais alterações além do limite
+    """
+    # As leituras do log rodam no threadpool: a espera do long-poll não pode bloquear o event loop
+    await run_in_threadpool(_check_changes_cursor, since)
+    deadline = time.monotonic() + wait
+    changes, has_more = await run_in_threadpool(change_feed.since, since, limit)
+    while not changes and time.monotonic() < deadline:
+        await asyncio.sleep(min(CHANGES_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+        changes, has_more = await run_in_threadpool(change_feed.since, since, limit)
+    return {
+        "changes": changes,
+        "next_cursor": changes[-1]["seq"] if changes else since,
+        "latest": await run_in_threadpool(change_feed.latest),
+        "has_more": has_more,
+    }
+
+
+@app.get("/changes/stream")
+async def stream_changes(request: Request, since: int | None = Query(None, ge=0)):
+    """
+    Alterações em tempo real (Server-Sent Events). Cada evento `change` traz o
+    registro da alteração, com a sequência no campo `id`: ao reconectar, o
+    navegador (ou o cliente) envia Last-Event-ID e recebe apenas o que perdeu.
+
+    Args:
+        since: Sequência a partir da qual enviar (padrão: Last-Event-ID, ou apenas alterações novas)
+    """
+    if since is None:
+        last_event_id = request.headers.get("last-event-id", "")
+        since = int(last_event_id) if last_event_id.isdigit() else await run_in_threadpool(change_feed.latest)
+    await run_in_threadpool(_check_changes_cursor, since)
+
+    async def events():
+        cursor = since
+        last_sent = time.monotonic()
+        yield "retry: 5000\n\n"
+        while not await request.is_disconnected():
+            changes, _ = await run_in_threadpool(change_feed.since, cursor, MAX_CHANGES_LIMIT)
+            for change in changes:
+                yield f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+                cursor = change["seq"]
+            now = time.monotonic()
+            if changes:
+                last_sent = now
+            elif now - last_sent >= SSE_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = now
+            await asyncio.sleep(CHANGES_POLL_INTERVAL)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Métricas da API no formato de exposição de texto do Prometheus"""
+    return Response(content=metrics_registry.render(), media_type=CONTENT_TYPE)
@@ -1,18 +1,591 @@
 import os
-import sys
+import time
+import queue
+import threading
 import traceback
+import contextvars
 from dotenv import load_dotenv
 
 from browser import Browser
-from files import move_csv_files
+from config import Config, parse_args
+from files import DownloadTracker, move_file_atomic, file_sha256
+from exporter import HttpExporter
 from logger import (
-    log, log_section, start_timer, end_timer, 
+    log, log_section, log_context, set_log_level, start_timer, end_timer, 
     LogType, format_number, get_log_filename, current_time
 )
 from execution_manager import ExecutionManager
+from video_state import VideoStateStore
+from catalog import record_csv
+from tracing import span, write_report, finished_spans
+from metrics import Registry, write_textfile, push
+from snapshots import record_snapshot, load_history
+from changes import append_change
+import dataset
+
+# XPaths dos elementos usados no fluxo
+ROW_XPATH = "//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]"
+ANALYTICS_LINK_XPATH = "//a[contains(@href, 'analytics')]"
+TRAFFIC_LINK_XPATH = "//a[contains(@href, 'traffic')]"
+UTM_DROPDOWN_XPATH = "//button[@role='combobox'][1]"
+UTM_CONTENT_OPTION_XPATH = "//span[contains(., 'utm_content')]"
+DOWNLOAD_MENU_XPATH = "//button[strong[contains(text(), 'Baixar Métricas') or contains(text(), 'Download Metrics')]]"
+CSV_OPTION_XPATH = "//button[.//span[contains(text(), 'CSV')]]"
+VIDEO_NAME_XPATH = "//span[contains(@title, 'VSL IA')]"
+
+# Métricas da execução, gravadas ao final em arquivo texto (e opcionalmente enviadas ao Pushgateway)
+metrics_registry = Registry()
+RUN_VIDEOS = metrics_registry.gauge("vturb_run_videos", "Vídeos da última execução por resultado", ["status"])
+RUN_DOWNLOAD_BYTES = metrics_registry.gauge("vturb_run_download_bytes", "Bytes de CSV gravados na última execução")
+RUN_DURATION = metrics_registry.gauge("vturb_run_duration_seconds", "Duração da última execução")
+RUN_SUCCESS = metrics_registry.gauge("vturb_run_success", "1 se a última execução terminou com sucesso")
+RUN_TIMESTAMP = metrics_registry.gauge("vturb_run_last_timestamp_seconds", "Horário de término da última execução")
+STEP_DURATION = metrics_registry.histogram("vturb_step_duration_seconds", "Duração das etapas da última execução", ["step"])
+
+
+def parse_row_text(text):
+    """
+    Separa o texto de uma linha da listagem em nome, visualizações e downloads.
+
+    Returns:
+        tuple: (nome, visualizações, downloads), com contadores None se ausentes
+    """
+    parts = text.replace("\n", " - ").split(" ")
+    if len(parts) < 2:
+        return text, None, None
+    return " ".join(parts[:-2]), parts[-2], parts[-1]
+
+
+def list_rows(browser):
+    """
+    Lê as linhas da listagem atual (pastas ou vídeos) em uma única chamada ao navegador.
+
+    Returns:
+        list: Registros com "element", "name", "views", "downloads", "id" e "href"
+    """
+    records = []
+    for row in browser.scrape_rows(ROW_XPATH):
+        text = " ".join(row["cells"]) if row["cells"] else (row["text"] or "")
+        name, views, downloads = parse_row_text(text)
+        row.update({"text": text, "name": name, "views": views, "downloads": downloads})
+        records.append(row)
+    return records
+
+
+def log_rows(records, label):
+    """Registra o nome de cada linha da listagem"""
+    for position, record in enumerate(records):
+        log(f"{label} {position+1}/{len(records)}: '{record['name']}'", LogType.DEBUG, indent_level=1)
+
+
+def has_valid_session(browser, config):
+    """
+    Verifica se a sessão (perfil persistente ou cookies salvos) ainda está
+    autenticada, acessando a listagem de pastas diretamente.
+    """
+    if not config.reuse_session:
+        return False
+    # load_cookies já abre o domínio; a nova visita envia os cookies restaurados
+    browser.load_cookies(config.folders_url)
+    browser.visit(config.folders_url)
+    return browser.wait_for_element(ROW_XPATH, timeout=5) is not None
+
+
+def login(browser, config):
+    """Realiza o login na plataforma e aguarda a listagem de pastas"""
+    start_timer("login_process")
+    log("Verificando sessão salva...", LogType.STEP)
+    if has_valid_session(browser, config):
+        browser.wait_for_page_ready()
+        log("Sessão salva ainda válida. Login pelo formulário dispensado.", LogType.SUCCESS, show_time=True, operation_name="login_process")
+        return
+
+    log("Navegando para a página de login...", LogType.STEP)
+    browser.visit(config.login_url)
+
+    log("Preenchendo credenciais...", LogType.STEP, indent_level=1)
+    browser.find_element_by_xpath("//input[@name='email']").send_keys(config.email)
+    browser.find_element_by_xpath("//input[@name='password']").send_keys(config.password)
+
+    log("Clicando no botão de login...", LogType.STEP, indent_level=1)
+    browser.find_element_by_xpath("//button[@type='button']").click()
+
+    # Verifica se já está logado
+    log("Aguardando página principal carregar...", LogType.STEP, indent_level=1)
+    browser.wait_for_element(ROW_XPATH)
+    browser.wait_for_page_ready()
+    browser.save_cookies()
+    log("Login realizado com sucesso!", LogType.SUCCESS, show_time=True, operation_name="login_process")
+
+
+def open_session(worker_id, config):
+    """Abre um navegador com diretório de download próprio e faz o login"""
+    log(f"Inicializando o navegador do worker {worker_id}...", LogType.STEP)
+    start_timer("browser_init")
+    download_dir = config.worker_download_dir(worker_id)
+    browser = Browser(
+        headless=config.headless,
+        download_path=download_dir,
+        user_data_dir=config.worker_profile_dir(worker_id),
+        cookies_path=config.cookies_path,
+        lean=config.lean,
+    )
+    browser.open()
+    log("Navegador inicializado com sucesso", LogType.SUCCESS, show_time=True, operation_name="browser_init")
+
+    login(browser, config)
+    return browser, download_dir
+
+
+def discover_folders(browser):
+    """Conta e lista as pastas de vídeos disponíveis"""
+    log("Identificando pastas de vídeos...", LogType.STEP)
+    start_timer("folder_count")
+    all_folders = list_rows(browser)
+    folder_count = len(all_folders)
+    log(f"Total de pastas encontradas: {folder_count}", LogType.SUCCESS, show_time=True, operation_name="folder_count")
+
+    # Exibe o nome de cada pasta encontrada
+    log("Listagem de pastas:", LogType.INFO)
+    log_rows(all_folders, "Pasta")
+
+    return folder_count
+
+
+def video_id_from_url(url):
+    """Identificador estável do vídeo: último segmento do caminho da URL"""
+    return url.split("?")[0].split("#")[0].rstrip("/").split("/")[-1]
+
+
+def traffic_url_for(video, config):
+    """URL da página de tráfego do vídeo, ou None se o modelo ainda não é conhecido"""
+    if not config.traffic_url_template:
+        return None
+    return config.traffic_url_template.format(video_id=video["id"], video_url=video["url"].rstrip("/"))
+
+
+def open_traffic_page_by_clicks(browser, video):
+    """
+    Chega à página de tráfego clicando em analytics e tráfego a partir da página
+    do vídeo. Usado quando não há modelo de URL para acessar a página diretamente.
+    """
+    browser.visit(video["url"])
+
+    log("Tentando acessar a página de analytics...", LogType.STEP)
+    start_timer("analytics_page")
+    analytics_element = browser.wait_for_clickable(ANALYTICS_LINK_XPATH)
+    if not analytics_element:
+        end_timer("analytics_page")
+        raise Exception("ERRO: elemento de analytics não encontrado na página do vídeo")
+    if not browser.click_and_wait_for_navigation(analytics_element):
+        end_timer("analytics_page")
+        raise Exception("ERRO: a página de analytics não abriu após o clique")
+    log("Página de analytics carregada com sucesso!", LogType.SUCCESS, show_time=True, operation_name="analytics_page", indent_level=1)
+
+    log("Tentando acessar a página de tráfego...", LogType.STEP)
+    start_timer("traffic_page")
+    traffic_element = browser.wait_for_clickable(TRAFFIC_LINK_XPATH)
+    if not traffic_element:
+        end_timer("traffic_page")
+        raise Exception("ERRO: elemento de tráfego não encontrado na página de analytics")
+    if not browser.click_and_wait_for_navigation(traffic_element):
+        end_timer("traffic_page")
+        raise Exception("ERRO: a página de tráfego não abriu após o clique")
+    log("Navegando para a página de tráfego.", LogType.SUCCESS, show_time=True, operation_name="traffic_page", indent_level=1)
+
+
+def learn_traffic_template(browser, video, config):
+    """
+    Descobre o modelo de URL da página de tráfego navegando uma única vez pelos
+    cliques e substituindo o id do vídeo na URL final por {video_id}.
+    """
+    log("Descobrindo o modelo de URL da página de tráfego...", LogType.STEP)
+    open_traffic_page_by_clicks(browser, video)
+    browser.wait_for_element(UTM_DROPDOWN_XPATH)
+    traffic_url = browser.driver.current_url
+    if video["id"] in traffic_url:
+        config.traffic_url_template = traffic_url.replace(video["id"], "{video_id}")
+        log(f"Modelo de URL de tráfego: {config.traffic_url_template}", LogType.SUCCESS, indent_level=1)
+    else:
+        log("O id do vídeo não aparece na URL de tráfego. Os vídeos serão acessados pelos cliques.", LogType.WARNING, indent_level=1)
+
+
+def discover_videos(browser, folder_count, config, state, progress):
+    """
+    Percorre as pastas uma única vez registrando a URL, o id e os contadores de
+    cada vídeo. Vídeos já concluídos nesta execução ou sem alterações desde a
+    última extração ficam de fora.
+
+    Returns:
+        list: Vídeos no formato {"id", "name", "url", "listing_name", "views", "downloads"}
+    """
+    videos = []
+    for index in range(folder_count):
+        with span("folder", index=index + 1):
+            log(f"Descobrindo vídeos da pasta {index+1}/{folder_count}...", LogType.STEP)
+            browser.visit(config.folders_url)
+            browser.wait_for_element(ROW_XPATH)
+            folders = list_rows(browser)
+            if index >= len(folders):
+                log(f"Não existe pasta com índice [{index}]. Pulando pasta.", LogType.ERROR)
+                continue
+            # As linhas da listagem de pastas também casam com ROW_XPATH: só procura as
+            # linhas de vídeos depois que a página da pasta substituiu a listagem
+            if not browser.click_and_wait_for_navigation(folders[index]["element"]):
+                log(f"A pasta [{index}] não abriu após o clique. Pulando pasta.", LogType.ERROR, indent_level=1)
+                continue
+            if not browser.wait_for_element(ROW_XPATH, timeout=2):
+                log("Nenhum vídeo encontrado na pasta.", LogType.WARNING, indent_level=1)
+                continue
+            browser.wait_for_page_ready()
+            folder_url = browser.driver.current_url
+
+            rows = list_rows(browser)
+            for video_index in range(len(rows)):
+                row = rows[video_index]
+                listing_name, views, downloads = row["name"], row["views"], row["downloads"]
+                if progress.is_done(f"video:{listing_name}"):
+                    log(f"Vídeo já concluído nesta execução: '{listing_name}'. Pulando.", LogType.INFO, indent_level=1)
+                    RUN_VIDEOS.inc(status="skipped")
+                    continue
+                if not config.force_full and views is not None and state.is_unchanged(listing_name, views, downloads):
+                    log(f"Vídeo sem alterações: '{listing_name}' (views: {format_number(views)}, downloads: {format_number(downloads)}). Pulando.", LogType.INFO, indent_level=1)
+                    RUN_VIDEOS.inc(status="skipped")
+                    continue
+
+                url = row["href"]
+                if not url:
+                    # A linha não expõe link: abre o vídeo uma vez para capturar a URL
+                    if not (browser.click_and_wait_for_navigation(row["element"], timeout=5)
+                            and browser.wait_for_clickable(ANALYTICS_LINK_XPATH, timeout=5)):
+                        log(f"Falha ao abrir o vídeo [{video_index}]. Pulando vídeo.", LogType.ERROR, indent_level=1)
+                        url = None
+                    else:
+                        url = browser.driver.current_url
+                    browser.visit(folder_url)
+                    browser.wait_for_element(ROW_XPATH)
+                    rows = list_rows(browser)
+                    if not url:
+                        continue
+
+                video_id = row["id"] or video_id_from_url(url)
+                videos.append({
+                    "id": video_id, "name": row["title"] or listing_name, "url": url,
+                    "listing_name": listing_name, "views": views, "downloads": downloads
+                })
+                log(f"Vídeo descoberto: '{listing_name}' ({video_id})", LogType.INFO, indent_level=1)
+
+    return videos
+
+
+def process_video(browser, video, position, videos_count, download_dir, config, state, progress):
+    """
+    Acessa diretamente a página de tráfego do vídeo, baixa o CSV de UTMs e o
+    move para a pasta de analytics.
+    """
+    log_section(f"PROCESSANDO VÍDEO {position} DE {videos_count}", level=2)
+    log(f"Vídeo: '{video['listing_name']}' ({video['id']})", LogType.INFO)
+
+    traffic_url = traffic_url_for(video, config)
+    if traffic_url:
+        log("Acessando a página de tráfego pela URL...", LogType.STEP)
+        start_timer("traffic_page")
+        load_time = browser.visit(traffic_url)
+        log(f"Página de tráfego carregada em {load_time:.2f}s", LogType.DEBUG, indent_level=1)
+    else:
+        open_traffic_page_by_clicks(browser, video)
+        start_timer("traffic_page")
+
+    # verifica se entrou na pagina de trafego
+    log("Verificando se a página de tráfego foi carregada...", LogType.STEP, indent_level=1)
+    if not browser.wait_for_element(UTM_DROPDOWN_XPATH):
+        end_timer("traffic_page")
+        raise Exception("ERRO: página de tráfego não carregou (dropdown de UTM ausente)")
+    log("Página de tráfego carregada com sucesso!", LogType.SUCCESS, show_time=True, operation_name="traffic_page", indent_level=1)
+    
+    # abre o dropdown e seleciona a opção utm_content
+    log("Aguardando a página de tráfego terminar de carregar...", LogType.STEP, indent_level=1)
+    browser.wait_for_page_ready(timeout=15)
+    log("Tentando abrir o dropdown de UTM...", LogType.STEP)
+    start_timer("utm_dropdown")
+    try:
+        cb = browser.wait_for_clickable(UTM_DROPDOWN_XPATH)
+        if cb:
+            cb.click()
+            log("Dropdown de UTM aberto com sucesso.", LogType.SUCCESS, show_time=True, operation_name="utm_dropdown")
+        else:
+            log("Dropdown não encontrado pelo wait_for_element. Tentando com find_element_by_xpath...", LogType.WARNING)
+            browser.find_element_by_xpath(UTM_DROPDOWN_XPATH).click()
+            log("Dropdown de UTM aberto via find_element_by_xpath.", LogType.SUCCESS)
+    except Exception as e:
+        log(f"ERRO ao tentar abrir o dropdown de UTM: {str(e)}", LogType.ERROR)
+        try:
+            browser.find_element_by_xpath(UTM_DROPDOWN_XPATH).click()
+            log("Segunda tentativa de abrir o dropdown realizada.", LogType.INFO)
+        except:
+            log("Falha na segunda tentativa de abrir o dropdown.", LogType.ERROR)
+            raise Exception(f"ERRO ao selecionar o dropdown: {str(e)}")
+
+    # clica em utm_content
+    log("Tentando selecionar a opção utm_content...", LogType.STEP)
+    start_timer("utm_select")
+    try:
+        utm_option = browser.wait_for_clickable(UTM_CONTENT_OPTION_XPATH, timeout=5)
+        (utm_option or browser.find_element_by_xpath(UTM_CONTENT_OPTION_XPATH)).click()
+        log("Opção utm_content selecionada com sucesso.", LogType.SUCCESS, show_time=True, operation_name="utm_select")
+    except Exception as e:
+        log(f"ERRO ao selecionar utm_content: {str(e)}", LogType.ERROR)
+        raise Exception(f"ERRO ao selecionar utm_content: {str(e)}")
 
+    # A tabela é recarregada com os dados por utm_content
+    browser.wait_for_page_ready()
+    
+    # clica no dropdown para escolher a opção da extensão do arquivo para download
+    log("Tentando abrir o menu de download de métricas...", LogType.STEP)
+    start_timer("download_menu")
+    try:
+        browser.wait_for_clickable(DOWNLOAD_MENU_XPATH).click()
+        log("Menu de 'Baixar Métricas' aberto com sucesso.", LogType.SUCCESS, show_time=True, operation_name="download_menu")
+    except Exception as e:
+        log(f"ERRO ao abrir menu de 'Baixar Métricas': {str(e)}", LogType.ERROR)
+
+    log("Tentando selecionar a opção CSV...", LogType.STEP)
+    start_timer("csv_select")
+    tracker = DownloadTracker(download_dir)
+    tracker.start()
+    try:
+        browser.wait_for_clickable(CSV_OPTION_XPATH).click()
+        log("Opção CSV selecionada. Iniciando download.", LogType.SUCCESS, show_time=True, operation_name="csv_select")
+    except Exception as e:
+        log(f"ERRO ao selecionar opção CSV: {str(e)}", LogType.ERROR)
+
+    log("Aguardando conclusão do download...", LogType.STEP)
+    start_timer("download")
+    downloaded_path = tracker.wait_for_file(timeout=config.download_timeout)
+    if not downloaded_path:
+        log(f"Nenhum CSV concluído em {config.download_timeout}s.", LogType.ERROR, show_time=True, operation_name="download")
+        raise Exception(f"ERRO: download do CSV não concluído em {config.download_timeout}s")
+    log(f"Download concluído: {os.path.basename(downloaded_path)}", LogType.SUCCESS, show_time=True, operation_name="download")
+
+    # pega o nome do video
+    log("Obtendo o nome do vídeo para organizar os arquivos...", LogType.STEP)
+    try:
+        folder_name_el = browser.find_element_by_xpath(VIDEO_NAME_XPATH)
+        folder_name = folder_name_el.text.strip() or video["name"]
+        log(f"Nome do vídeo obtido: '{folder_name}'", LogType.SUCCESS)
+    except Exception as e:
+        # Nome descoberto na listagem: cada vídeo continua com a própria pasta
+        folder_name = video["name"]
+        log(f"ERRO ao obter o nome do vídeo: {str(e)}. Usando o nome da listagem: '{folder_name}'", LogType.ERROR)
+
+    destination_folder = os.path.join(config.analytics_dir, folder_name)
+    log(f"Movendo arquivo CSV para a pasta {destination_folder}...", LogType.STEP)
+    start_timer("move_files")
+    csv_path = move_file_atomic(downloaded_path, destination_folder)
+    log("Arquivo CSV movido com sucesso.", LogType.SUCCESS, show_time=True, operation_name="move_files")
+
+    register_csv(video, folder_name, csv_path, config, state, progress)
+    log(f"VÍDEO {position} PROCESSADO COM SUCESSO!", LogType.SUCCESS)
+
+
+def register_csv(video, video_name, csv_path, config, state, progress):
+    """
+    Registra um CSV recém-gravado em `config.analytics_dir`: manifesto do
+    catálogo da API, histórico de versões, log de alterações, conjunto de dados
+    colunar, estado do vídeo (execuções incrementais) e checkpoint.
+    """
+    csv_hash = file_sha256(csv_path)
+    history = load_history(config.analytics_dir, video_name)
+    entry = record_csv(config.analytics_dir, video_name, csv_path, sha256=csv_hash)
+    snapshot = record_snapshot(config.analytics_dir, video_name, csv_path, csv_hash, run_id=progress.run_id)
+    # O log de alterações só recebe conteúdos novos: um CSV idêntico ao anterior não precisa ser baixado de novo
+    if not history or history[-1]["sha256"] != csv_hash:
+        append_change(
+            config.analytics_dir, video_name, csv_hash,
+            file=entry["file"], size=entry["size"], rows=entry["rows"],
+            version=snapshot["version"], run_id=progress.run_id,
+        )
+    if config.columnar:
+        try:
+            dataset.append_csv(config.dataset_dir, video_name, csv_path, sha256=csv_hash)
+        except Exception as e:
+            # O CSV bruto já está salvo; o backfill pode converter este arquivo depois
+            log(f"Falha ao gravar '{video_name}' no conjunto de dados colunar: {str(e)}", LogType.WARNING, indent_level=1)
+    if video["views"] is not None:
+        state.record(video["listing_name"], video["views"], video["downloads"], csv_path, csv_hash)
+    progress.mark_done(f"video:{video['listing_name']}")
+    RUN_VIDEOS.inc(status="processed")
+    RUN_DOWNLOAD_BYTES.inc(os.path.getsize(csv_path))
+
+
+def run_http_export(browser, videos, config, state, progress):
+    """
+    Modo de exportação http: o navegador só cede os cookies da sessão; os CSVs
+    são baixados em paralelo direto dos endpoints de exportação.
+    """
+    exporter = HttpExporter(
+        cookies=browser.get_cookies(),
+        url_template=config.export_url_template,
+        concurrency=config.http_concurrency,
+        user_agent=browser.user_agent(),
+    )
+    browser.close()
+
+    log_section("EXPORTAÇÃO HTTP")
+    start_timer("http_export")
+    try:
+        saved, failed = exporter.export_all(videos, config.analytics_dir)
+    finally:
+        exporter.close()
+    log(f"CSVs exportados: {len(saved)} | falhas: {len(failed)}", LogType.SUCCESS, show_time=True, operation_name="http_export")
+
+    for video, csv_path in saved:
+        register_csv(video, video["name"], csv_path, config, state, progress)
+    for video, error in failed:
+        progress.mark_failed(f"video:{video['listing_name']}", error)
+        RUN_VIDEOS.inc(status="failed")
+
+    if failed:
+        raise Exception(f"{len(failed)} vídeo(s) não exportados: {failed[0][1]}")
+
+
+def run_worker(worker_id, config, state, progress, video_queue, videos_count, errors, session=None):
+    """
+    Consome vídeos da fila até esvaziá-la.
+
+    Cada worker usa a própria sessão de navegador (login feito uma única vez)
+    e o próprio diretório de download. Vídeos que falham são tentados novamente
+    com espera crescente; se todas as tentativas falharem, o vídeo é registrado
+    como falho e o worker segue para o próximo.
+    """
+    browser = None
+    try:
+        if session:
+            browser, download_dir = session
+        else:
+            browser, download_dir = open_session(worker_id, config)
+
+        while True:
+            try:
+                position, video = video_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            for attempt in range(1, config.video_retries + 1):
+                try:
+                    with log_context(video=video["listing_name"], attempt=attempt), span("video", video=video["listing_name"], attempt=attempt):
+                        process_video(browser, video, position, videos_count, download_dir, config, state, progress)
+                    break
+                except Exception as e:
+                    log(f"ERRO no vídeo {position} (tentativa {attempt}/{config.video_retries}): {str(e)}", LogType.ERROR, video=video["listing_name"])
+                    if attempt == config.video_retries:
+                        log(f"Vídeo {position} falhou após {attempt} tentativas. Seguindo para o próximo.", LogType.ERROR, video=video["listing_name"])
+                        progress.mark_failed(f"video:{video['listing_name']}", e)
+                        RUN_VIDEOS.inc(status="failed")
+                        break
+                    delay = config.retry_backoff * 2 ** (attempt - 1)
+                    log(f"Aguardando {delay:.0f}s antes de tentar novamente...", LogType.WARNING, indent_level=1)
+                    browser.wait(delay)
+    except Exception as e:
+        log(f"ERRO NO WORKER {worker_id}: {str(e)}", LogType.ERROR)
+        log(f"Detalhes: {traceback.format_exc()}", LogType.ERROR)
+        errors.append(e)
+    finally:
+        if browser:
+            loads = browser.page_load_summary()
+            log(f"Carregamentos de página do worker {worker_id}: {loads['count']} | média {loads['avg']:.2f}s | máximo {loads['max']:.2f}s", LogType.INFO)
+            browser.close()
+
+
+def run_pool(first_session, videos, config, state, progress):
+    """
+    Distribui os vídeos entre `config.workers` sessões de navegador em paralelo.
+
+    Returns:
+        int: Quantidade de workers utilizados
+    """
+    video_queue = queue.Queue()
+    for position, video in enumerate(videos, start=1):
+        video_queue.put((position, video))
+
+    workers = min(config.workers, max(len(videos), 1))
+    log(f"Distribuindo {len(videos)} vídeos entre {workers} worker(s)...", LogType.STEP)
+
+    errors = []
+    threads = []
+    for worker_id in range(workers):
+        # O contexto copiado mantém os spans dos vídeos dentro do span da execução
+        context = contextvars.copy_context()
+        thread = threading.Thread(
+            target=context.run,
+            name=f"worker-{worker_id}",
+            args=(run_worker, worker_id, config, state, progress, video_queue, len(videos), errors),
+            kwargs={"session": first_session if worker_id == 0 else None},
+        )
+        thread.start()
+        threads.append(thread)
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise Exception(f"{len(errors)} worker(s) falharam: {errors[0]}")
+    if progress.failed:
+        raise Exception(f"{len(progress.failed)} vídeo(s) falharam após as tentativas; serão retomados na próxima execução")
+    return workers
+
+
+def write_run_metrics(config, success, duration):
+    """Grava as métricas da execução no arquivo texto e, se configurado, no Pushgateway"""
+    for finished in finished_spans():
+        STEP_DURATION.observe(finished.duration, step=finished.path)
+    RUN_DURATION.set(duration)
+    RUN_SUCCESS.set(1 if success else 0)
+    RUN_TIMESTAMP.set(time.time())
+
+    write_textfile(metrics_registry, config.metrics_file)
+    log(f"Métricas salvas em: {config.metrics_file}", LogType.INFO)
+    if config.metrics_pushgateway:
+        try:
+            push(metrics_registry, config.metrics_pushgateway, job="vturb_bot")
+        except Exception as e:
+            log(f"Falha ao enviar as métricas ao Pushgateway: {str(e)}", LogType.WARNING)
+
+
+def backfill_dataset(config):
+    """Converte os CSVs já extraídos para o conjunto de dados colunar"""
+    log_section("BACKFILL DO CONJUNTO DE DADOS COLUNAR")
+    if not dataset.available():
+        log("pyarrow não está instalado; instale-o para gerar o conjunto de dados colunar.", LogType.ERROR)
+        return
+    if not os.path.isdir(config.analytics_dir):
+        log(f"Diretório {config.analytics_dir} não encontrado.", LogType.ERROR)
+        return
+
+    start_timer("backfill")
+    written = skipped = failed = 0
+    for video_name, csv_path, result in dataset.backfill(config.analytics_dir, config.dataset_dir):
+        if isinstance(result, Exception):
+            failed += 1
+            log(f"ERRO ao converter {csv_path}: {str(result)}", LogType.ERROR, indent_level=1)
+        elif result["written"]:
+            written += 1
+            log(f"'{video_name}': {format_number(result['rows'])} linhas gravadas em {result['path']}", LogType.SUCCESS, indent_level=1)
+        else:
+            skipped += 1
+    log(
+        f"Backfill concluído: {written} arquivo(s) convertido(s), {skipped} já existente(s), {failed} falha(s)",
+        LogType.SUCCESS, show_time=True, operation_name="backfill"
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.backfill_dataset:
+        load_dotenv()
+        backfill_dataset(Config(args))
+        return
 
-def main():
     # Início do programa
     start_timer("execucao_total")
     
@@ -26,380 +599,91 @@ def main():
     if not manager.should_execute():
         return
     
-    log_section(f"INICIANDO EXECUÇÃO EM {current_time()}")
+    # Span raiz: pastas, vídeos e etapas da execução ficam aninhados nele
+    with span("run"):
+        log_section(f"INICIANDO EXECUÇÃO EM {current_time()}")
     
-    try:
-        log("Carregando variáveis de ambiente...", LogType.STEP)
-        start_timer("env_loading")
-        load_dotenv()
-        log("Variáveis de ambiente carregadas", LogType.SUCCESS, show_time=True, operation_name="env_loading")
-
-        log("Inicializando o navegador...", LogType.STEP)
-        start_timer("browser_init")
-        browser = Browser(headless=True)
-        browser.open()
-        log("Navegador inicializado com sucesso", LogType.SUCCESS, show_time=True, operation_name="browser_init")
-
-        # Login
-        log("Navegando para a página de login...", LogType.STEP)
-        start_timer("login_process")
-        browser.visit('https://login.vturb.com/signin')
-
-        log("Preenchendo credenciais...", LogType.STEP, indent_level=1)
-        browser.find_element_by_xpath("//input[@name='email']").send_keys(os.getenv('EMAIL_LOGIN'))
-        browser.find_element_by_xpath("//input[@name='password']").send_keys(os.getenv('PASSWORD_LOGIN'))
-
-        log("Clicando no botão de login...", LogType.STEP, indent_level=1)
-        browser.find_element_by_xpath("//button[@type='button']").click()
-
-        # Verifica se já está logado
-        log("Aguardando página principal carregar...", LogType.STEP, indent_level=1)
-        browser.wait_for_element("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]")
-        browser.wait(3)
-        log("Login realizado com sucesso!", LogType.SUCCESS, show_time=True, operation_name="login_process")
-
-        # Conta quantas pastas existem de videos
-        log("Identificando pastas de vídeos...", LogType.STEP)
-        start_timer("folder_count")
-        all_folders = browser.find_elements_by_xpath("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]")
-        folder_count = len(all_folders)
-        log(f"Total de pastas encontradas: {folder_count}", LogType.SUCCESS, show_time=True, operation_name="folder_count")
-
-        # Exibe os textos de cada pasta encontrada
-        log("Listagem de pastas:", LogType.INFO)
-        for idx, folder_el in enumerate(all_folders):
-            try:
-                folder_text = folder_el.text.replace("\n", " - ")
-                views_downloads = folder_text.split(" ")[-2:]
-                views = format_number(views_downloads[-2])
-                downloads = format_number(views_downloads[-1])
-                folder_name = " ".join(folder_text.split(" ")[:-2])
-                log(f"Pasta {idx+1}/{folder_count}: {folder_name}", LogType.INFO, indent_level=1)
-            except:
-                folder_text = "N/A"
-                log(f"Pasta {idx+1}/{folder_count}: {folder_text}", LogType.INFO, indent_level=1)
-
-        # Itera sobre todas as pastas que encontrar
-        for index in range(folder_count):
-            log_section(f"PROCESSANDO PASTA {index+1} DE {folder_count}")
-            
-            # Esperando a pagina carregar o elemento
-            log("Aguardando carregamento da lista de pastas...", LogType.STEP)
-            start_timer("folder_load")
-            browser.wait_for_element("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]")
-            log("Lista de pastas carregada", LogType.SUCCESS, show_time=True, operation_name="folder_load")
-
-            # Mostra quantas pastas ainda existem nesse momento
-            current_folders = browser.find_elements_by_xpath("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]")
-            log(f"Pastas disponíveis no momento: {len(current_folders)}", LogType.INFO)
-
-            # Tenta exibir o texto de cada pasta novamente
-            log("Pastas atuais:", LogType.INFO)
-            for i, f_el in enumerate(current_folders):
-                try: 
-                    txt = f_el.text.replace("\n", " - ")
-                    parts = txt.split(" ")
-                    if len(parts) >= 2:
-                        views_downloads = parts[-2:]
-                        views = format_number(views_downloads[-2])
-                        downloads = format_number(views_downloads[-1])
-                        folder_name = " ".join(parts[:-2])
-                        log(f"Pasta {i+1}: '{folder_name}'", LogType.INFO, indent_level=1)
-                    else:
-                        log(f"Pasta {i+1}: '{txt}'", LogType.INFO, indent_level=1)
-                except:
-                    txt = "N/A"
-                    log(f"Pasta {i+1}: '{txt}'", LogType.INFO, indent_level=1)
-
-            try:
-                current_folder = current_folders[index]
-                log(f"Selecionando pasta com índice [{index}]...", LogType.STEP)
-            except IndexError:
-                log(f"Não existe pasta com índice [{index}]. Encerrando processamento de pastas.", LogType.ERROR)
-                break
-
-            # Mostra o texto do folder selecionado
-            try:
-                cf_text = current_folder.text.replace("\n", " - ")
-                log(f"Pasta selecionada: '{cf_text}'", LogType.SUCCESS)
-            except:
-                cf_text = "N/A"
-                log(f"Não foi possível obter o texto da pasta selecionada.", LogType.WARNING)
-
-            log("Clicando duas vezes na pasta...", LogType.STEP)
-            start_timer("folder_click")
-            current_folder.click()
-            log("Clique duplo realizado", LogType.SUCCESS, show_time=True, operation_name="folder_click")
-
-            # Verifica se existe videos dentro da pasta
-            log("Verificando se existem vídeos dentro da pasta...", LogType.STEP)
-            start_timer("video_check")
-            video = browser.wait_for_element("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]", timeout=2)
-            if not video:
-                log("Nenhum vídeo encontrado na pasta. Voltando para a lista de pastas.", LogType.WARNING, show_time=True, operation_name="video_check")
-                browser.visit('https://app.vturb.com/folders')
-                continue
+        config = None
+        progress = None
+        succeeded = False
+        for status in ("processed", "skipped", "failed"):
+            RUN_VIDEOS.set(0, status=status)
+        try:
+            log("Carregando variáveis de ambiente...", LogType.STEP)
+            start_timer("env_loading")
+            load_dotenv()
+            config = Config(args)
+            set_log_level(config.log_level)
+            log("Variáveis de ambiente carregadas", LogType.SUCCESS, show_time=True, operation_name="env_loading")
+
+            state = VideoStateStore()
+            progress = manager.start_run()
+            if progress.resumed:
+                log(f"Retomando execução interrompida ({len(progress.done)} itens já concluídos)...", LogType.INFO)
+            if config.columnar and not dataset.available():
+                log("pyarrow não está instalado: apenas os CSVs brutos serão gravados.", LogType.WARNING)
+                config.columnar = False
+            if config.force_full:
+                log("Extração completa solicitada: o estado das extrações anteriores será ignorado.", LogType.INFO)
+
+            # A primeira sessão descobre as pastas e os vídeos e depois atua como worker 0
+            first_session = open_session(0, config)
+            folder_count = discover_folders(first_session[0])
+
+            log_section("DESCOBERTA DE VÍDEOS")
+            start_timer("discovery")
+            videos = discover_videos(first_session[0], folder_count, config, state, progress)
+            log(f"Vídeos a processar: {len(videos)}", LogType.SUCCESS, show_time=True, operation_name="discovery")
+
+            if config.export_mode == "http":
+                run_http_export(first_session[0], videos, config, state, progress)
             else:
-                log("Vídeos encontrados na pasta!", LogType.SUCCESS, show_time=True, operation_name="video_check")
-
-            # Pega a quantidade de videos dentro da pasta
-            videos_in_pasta = browser.find_elements_by_xpath("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]")
-            videos_count = len(videos_in_pasta)
-            log(f"Total de vídeos na pasta: {videos_count}", LogType.INFO)
-
-            # Lista os vídeos encontrados
-            log("Vídeos disponíveis:", LogType.INFO)
-            for idxv, vid_el in enumerate(videos_in_pasta):
-                try:
-                    vid_text = vid_el.text.replace("\n", " - ")
-                    views_downloads = vid_text.split(" ")[-2:]
-                    views = format_number(views_downloads[-2])
-                    downloads = format_number(views_downloads[-1])
-                    video_name = " ".join(vid_text.split(" ")[:-2])
-                    log(f"Vídeo {idxv+1}/{videos_count}: {video_name}", LogType.INFO, indent_level=1)
-                except:
-                    vid_text = "N/A"
-                    log(f"Vídeo {idxv+1}/{videos_count}: '{vid_text}'", LogType.INFO, indent_level=1)
-
-            # Itera sobre todos os videos que encontrar
-            for video_index in range(videos_count):
-                log_section(f"PROCESSANDO VÍDEO {video_index+1} DE {videos_count}", level=2)
-
-                # Re-coleta a lista de vídeos
-                log("Atualizando lista de vídeos disponíveis...", LogType.STEP)
-                browser.wait(3)
-                updated_videos = browser.find_elements_by_xpath("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]")
-                log(f"Vídeos disponíveis no momento: {len(updated_videos)}", LogType.INFO)
-
-                # Tenta mostrar o texto de cada video de novo
-                log("Vídeos atuais:", LogType.INFO)
-                for i2, uv in enumerate(updated_videos):
-                    try:
-                        uv_text = uv.text.replace("\n", " - ")
-                        parts = uv_text.split(" ")
-                        if len(parts) >= 2:
-                            views_downloads = parts[-2:]
-                            video_name = " ".join(parts[:-2])
-                            log(f"Vídeo {i2+1}: '{video_name}'", LogType.INFO, indent_level=1)
-                        else:
-                            log(f"Vídeo {i2+1}: '{uv_text}'", LogType.INFO, indent_level=1)
-                    except:
-                        uv_text = "N/A"
-                        log(f"Vídeo {i2+1}: '{uv_text}'", LogType.INFO, indent_level=1)
-
-                try:
-                    video_current = updated_videos[video_index]
-                    log(f"Selecionando vídeo com índice [{video_index}]...", LogType.STEP)
-                except IndexError:
-                    log(f"Não existe vídeo com índice [{video_index}]. Pulando para o próximo vídeo.", LogType.ERROR)
-                    continue
-
-                # Mostra texto do vídeo selecionado
-                try:
-                    vc_text = video_current.text.replace("\n", " - ")
-                    log(f"Vídeo selecionado: '{vc_text}'", LogType.SUCCESS)
-                except:
-                    vc_text = "N/A"
-                    log("Não foi possível obter o texto do vídeo selecionado.", LogType.WARNING)
-
-                log("Clicando duas vezes no vídeo...", LogType.STEP)
-                start_timer("video_click")
-                video_current.click()
-                browser.wait(2)
-                log("Clique duplo realizado", LogType.SUCCESS, show_time=True, operation_name="video_click")
-
-                # Verifica se entrou no video, caso não tenta de novo
-                log("Verificando se a página do vídeo foi carregada...", LogType.STEP)
-                start_timer("video_page")
-                analytics_element = browser.wait_for_element("//a[contains(@href, 'analytics')]", timeout=3)
-                if not analytics_element:
-                    log("Falha ao acessar a página do vídeo. Tentando clicar novamente...", LogType.WARNING)
-                    try:
-                        video_current = browser.find_elements_by_xpath("//tr[td[contains(@title, 'VSL') and contains(@title, 'IA')]]")[video_index]
-                        video_current.click()
-                        log("Clique duplo realizado novamente.", LogType.INFO, indent_level=1)
-                    except:
-                        log("Falha ao tentar clicar no vídeo pela segunda vez.", LogType.ERROR, indent_level=1)
-                    browser.wait(2)
-                else:
-                    log("Página do vídeo carregada com sucesso!", LogType.SUCCESS, show_time=True, operation_name="video_page")
-
-                # acessa a pagina de analise do video
-                log("Tentando acessar a página de analytics...", LogType.STEP)
-                start_timer("analytics_page")
-                analytics_element = browser.wait_for_element("//a[contains(@href, 'analytics')]", timeout=3)
-                if analytics_element:
-                    analytics_element.click()
-                    log("Navegando para a página de analytics.", LogType.SUCCESS)
-                else:
-                    log("Elemento de analytics não encontrado.", LogType.ERROR)
-                    end_timer("analytics_page")
-
-                # verifica se a pagina de analise entrou
-                log("Verificando se a página de analytics foi carregada...", LogType.STEP, indent_level=1)
-                traffic_element = browser.wait_for_element("//a[contains(@href, 'traffic')]", timeout=3)
-                if not traffic_element:
-                    log("Falha ao carregar a página de analytics. Tentando novamente...", LogType.WARNING, indent_level=1)
-                    if analytics_element:
-                        analytics_element.click()
-                        log("Clique em analytics realizado novamente.", LogType.INFO, indent_level=2)
-                    browser.wait(2)
-                else:
-                    log("Página de analytics carregada com sucesso!", LogType.SUCCESS, show_time=True, operation_name="analytics_page", indent_level=1)
-                
-                # acessa a pagina de analise de trafego do video
-                log("Tentando acessar a página de tráfego...", LogType.STEP)
-                start_timer("traffic_page")
-                traffic_element = browser.wait_for_element("//a[contains(@href, 'traffic')]", timeout=3)
-                if traffic_element:
-                    traffic_element.click()
-                    log("Navegando para a página de tráfego.", LogType.SUCCESS)
-                else:
-                    log("Elemento de tráfego não encontrado.", LogType.ERROR)
-                    end_timer("traffic_page")
-
-                # verifica se entrou na pagina de trafego
-                log("Verificando se a página de tráfego foi carregada...", LogType.STEP, indent_level=1)
-                utm_dropdown_element = browser.wait_for_element("//button[@role='combobox'][1]")
-                if not utm_dropdown_element and traffic_element:
-                    log("Falha ao carregar a página de tráfego. Tentando novamente...", LogType.WARNING, indent_level=1)
-                    traffic_element.click()
-                    browser.wait(2)
-                else:
-                    log("Página de tráfego carregada com sucesso!", LogType.SUCCESS, show_time=True, operation_name="traffic_page", indent_level=1)
-                
-                # abre o dropdown e seleciona a opção utm_content
-                browser.wait(5)
-                log("Tentando abrir o dropdown de UTM...", LogType.STEP)
-                start_timer("utm_dropdown")
-                try:
-                    cb = browser.wait_for_element("//button[@role='combobox'][1]")
-                    if cb:
-                        cb.click()
-                        log("Dropdown de UTM aberto com sucesso.", LogType.SUCCESS, show_time=True, operation_name="utm_dropdown")
-                    else:
-                        log("Dropdown não encontrado pelo wait_for_element. Tentando com find_element_by_xpath...", LogType.WARNING)
-                        browser.find_element_by_xpath("//button[@role='combobox'][1]").click()
-                        log("Dropdown de UTM aberto via find_element_by_xpath.", LogType.SUCCESS)
-                    browser.wait(1)
-                except Exception as e:
-                    log(f"ERRO ao tentar abrir o dropdown de UTM: {str(e)}", LogType.ERROR)
-                    try:
-                        browser.find_element_by_xpath("//button[@role='combobox'][1]").click()
-                        log("Segunda tentativa de abrir o dropdown realizada.", LogType.INFO)
-                    except:
-                        log("Falha na segunda tentativa de abrir o dropdown.", LogType.ERROR)
-                        raise Exception(f"ERRO ao selecionar o dropdown: {str(e)}")
-
-                # clica em utm_content
-                log("Tentando selecionar a opção utm_content...", LogType.STEP)
-                start_timer("utm_select")
-                try:
-                    browser.find_element_by_xpath("//span[contains(., 'utm_content')]").click()
-                    log("Opção utm_content selecionada com sucesso.", LogType.SUCCESS, show_time=True, operation_name="utm_select")
-                except Exception as e:
-                    log(f"ERRO ao selecionar utm_content: {str(e)}", LogType.ERROR)
-                    raise Exception(f"ERRO ao selecionar utm_content: {str(e)}")
-
-                browser.wait(2)
-                
-                # clica no dropdown para escolher a opção da extensão do arquivo para download
-                log("Tentando abrir o menu de download de métricas...", LogType.STEP)
-                start_timer("download_menu")
-                try:
-                    browser.wait_for_element("//button[strong[contains(text(), 'Baixar Métricas') or contains(text(), 'Download Metrics')]]").click()
-                    log("Menu de 'Baixar Métricas' aberto com sucesso.", LogType.SUCCESS, show_time=True, operation_name="download_menu")
-                except Exception as e:
-                    log(f"ERRO ao abrir menu de 'Baixar Métricas': {str(e)}", LogType.ERROR)
-
-                browser.wait(1)
-                log("Tentando selecionar a opção CSV...", LogType.STEP)
-                start_timer("csv_select")
-                try:
-                    browser.wait_for_element("//button[.//span[contains(text(), 'CSV')]]").click()
-                    log("Opção CSV selecionada. Iniciando download.", LogType.SUCCESS, show_time=True, operation_name="csv_select")
-                except Exception as e:
-                    log(f"ERRO ao selecionar opção CSV: {str(e)}", LogType.ERROR)
-
-                log("Aguardando conclusão do download...", LogType.STEP)
-                start_timer("download")
-                browser.wait(4)
-                log("Tempo de espera para download concluído", LogType.SUCCESS, show_time=True, operation_name="download")
-
-                # pega o nome do video
-                log("Obtendo o nome do vídeo para organizar os arquivos...", LogType.STEP)
-                try:
-                    folder_name_el = browser.find_element_by_xpath("//span[contains(@title, 'VSL IA')]")
-                    folder_name = folder_name_el.text
-                    log(f"Nome do vídeo obtido: '{folder_name}'", LogType.SUCCESS)
-                except Exception as e:
-                    folder_name = "VIDEO_NAME_NOT_FOUND"
-                    log(f"ERRO ao obter o nome do vídeo: {str(e)}", LogType.ERROR)
-
-                log(f"Movendo arquivos CSV para a pasta ./analytics/{folder_name}...", LogType.STEP)
-                start_timer("move_files")
-                try:
-                    move_csv_files(
-                        source_folder="/home/samuel/Downloads",
-                        destination_folder=f"./analytics/{folder_name}"
-                    )
-                    log("Arquivos CSV movidos com sucesso.", LogType.SUCCESS, show_time=True, operation_name="move_files")
-                except Exception as e:
-                    log(f"ERRO ao mover arquivos CSV: {str(e)}", LogType.ERROR)
-                
-                # volta as paginas necessarias para começar o loop outra vez
-                log("Retornando para a lista de vídeos (history.go(-3))...", LogType.STEP)
-                start_timer("return_navigation")
-                browser.driver.execute_script("window.history.go(-3)")
-                browser.wait(2)
-
-                # se ainda encontrar analytics, volta -1
-                log("Verificando se retornou corretamente...", LogType.STEP)
-                if (
-                    browser.wait_for_element("//a[contains(@href, 'analytics')]", timeout=3) 
-                    and 
-                    browser.wait_for_element("//button[.//span[contains(text(), 'Download')]]", timeout=3)
-                ):
-                    log("Ainda na página de analytics. Voltando mais uma vez (history.go(-1))...", LogType.WARNING)
-                    browser.driver.execute_script("window.history.go(-1)")
-                    browser.wait(2)
-                else:
-                    log("Retorno para a lista de vídeos realizado com sucesso.", LogType.SUCCESS, show_time=True, operation_name="return_navigation")
-
-                log(f"VÍDEO {video_index+1} PROCESSADO COM SUCESSO!", LogType.SUCCESS)
-
-            # volta para a pagina de pastas para iniciar mais uma pasta na lista
-            log("Retornando para a página principal de pastas...", LogType.STEP)
-            start_timer("return_to_folders")
-            browser.visit('https://app.vturb.com/folders')
-            log("Retorno para página principal realizado com sucesso", LogType.SUCCESS, show_time=True, operation_name="return_to_folders")
-            log(f"PASTA {index+1} PROCESSADA COM SUCESSO!", LogType.SUCCESS)
-
-        # Finalização
-        log_section("RESUMO DA EXECUÇÃO")
-        total_time = end_timer("execucao_total")
-        hours, remainder = divmod(total_time, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        time_format = f"{int(hours):02d}h {int(minutes):02d}m {int(seconds):02d}s"
-
-        log(f"Tempo total de execução: {time_format}", LogType.SUCCESS)
-        log(f"Pastas processadas: {folder_count}", LogType.INFO)
-        log(f"Log completo salvo em: {get_log_filename()}", LogType.INFO)
-        log("EXECUÇÃO FINALIZADA COM SUCESSO!", LogType.SUCCESS)
+                if videos and not config.traffic_url_template:
+                    learn_traffic_template(first_session[0], videos[0], config)
+                workers = run_pool(first_session, videos, config, state, progress)
+
+            # Finalização
+            log_section("RESUMO DA EXECUÇÃO")
+            total_time = end_timer("execucao_total")
+            hours, remainder = divmod(total_time, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            time_format = f"{int(hours):02d}h {int(minutes):02d}m {int(seconds):02d}s"
+
+            log(f"Tempo total de execução: {time_format}", LogType.SUCCESS)
+            log(f"Pastas processadas: {folder_count}", LogType.INFO)
+            log(f"Vídeos processados: {len(videos)}", LogType.INFO)
+            if config.export_mode == "http":
+                log("Modo de exportação: http", LogType.INFO)
+            else:
+                log(f"Workers utilizados: {workers}", LogType.INFO)
+            log(f"Log completo salvo em: {get_log_filename()}", LogType.INFO)
+            log("EXECUÇÃO FINALIZADA COM SUCESSO!", LogType.SUCCESS)
         
-        # Registra execução bem-sucedida
-        manager.register_execution(success=True)
+            # Registra execução bem-sucedida
+            manager.finish_run(progress, success=True)
+            succeeded = True
         
-        # Fecha o navegador
-        browser.close()
+        except Exception as e:
+            log(f"ERRO CRÍTICO NA EXECUÇÃO: {str(e)}", LogType.ERROR)
+            log(f"Detalhes: {traceback.format_exc()}", LogType.ERROR)
         
-    except Exception as e:
-        log(f"ERRO CRÍTICO NA EXECUÇÃO: {str(e)}", LogType.ERROR)
-        log(f"Detalhes: {traceback.format_exc()}", LogType.ERROR)
-        
-        # Registra execução mal-sucedida
-        manager.register_execution(success=False)
+            # Registra execução mal-sucedida; os checkpoints permitem retomá-la depois
+            if progress:
+                manager.finish_run(progress, success=False)
+            else:
+                manager.register_execution(success=False)
+
+    report_path, report = write_report(current_time(), export_mode=config.export_mode if config else None)
+    log(f"Relatório de desempenho salvo em: {report_path}", LogType.INFO)
+    if config:
+        write_run_metrics(config, succeeded, report["steps"]["run"]["total"])
+    for path, comparison in report.get("comparison", {}).items():
+        if comparison["regression"]:
+            log(
+                f"Regressão de desempenho em '{path}': p95 {comparison['previous_p95']:.2f}s -> {comparison['p95']:.2f}s",
+                LogType.WARNING
+            )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
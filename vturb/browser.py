@@ -1,4 +1,9 @@
+import os
+import json
 import time
+import tempfile
+import threading
+from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
@@ -6,31 +11,225 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import (
+    TimeoutException, StaleElementReferenceException, JavascriptException,
+    SessionNotCreatedException, WebDriverException
+)
 from selenium.webdriver.common.action_chains import ActionChains
 
+from logger import log, LogType
+from tracing import start_span, finish_span
+
+# Recursos bloqueados no modo enxuto: imagens, fontes, mídia dos players e rastreadores de terceiros
+LEAN_BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8", "*.ts", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*",
+    "*intercom.io*", "*intercomcdn.com*", "*sentry.io*", "*segment.io*", "*mixpanel.com*",
+]
+
+# Tempos da navegação atual (Navigation Timing API), em milissegundos
+NAVIGATION_TIMING_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+if (!nav) { return null; }
+return {timeOrigin: performance.timeOrigin, domContentLoaded: nav.domContentLoadedEventEnd, load: nav.loadEventEnd};
+"""
+
+# Cache do caminho do chromedriver, para não consultar o webdriver-manager a cada execução
+DRIVER_CACHE_PATH = "./.driver_cache.json"
+_driver_lock = threading.Lock()
+
+# Script que instala (uma única vez por página) os contadores usados pelas condições de prontidão:
+# requisições fetch/XHR em andamento e instante da última mutação no DOM
+READINESS_HOOKS_SCRIPT = """
+if (!window.__vturbHooks) {
+    window.__vturbHooks = true;
+    window.__vturbPending = 0;
+    window.__vturbLastMutation = performance.now();
+
+    new MutationObserver(function () {
+        window.__vturbLastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            window.__vturbPending++;
+            return originalFetch.apply(this, arguments).finally(function () {
+                window.__vturbPending--;
+            });
+        };
+    }
+
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__vturbPending++;
+        this.addEventListener('loadend', function () { window.__vturbPending--; });
+        return originalSend.apply(this, arguments);
+    };
+}
+return {
+    readyState: document.readyState,
+    pending: window.__vturbPending,
+    resources: performance.getEntriesByType('resource').length,
+    sinceMutation: performance.now() - window.__vturbLastMutation
+};
+"""
+
+# Extrai, em uma única chamada, os dados de todas as linhas que casam com o XPath
+SCRAPE_ROWS_SCRIPT = """
+var snapshot = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var rows = [];
+for (var i = 0; i < snapshot.snapshotLength; i++) {
+    var row = snapshot.snapshotItem(i);
+    var link = row.querySelector('a[href]');
+    var titled = row.querySelector('[title]');
+    rows.push({
+        element: row,
+        text: row.innerText,
+        cells: Array.prototype.map.call(row.querySelectorAll('td'), function (td) { return td.innerText.trim(); }),
+        title: titled ? titled.getAttribute('title') : null,
+        id: row.getAttribute('data-id') || row.getAttribute('data-row-key') || row.id || null,
+        href: link ? link.href : null
+    });
+}
+return rows;
+"""
+
+
+def _readiness_state(driver):
+    return driver.execute_script(READINESS_HOOKS_SCRIPT)
+
+
+class element_clickable:
+    """Condição: elemento localizado pelo XPath está visível e habilitado"""
+    def __init__(self, xpath):
+        self.condition = EC.element_to_be_clickable((By.XPATH, xpath))
+
+    def __call__(self, driver):
+        return self.condition(driver)
+
+
+class navigated_away:
+    """
+    Condição: a página saiu do estado em que `element` foi clicado (a URL mudou
+    ou o elemento foi removido do DOM). Evita ler a página anterior logo após
+    um clique que dispara navegação.
+    """
+    def __init__(self, element, previous_url):
+        self.stale = EC.staleness_of(element)
+        self.previous_url = previous_url
+
+    def __call__(self, driver):
+        return driver.current_url != self.previous_url or self.stale(driver)
+
+
+class network_idle:
+    """
+    Condição: documento carregado, nenhuma requisição fetch/XHR em andamento e
+    nenhum recurso novo carregado durante `idle_time` segundos.
+    """
+    def __init__(self, idle_time=0.5):
+        self.idle_time = idle_time
+        self.last_resources = None
+        self.idle_since = None
+
+    def __call__(self, driver):
+        state = _readiness_state(driver)
+        now = time.monotonic()
+        busy = state["readyState"] != "complete" or state["pending"] > 0
+        if busy or state["resources"] != self.last_resources:
+            self.last_resources = state["resources"]
+            self.idle_since = None if busy else now
+            return False
+        if self.idle_since is None:
+            self.idle_since = now
+        return now - self.idle_since >= self.idle_time
+
+
+class dom_stable:
+    """Condição: nenhuma mutação no DOM durante `quiet_time` segundos"""
+    def __init__(self, quiet_time=0.3):
+        self.quiet_time = quiet_time
+
+    def __call__(self, driver):
+        return _readiness_state(driver)["sinceMutation"] >= self.quiet_time * 1000
+
+
+def _cached_driver_path():
+    try:
+        with open(DRIVER_CACHE_PATH, "r") as f:
+            path = json.load(f).get("path")
+    except (OSError, ValueError):
+        return None
+    return path if path and os.access(path, os.X_OK) else None
+
+
+def resolve_driver_path(refresh=False):
+    """
+    Caminho do chromedriver: CHROMEDRIVER_PATH, o caminho em cache ou, se
+    necessário, o resolvido pelo webdriver-manager (que é então gravado no cache).
+    """
+    if os.getenv("CHROMEDRIVER_PATH"):
+        return os.getenv("CHROMEDRIVER_PATH")
+
+    with _driver_lock:
+        path = None if refresh else _cached_driver_path()
+        if not path:
+            path = ChromeDriverManager().install()
+            with open(DRIVER_CACHE_PATH, "w") as f:
+                json.dump({"path": path}, f)
+        return path
+
 
 class Browser:
-    def __init__(self, headless=False, download_path="/home/samuel/Downloads"):
+    def __init__(self, headless=False, download_path="/home/samuel/Downloads", user_data_dir=None, cookies_path=None, lean=False):
         self.headless = headless
+        self.lean = lean
         self.driver = None
+        self.download_path = download_path
+        self.cookies_path = cookies_path
+        self.page_loads = []
         self.options = Options()
         if self.headless:
             self.options.add_argument("--headless")
+        if self.lean:
+            # Não espera imagens/subrecursos: a página é utilizável após o DOMContentLoaded
+            self.options.page_load_strategy = "eager"
+            for argument in (
+                "--disable-extensions", "--disable-gpu", "--disable-dev-shm-usage",
+                "--blink-settings=imagesEnabled=false", "--mute-audio",
+                "--autoplay-policy=user-gesture-required", "--window-size=1920,1080",
+            ):
+                self.options.add_argument(argument)
+        if user_data_dir:
+            # Perfil persistente: mantém cookies e cache entre execuções
+            os.makedirs(user_data_dir, exist_ok=True)
+            self.options.add_argument(f"--user-data-dir={os.path.abspath(user_data_dir)}")
             
-        self.options.add_experimental_option("prefs", {
+        prefs = {
             "download.default_directory": download_path,
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
             "safebrowsing.enabled": True
-        })
+        }
+        if self.lean:
+            prefs["profile.managed_default_content_settings.images"] = 2
+        self.options.add_experimental_option("prefs", prefs)
 
     def open(self):
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=self.options
-        )
-        self.driver.maximize_window()
+        try:
+            self.driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=self.options)
+        except SessionNotCreatedException:
+            # Driver em cache incompatível com o Chrome instalado: resolve novamente
+            self.driver = webdriver.Chrome(service=Service(resolve_driver_path(refresh=True)), options=self.options)
+        if self.lean:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URL_PATTERNS})
+        else:
+            self.driver.maximize_window()
         return self.driver
 
     def close(self):
@@ -46,6 +245,74 @@ class Browser:
         except TimeoutException:
             return None
 
+    def wait_until(self, *conditions, timeout=10, poll_frequency=0.1):
+        """
+        Aguarda até que todas as condições sejam verdadeiras ao mesmo tempo.
+        Retorna o valor da última condição, ou None se o tempo esgotar.
+        """
+        def all_ready(driver):
+            result = True
+            for condition in conditions:
+                result = condition(driver)
+                if not result:
+                    return False
+            return result
+
+        try:
+            return WebDriverWait(
+                self.driver, timeout, poll_frequency=poll_frequency,
+                ignored_exceptions=(StaleElementReferenceException, JavascriptException)
+            ).until(all_ready)
+        except TimeoutException:
+            return None
+
+    def wait_for_clickable(self, xpath, timeout=10):
+        return self.wait_until(element_clickable(xpath), timeout=timeout)
+
+    def click_and_wait_for_navigation(self, element, timeout=10):
+        """
+        Clica no elemento e aguarda a navegação disparada pelo clique.
+
+        Returns:
+            bool: True se a página mudou dentro do tempo limite
+        """
+        previous_url = self.driver.current_url
+        previous_origin = self._navigation_timing().get("timeOrigin")
+        page_span = start_span("click_navigation", url=previous_url)
+        start = time.perf_counter()
+        element.click()
+        navigated = bool(self.wait_until(navigated_away(element, previous_url), timeout=timeout))
+        if navigated:
+            # Navegação com documento novo: aguarda o carregamento, como o driver.get faz
+            self.wait_until(lambda driver: driver.execute_script("return document.readyState") == "complete", timeout=timeout)
+        elapsed = time.perf_counter() - start
+        timing = self._navigation_timing()
+        if timing.get("timeOrigin") == previous_origin:
+            # Mesma página (navegação interna da aplicação): os tempos do documento não se aplicam
+            timing = {}
+        self._record_page_load(page_span, self.driver.current_url, "click", elapsed, timing, error=not navigated)
+        return navigated
+
+    def wait_for_network_idle(self, idle_time=0.5, timeout=10):
+        return self.wait_until(network_idle(idle_time), timeout=timeout)
+
+    def wait_for_dom_stable(self, quiet_time=0.3, timeout=10):
+        return self.wait_until(dom_stable(quiet_time), timeout=timeout)
+
+    def wait_for_page_ready(self, timeout=10):
+        """Rede ociosa e DOM estável: a página terminou de renderizar o que precisava"""
+        return self.wait_until(network_idle(), dom_stable(), timeout=timeout)
+
+    def scrape_rows(self, xpath):
+        """
+        Lê todas as linhas que casam com o XPath em uma única chamada ao navegador.
+
+        Returns:
+            list: Um dict por linha com "element" (WebElement, para clicar), "text",
+            "cells", "title", "id" e "href"
+        """
+        return self.driver.execute_script(SCRAPE_ROWS_SCRIPT, xpath) or []
+
     def double_click(self, element):
         ActionChains(self.driver).double_click(element).perform()
     
@@ -56,7 +323,114 @@ class Browser:
         return self.driver.find_elements(By.XPATH, element)
     
     def visit(self, url):
-        self.driver.get(url)
+        """
+        Abre a URL e registra o tempo de carregamento.
+
+        Returns:
+            float: Tempo, em segundos, até o navegador devolver o controle
+        """
+        page_span = start_span("page_load", url=url)
+        start = time.perf_counter()
+        try:
+            self.driver.get(url)
+        except BaseException:
+            finish_span(page_span, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        self._record_page_load(page_span, url, "visit", elapsed, self._navigation_timing())
+        return elapsed
+
+    def _navigation_timing(self):
+        try:
+            return self.driver.execute_script(NAVIGATION_TIMING_SCRIPT) or {}
+        except (JavascriptException, WebDriverException):
+            return {}
+
+    def _record_page_load(self, page_span, url, kind, elapsed, timing, error=False):
+        """
+        Registra um carregamento de página (visit ou clique que navega): no
+        resumo do worker, como span no relatório de desempenho e no log.
+        """
+        load = {
+            "url": url,
+            "kind": kind,
+            "elapsed": elapsed,
+            "dom_content_loaded": timing.get("domContentLoaded"),
+            "load": timing.get("load"),
+        }
+        self.page_loads.append(load)
+        page_span.attrs.update(url=url, dom_content_loaded=load["dom_content_loaded"], load=load["load"])
+        finish_span(page_span, error=error)
+        milestones = "".join(
+            f" | {label} {value / 1000:.2f}s"
+            for label, value in (("DOMContentLoaded", load["dom_content_loaded"]), ("load", load["load"]))
+            if value
+        )
+        log(f"Página carregada ({kind}) em {elapsed:.2f}s{milestones}: {url}", LogType.DEBUG, indent_level=1, url=url, elapsed=round(elapsed, 3))
+
+    def page_load_summary(self):
+        """
+        Resumo dos carregamentos de página (visit() e cliques que navegam).
+
+        Returns:
+            dict: Quantidade, média e máximo (em segundos)
+        """
+        times = [load["elapsed"] for load in self.page_loads]
+        if not times:
+            return {"count": 0, "avg": 0.0, "max": 0.0}
+        return {"count": len(times), "avg": sum(times) / len(times), "max": max(times)}
+
+    def save_cookies(self):
+        """Grava os cookies da sessão atual no arquivo de cookies, se configurado"""
+        if not self.cookies_path:
+            return
+        cookies = self.driver.get_cookies()
+        # Vários workers podem refazer o login ao mesmo tempo: cada um grava em um temporário próprio
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cookies_path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(cookies, f)
+            os.replace(temp_path, self.cookies_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def load_cookies(self, url):
+        """
+        Restaura os cookies salvos para o domínio de `url`.
+
+        Returns:
+            bool: True se algum cookie foi restaurado
+        """
+        if not self.cookies_path or not os.path.exists(self.cookies_path):
+            return False
+        with open(self.cookies_path, "r") as f:
+            cookies = json.load(f)
+
+        # O Selenium só aceita cookies do domínio da página atual
+        self.visit(url)
+        host = urlparse(self.driver.current_url).hostname or ""
+        restored = 0
+        for cookie in cookies:
+            domain = (cookie.get("domain") or "").lstrip(".")
+            if domain and not host.endswith(domain):
+                continue
+            if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+                cookie.pop("sameSite", None)
+            try:
+                self.driver.add_cookie(cookie)
+                restored += 1
+            except WebDriverException:
+                continue
+        return restored > 0
+
+    def get_cookies(self):
+        """Cookies da sessão atual, para reaproveitar a autenticação fora do navegador"""
+        return self.driver.get_cookies()
+
+    def user_agent(self):
+        return self.driver.execute_script("return navigator.userAgent")
 
     def wait(self, seconds):
-        time.sleep(seconds)
\ No newline at end of file
+        time.sleep(seconds)
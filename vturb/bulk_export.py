@@ -0,0 +1,112 @@
+import io
+import csv
+import json
+import time
+import zipfile
+
+# Tamanho aproximado de cada pedaço enviado ao cliente
+CHUNK_SIZE = 64 * 1024
+
+
+class _StreamBuffer:
+    """
+    Destino de escrita do zipfile que apenas acumula os bytes gerados, para
+    que sejam repassados ao cliente e descartados a cada pedaço. Sem `seek`/`tell`,
+    o zipfile grava os tamanhos em descritores após cada arquivo.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(entries):
+    """
+    Gera um zip com o CSV de cada vídeo (`<vídeo>/<arquivo>.csv`), pedaço a
+    pedaço, sem montar o arquivo inteiro em memória.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry in entries:
+            info = zipfile.ZipInfo(
+                f"{entry['name']}/{entry['file']}",
+                date_time=time.localtime(entry["mtime"])[:6],
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(entry["path"], "rb") as source, archive.open(info, "w", force_zip64=True) as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    target.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
+
+
+def read_header(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def iter_records(entries):
+    """Linhas de todos os CSVs, como (nome do vídeo, cabeçalho, linha)"""
+    for entry in entries:
+        with open(entry["path"], "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            for row in reader:
+                yield entry["name"], header, row
+
+
+def iter_csv(entries):
+    """
+    Gera um único CSV com a coluna `video` seguida da união das colunas de
+    todos os arquivos (apenas os cabeçalhos são lidos antes de começar).
+    """
+    entries = list(entries)
+    columns = list(dict.fromkeys(column for entry in entries for column in read_header(entry["path"])))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["video"] + columns)
+    for name, header, row in iter_records(entries):
+        record = dict(zip(header, row))
+        writer.writerow([name] + [record.get(column, "") for column in columns])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(entries):
+    """Gera um objeto JSON por linha de CSV, com o nome do vídeo em `video`"""
+    lines, size = [], 0
+    for name, header, row in iter_records(entries):
+        line = json.dumps({**dict(zip(header, row)), "video": name}, ensure_ascii=False) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(lines).encode("utf-8")
+            lines, size = [], 0
+    yield "".join(lines).encode("utf-8")
+
+
+# Formato -> (gerador, tipo de mídia, nome do arquivo baixado)
+EXPORT_FORMATS = {
+    "zip": (iter_zip, "application/zip", "analytics.zip"),
+    "csv": (iter_csv, "text/csv; charset=utf-8", "analytics.csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson", "analytics.ndjson"),
+}
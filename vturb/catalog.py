@@ -0,0 +1,379 @@
+import os
+import gzip
+import json
+import shutil
+import bisect
+import hashlib
+import tempfile
+import threading
+
+try:
+    import fcntl  # Trava entre processos (vários extratores gravando o manifesto)
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard  # Opcional: habilita a variante pré-comprimida em zstd dos CSVs
+except ImportError:
+    zstandard = None
+
+# O manifesto fica em um subdiretório oculto: gravá-lo não altera o mtime de
+# `analytics_dir`, que é usado para detectar pastas criadas/removidas por fora
+CATALOG_DIRNAME = ".catalog"
+MANIFEST_FILENAME = "manifest.json"
+
+# Variantes comprimidas dos CSVs, gravadas pelo extrator e nomeadas pelo hash do conteúdo
+ENCODED_DIRNAME = "encoded"
+ENCODING_EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+# Ordenações da listagem paginada
+SORT_KEYS = ("name", "updated")
+
+_manifest_lock = threading.Lock()
+
+
+def manifest_path(analytics_dir):
+    return os.path.join(analytics_dir, CATALOG_DIRNAME, MANIFEST_FILENAME)
+
+
+def encoded_path(analytics_dir, sha256, encoding):
+    return os.path.join(
+        analytics_dir, CATALOG_DIRNAME, ENCODED_DIRNAME, f"{sha256}.csv.{ENCODING_EXTENSIONS[encoding]}"
+    )
+
+
+def _compress(csv_path, encoding, directory):
+    """Comprime o CSV em um temporário único de `directory` e retorna o caminho"""
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with open(csv_path, "rb") as source, os.fdopen(fd, "wb") as raw:
+            if encoding == "gzip":
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9, mtime=0) as target:
+                    shutil.copyfileobj(source, target)
+            else:
+                zstandard.ZstdCompressor(level=19).copy_stream(source, raw)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _available_encodings():
+    return ["gzip"] + (["zstd"] if zstandard else [])
+
+
+def prepare_encoded_variants(analytics_dir, csv_path, sha256):
+    """
+    Comprime as variantes que ainda não existem em temporários, sem nenhuma
+    trava (a etapa mais cara do registro).
+
+    Returns:
+        dict: Codificação -> temporário a ser publicado por `publish_encoded_variants`
+    """
+    prepared = {}
+    for encoding in _available_encodings():
+        path = encoded_path(analytics_dir, sha256, encoding)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        prepared[encoding] = _compress(csv_path, encoding, os.path.dirname(path))
+    return prepared
+
+
+def publish_encoded_variants(analytics_dir, csv_path, sha256, prepared):
+    """
+    Move os temporários preparados para os nomes finais. Uma variante que não
+    foi preparada e não existe mais (removida por outro worker nesse meio
+    tempo) é comprimida agora.
+
+    Returns:
+        list: Codificações disponíveis
+    """
+    encodings = _available_encodings()
+    for encoding in encodings:
+        path = encoded_path(analytics_dir, sha256, encoding)
+        temp_path = prepared.pop(encoding, None)
+        if temp_path:
+            os.replace(temp_path, path)
+        elif not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(_compress(csv_path, encoding, os.path.dirname(path)), path)
+    return encodings
+
+
+def _discard_prepared(prepared):
+    for temp_path in prepared.values():
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+
+def write_encoded_variants(analytics_dir, csv_path, sha256):
+    """
+    Grava as variantes gzip (e zstd, se disponível) do CSV, para que a API as
+    sirva sem comprimir a cada requisição.
+
+    Returns:
+        list: Codificações disponíveis
+    """
+    prepared = prepare_encoded_variants(analytics_dir, csv_path, sha256)
+    try:
+        return publish_encoded_variants(analytics_dir, csv_path, sha256, prepared)
+    finally:
+        _discard_prepared(prepared)
+
+
+def _remove_encoded_variants(analytics_dir, sha256):
+    for encoding in ENCODING_EXTENSIONS:
+        try:
+            os.remove(encoded_path(analytics_dir, sha256, encoding))
+        except FileNotFoundError:
+            pass
+
+
+def count_csv_rows(path):
+    """Quantidade de linhas de dados do CSV (sem o cabeçalho)"""
+    lines, last = 0, b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last and last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def csv_entry(video_name, csv_path, sha256=None, rows=None):
+    """Entrada do catálogo para o CSV de um vídeo"""
+    stat = os.stat(csv_path)
+    return {
+        "name": video_name,
+        "path": os.path.abspath(csv_path),
+        "file": os.path.basename(csv_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "rows": count_csv_rows(csv_path) if rows is None else rows,
+        "sha256": sha256,
+    }
+
+
+def load_manifest(analytics_dir):
+    try:
+        with open(manifest_path(analytics_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_csv(analytics_dir, video_name, csv_path, sha256=None):
+    """
+    Registra no manifesto o CSV mais recente de um vídeo. Chamado pelo extrator
+    sempre que um arquivo é gravado em `analytics_dir`, para que a API
+    atualize o catálogo sem varrer o diretório.
+
+    Returns:
+        dict: Entrada gravada
+    """
+    entry = csv_entry(video_name, csv_path, sha256)
+    # A compressão acontece fora das travas; sob elas, apenas os renomes e o manifesto
+    prepared = prepare_encoded_variants(analytics_dir, csv_path, sha256) if sha256 else {}
+    try:
+        return _update_manifest(analytics_dir, video_name, csv_path, sha256, entry, prepared)
+    finally:
+        _discard_prepared(prepared)
+
+
+def _update_manifest(analytics_dir, video_name, csv_path, sha256, entry, prepared):
+    os.makedirs(os.path.dirname(manifest_path(analytics_dir)), exist_ok=True)
+    lock_path = manifest_path(analytics_dir) + ".lock"
+    with _manifest_lock, open(lock_path, "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # As variantes são publicadas sob a trava: outro worker substituindo um CSV com o
+        # mesmo conteúdo poderia removê-las antes de esta entrada chegar ao manifesto
+        if sha256:
+            entry["encodings"] = publish_encoded_variants(analytics_dir, csv_path, sha256, prepared)
+        manifest = load_manifest(analytics_dir)
+        previous = manifest.get(video_name) or {}
+        manifest[video_name] = entry
+        # As variantes do CSV substituído só são removidas se nenhum outro vídeo tiver o mesmo conteúdo
+        previous_hash = previous.get("sha256")
+        if previous_hash and previous_hash != sha256 and all(
+            other.get("sha256") != previous_hash for other in manifest.values()
+        ):
+            _remove_encoded_variants(analytics_dir, previous_hash)
+        temp_path = manifest_path(analytics_dir) + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path(analytics_dir))
+    return entry
+
+
+class Catalog:
+    """
+    Índice em memória dos vídeos disponíveis: nome -> CSV mais recente
+    (caminho, tamanho, mtime, quantidade de linhas).
+
+    O índice é construído varrendo `analytics_dir` uma única vez e mantido
+    atualizado pelo manifesto gravado pelo extrator. A cada consulta são feitas
+    apenas duas chamadas a stat (manifesto e diretório); o diretório só é varrido
+    novamente se pastas forem criadas ou removidas fora do extrator.
+
+    Os nomes também ficam ordenados por nome e por data de atualização, para
+    que cada página da listagem seja obtida por busca binária.
+    """
+    def __init__(self, analytics_dir):
+        self.analytics_dir = analytics_dir
+        self.entries = {}
+        self.sorted_keys = {"name": [], "updated": []}
+        self.manifest_mtime = None
+        self.dir_mtime = None
+        self.lock = threading.Lock()
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _scan(self, manifest):
+        """Varre o diretório, reaproveitando a contagem de linhas do manifesto quando o arquivo não mudou"""
+        entries = {}
+        if not os.path.isdir(self.analytics_dir):
+            return entries
+        with os.scandir(self.analytics_dir) as it:
+            for folder in it:
+                if not folder.is_dir() or folder.name.startswith("."):
+                    continue
+                csv_files = [
+                    entry for entry in os.scandir(folder.path)
+                    if entry.is_file() and entry.name.lower().endswith(".csv")
+                ]
+                if not csv_files:
+                    entries[folder.name] = {"name": folder.name, "path": None}
+                    continue
+
+                # O CSV mais recente da pasta (desempate pelo nome, para ser determinístico)
+                latest = max(csv_files, key=lambda e: (e.stat().st_mtime, e.name))
+                known = manifest.get(folder.name)
+                stat = latest.stat()
+                if (
+                    known and known.get("path") == os.path.abspath(latest.path)
+                    and known.get("size") == stat.st_size and known.get("mtime") == stat.st_mtime
+                ):
+                    entries[folder.name] = known
+                else:
+                    entries[folder.name] = csv_entry(folder.name, latest.path)
+        return entries
+
+    def refresh(self, force=False):
+        """Atualiza o índice se o manifesto ou o diretório mudaram desde a última leitura"""
+        manifest_mtime = self._mtime(manifest_path(self.analytics_dir))
+        dir_mtime = self._mtime(self.analytics_dir)
+        if not force and manifest_mtime == self.manifest_mtime and dir_mtime == self.dir_mtime:
+            return
+
+        with self.lock:
+            manifest = load_manifest(self.analytics_dir)
+            if force or dir_mtime != self.dir_mtime:
+                entries = self._scan(manifest)
+            else:
+                # Apenas o manifesto mudou: aplica as entradas gravadas pelo extrator
+                entries = dict(self.entries)
+                for name, entry in manifest.items():
+                    if entry.get("path") and os.path.exists(entry["path"]):
+                        entries[name] = entry
+            self.entries = entries
+            self.sorted_keys = {
+                "name": sorted(entries),
+                "updated": sorted(self.sort_key(entry, "updated") for entry in entries.values()),
+            }
+            self.manifest_mtime = manifest_mtime
+            self.dir_mtime = dir_mtime
+
+    def content_hash(self, entry):
+        """
+        SHA-256 do CSV da entrada. Vem do manifesto quando o extrator registrou
+        o arquivo; senão é calculado uma vez e guardado na entrada.
+        """
+        if not entry.get("sha256"):
+            digest = hashlib.sha256()
+            with open(entry["path"], "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            entry["sha256"] = digest.hexdigest()
+        return entry["sha256"]
+
+    def encodings(self, entry):
+        """Codificações pré-comprimidas do CSV da entrada que existem no disco"""
+        if not entry.get("sha256"):
+            return []
+        return [
+            encoding for encoding in entry.get("encodings", [])
+            if os.path.exists(encoded_path(self.analytics_dir, entry["sha256"], encoding))
+        ]
+
+    def get(self, name):
+        """Entrada do vídeo (com "path" None se a pasta não tem CSV), ou None se não existe"""
+        self.refresh()
+        return self.entries.get(name)
+
+    def names(self):
+        self.refresh()
+        return list(self.sorted_keys["name"])
+
+    @staticmethod
+    def sort_key(entry, sort):
+        """Chave da entrada na ordenação: o nome, ou (mtime do CSV, nome); pastas sem CSV vêm primeiro"""
+        if sort == "name":
+            return entry["name"]
+        return (entry.get("mtime") or 0.0, entry["name"])
+
+    def page(self, limit, after=None, sort="name", descending=False, prefix=None, contains=None):
+        """
+        Uma página da listagem, a partir da chave `after` (exclusiva) da página
+        anterior. Sem `limit`, retorna todas as entradas a partir dela.
+
+        A posição inicial e o intervalo do prefixo (na ordenação por nome) são
+        encontrados por busca binária, então o custo é proporcional ao tamanho da
+        página, e não ao do catálogo. O filtro `contains` (sem diferenciar
+        maiúsculas) percorre os nomes até completar a página.
+
+        Returns:
+            tuple: (entradas da página, chave da última entrada se há mais páginas
+            ou None, total de entradas que atendem aos filtros ou None se exigiria
+            percorrer o catálogo)
+        """
+        self.refresh()
+        with self.lock:
+            entries, keys = self.entries, self.sorted_keys[sort]
+
+        start, end = 0, len(keys)
+        if prefix and sort == "name":
+            start = bisect.bisect_left(keys, prefix, start, end)
+            end = bisect.bisect_left(keys, prefix + chr(0x10FFFF), start, end)
+        total = end - start if not contains and (sort == "name" or not prefix) else None
+        if after is not None:
+            if descending:
+                end = bisect.bisect_left(keys, after, start, end)
+            else:
+                start = bisect.bisect_right(keys, after, start, end)
+
+        contains = contains.lower() if contains else None
+        selected = []
+        for index in (range(end - 1, start - 1, -1) if descending else range(start, end)):
+            name = keys[index] if sort == "name" else keys[index][1]
+            if prefix and not name.startswith(prefix):
+                continue
+            if contains and contains not in name.lower():
+                continue
+            # Uma entrada além do limite indica que existe uma próxima página
+            if limit is not None and len(selected) == limit:
+                return selected, self.sort_key(selected[-1], sort), total
+            selected.append(entries[name])
+        return selected, None, total
+
+    def __len__(self):
+        self.refresh()
+        return len(self.entries)
@@ -0,0 +1,183 @@
+import os
+import json
+import bisect
+import itertools
+import datetime
+import threading
+from array import array
+from collections import deque
+
+try:
+    import fcntl  # Trava entre processos (vários extratores acrescentando ao log)
+except ImportError:
+    fcntl = None
+
+# Log de alterações: uma linha JSON por CSV com conteúdo novo, com número de
+# sequência crescente. Fica em um subdiretório oculto de `analytics_dir`
+# (ignorado pelo catálogo) e só recebe acréscimos.
+CHANGES_DIRNAME = ".changes"
+CHANGES_FILENAME = "changes.jsonl"
+
+# Registros mais recentes mantidos em memória pelo leitor da API; os anteriores são
+# lidos do arquivo pelo índice de posições
+RECENT_RECORDS = 1000
+
+# Bytes lidos do fim do arquivo para encontrar a última sequência gravada
+TAIL_BYTES = 64 * 1024
+
+_append_lock = threading.Lock()
+
+
+def changes_path(analytics_dir):
+    return os.path.join(analytics_dir, CHANGES_DIRNAME, CHANGES_FILENAME)
+
+
+def _last_sequence(f):
+    """Sequência da última linha completa do log (0 se vazio), lendo apenas o fim do arquivo"""
+    size = f.seek(0, os.SEEK_END)
+    position = size
+    tail = b""
+    while position > 0:
+        step = min(TAIL_BYTES, position)
+        position -= step
+        f.seek(position)
+        tail = f.read(step) + tail
+        lines = tail.rstrip(b"\n").split(b"\n")
+        # A primeira linha do trecho pode estar cortada; só é confiável se o trecho começa no início do arquivo
+        candidates = lines if position == 0 else lines[1:]
+        for line in reversed(candidates):
+            try:
+                return int(json.loads(line)["seq"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return 0
+
+
+def append_change(analytics_dir, video_name, sha256, **fields):
+    """
+    Acrescenta uma alteração ao log, com a próxima sequência. Deve ser chamado
+    depois que o CSV já está disponível na API (manifesto gravado), para que o
+    consumidor que recebe a alteração já consiga baixá-lo.
+
+    Returns:
+        dict: Registro gravado
+    """
+    path = changes_path(analytics_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _append_lock, open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        record = {
+            "seq": _last_sequence(f) + 1,
+            "video": video_name,
+            "sha256": sha256,
+            **fields,
+            "changed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        f.seek(0, os.SEEK_END)
+        f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        f.flush()
+    return record
+
+
+class ChangeFeed:
+    """
+    Leitor incremental do log de alterações (usado pela API).
+
+    A cada consulta lê apenas os bytes acrescentados desde a anterior. Guarda
+    em memória só o índice (sequência e posição no arquivo de cada registro,
+    em arrays compactos) e os últimos `recent_size` registros, que atendem os
+    clientes em dia; registros mais antigos são lidos do arquivo a partir da
+    posição indexada. As consultas por sequência usam busca binária.
+    """
+    def __init__(self, analytics_dir, recent_size=RECENT_RECORDS):
+        self.analytics_dir = analytics_dir
+        self.recent_size = recent_size
+        self._reset(None)
+        self.lock = threading.Lock()
+
+    def _reset(self, inode):
+        self.sequences = array("q")
+        self.offsets = array("q")
+        self.recent = deque(maxlen=self.recent_size)
+        self.offset = 0
+        self.inode = inode
+
+    def refresh(self):
+        path = changes_path(self.analytics_dir)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+
+        with self.lock:
+            if stat is None or stat.st_ino != self.inode or stat.st_size < self.offset:
+                # Log criado, recriado ou truncado: lê desde o início
+                self._reset(stat.st_ino if stat else None)
+            if stat is None or stat.st_size == self.offset:
+                return
+
+            with open(path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(stat.st_size - self.offset)
+            # Uma linha ainda sem o "\n" final está sendo gravada: fica para a próxima leitura
+            complete = data[:data.rfind(b"\n") + 1]
+            position = self.offset
+            for line in complete.splitlines(keepends=True):
+                line_offset, position = position, position + len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if self.sequences and record["seq"] <= self.sequences[-1]:
+                    continue
+                self.sequences.append(record["seq"])
+                self.offsets.append(line_offset)
+                self.recent.append(record)
+            self.offset += len(complete)
+
+    def _read_records(self, start, end):
+        """Registros de índice [start, end) lidos do arquivo, a partir da posição indexada"""
+        records = []
+        last = self.sequences[end - 1]
+        with open(changes_path(self.analytics_dir), "rb") as f:
+            f.seek(self.offsets[start])
+            while len(records) < end - start and f.tell() < self.offset:
+                try:
+                    record = json.loads(f.readline())
+                except ValueError:
+                    continue
+                # Mesmas regras da indexação: sequências repetidas ou fora de ordem são ignoradas
+                if record["seq"] <= (records[-1]["seq"] if records else self.sequences[start] - 1):
+                    continue
+                records.append(record)
+                if record["seq"] >= last:
+                    break
+        return records
+
+    def latest(self):
+        """Sequência da alteração mais recente (0 se não há alterações)"""
+        self.refresh()
+        with self.lock:
+            return self.sequences[-1] if self.sequences else 0
+
+    def since(self, cursor, limit=None):
+        """
+        Alterações com sequência maior que `cursor`.
+
+        Returns:
+            tuple: (registros, há mais registros além do limite)
+        """
+        self.refresh()
+        with self.lock:
+            total = len(self.sequences)
+            start = bisect.bisect_right(self.sequences, cursor)
+            end = total if limit is None else min(start + limit, total)
+            if start >= end:
+                return [], end < total
+            first_recent = total - len(self.recent)
+            if start >= first_recent:
+                records = list(itertools.islice(self.recent, start - first_recent, end - first_recent))
+            else:
+                records = self._read_records(start, end)
+            return records, end < total
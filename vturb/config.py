@@ -0,0 +1,136 @@
+import argparse
+import os
+
+# URLs padrão da plataforma (podem ser sobrescritas para apontar para um site local de testes)
+DEFAULT_LOGIN_URL = "https://login.vturb.com/signin"
+DEFAULT_FOLDERS_URL = "https://app.vturb.com/folders"
+
+# Diretórios padrão
+DEFAULT_DOWNLOAD_DIR = "/home/samuel/Downloads/vturb"
+DEFAULT_ANALYTICS_DIR = "./analytics"
+DEFAULT_METRICS_FILE = "./metrics/vturb_bot.prom"
+# Subdiretório oculto de `analytics_dir`: a API ignora pastas iniciadas por ponto
+DEFAULT_DATASET_DIRNAME = ".dataset"
+
+
+class Config:
+    """
+    Configurações de uma execução do bot.
+
+    Os valores são lidos das variáveis de ambiente (carregadas do .env) e podem
+    ser sobrescritos pelos argumentos de linha de comando.
+    """
+    def __init__(self, args=None):
+        args = args or argparse.Namespace()
+
+        self.email = os.getenv("EMAIL_LOGIN")
+        self.password = os.getenv("PASSWORD_LOGIN")
+        self.login_url = os.getenv("VTURB_LOGIN_URL", DEFAULT_LOGIN_URL)
+        self.folders_url = os.getenv("VTURB_FOLDERS_URL", DEFAULT_FOLDERS_URL)
+        self.download_dir = os.path.abspath(
+            getattr(args, "download_dir", None) or os.getenv("VTURB_DOWNLOAD_DIR", DEFAULT_DOWNLOAD_DIR)
+        )
+        self.analytics_dir = getattr(args, "analytics_dir", None) or os.getenv("VTURB_ANALYTICS_DIR", DEFAULT_ANALYTICS_DIR)
+
+        # Conjunto de dados colunar (Parquet) gerado a partir dos CSVs; requer o pyarrow
+        self.dataset_dir = os.getenv("VTURB_DATASET_DIR") or os.path.join(self.analytics_dir, DEFAULT_DATASET_DIRNAME)
+        self.columnar = os.getenv("VTURB_COLUMNAR", "1") not in ("0", "false", "False")
+        self.workers = max(1, int(getattr(args, "workers", None) or os.getenv("VTURB_WORKERS", 1)))
+        self.download_timeout = float(os.getenv("VTURB_DOWNLOAD_TIMEOUT", 30))
+
+        # Modelo da URL da página de tráfego ({video_id}/{video_url}); se ausente, é descoberto na primeira navegação
+        self.traffic_url_template = os.getenv("VTURB_TRAFFIC_URL_TEMPLATE")
+
+        # Modo de exportação: "ui" (navega até o botão de download) ou "http" (chama o endpoint direto)
+        self.export_mode = getattr(args, "export_mode", None) or os.getenv("VTURB_EXPORT_MODE", "ui")
+        self.export_url_template = os.getenv("VTURB_EXPORT_URL_TEMPLATE")
+        self.http_concurrency = int(os.getenv("VTURB_HTTP_CONCURRENCY", 8))
+
+        # Tentativas por vídeo e espera base (em segundos, dobrada a cada nova tentativa)
+        self.video_retries = max(1, int(os.getenv("VTURB_VIDEO_RETRIES", 3)))
+        self.retry_backoff = float(os.getenv("VTURB_RETRY_BACKOFF", 5))
+
+        # Extração completa: ignora o estado salvo e baixa todos os vídeos novamente
+        force_full = getattr(args, "full", None)
+        if force_full is None:
+            force_full = os.getenv("VTURB_FORCE_FULL", "0") in ("1", "true", "True")
+        self.force_full = force_full
+        if self.export_mode == "http" and not self.export_url_template:
+            raise ValueError("VTURB_EXPORT_URL_TEMPLATE é obrigatória no modo de exportação http")
+
+        # Modo enxuto: bloqueia imagens, fontes, mídia e rastreadores
+        lean = getattr(args, "lean", None)
+        if lean is None:
+            lean = os.getenv("VTURB_LEAN", "0") in ("1", "true", "True")
+        self.lean = lean
+
+        # Reaproveitamento de sessão: perfil persistente do Chrome e/ou arquivo de cookies
+        self.profile_dir = os.getenv("VTURB_PROFILE_DIR")
+        self.cookies_path = os.getenv("VTURB_COOKIES_PATH")
+        self.reuse_session = bool(self.profile_dir or self.cookies_path)
+
+        # Métricas da execução: arquivo texto para o coletor do node_exporter e, opcionalmente, um Pushgateway
+        self.metrics_file = os.getenv("VTURB_METRICS_FILE", DEFAULT_METRICS_FILE)
+        self.metrics_pushgateway = os.getenv("VTURB_METRICS_PUSHGATEWAY")
+
+        # Nível mínimo de log: INFO omite a listagem linha a linha e os detalhes de depuração
+        self.log_level = (getattr(args, "log_level", None) or os.getenv("VTURB_LOG_LEVEL", "DEBUG")).upper()
+
+        headless = getattr(args, "headless", None)
+        if headless is None:
+            headless = os.getenv("VTURB_HEADLESS", "1") not in ("0", "false", "False")
+        self.headless = headless
+
+    def worker_download_dir(self, worker_id):
+        """
+        Diretório de download exclusivo de um worker, para que um worker nunca
+        mova o CSV baixado por outro.
+        """
+        path = os.path.join(self.download_dir, f"worker-{worker_id}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def worker_profile_dir(self, worker_id):
+        """
+        Perfil persistente do Chrome de um worker (o Chrome não permite que duas
+        instâncias usem o mesmo perfil ao mesmo tempo)
+        """
+        if not self.profile_dir:
+            return None
+        return os.path.join(os.path.abspath(self.profile_dir), f"worker-{worker_id}")
+
+
+def parse_args(argv=None):
+    """Lê os argumentos de linha de comando do bot"""
+    parser = argparse.ArgumentParser(description="Extrator de análises do VTurb")
+    parser.add_argument(
+        "--workers", type=int,
+        help="Quantidade de sessões de navegador em paralelo (padrão: VTURB_WORKERS ou 1)"
+    )
+    parser.add_argument(
+        "--export-mode", choices=("ui", "http"),
+        help="'ui' baixa pela interface; 'http' usa o navegador só para login/descoberta e baixa via HTTP"
+    )
+    parser.add_argument(
+        "--full", action="store_true", default=None,
+        help="Baixa todos os vídeos, mesmo os que não mudaram desde a última extração"
+    )
+    parser.add_argument("--download-dir", help="Diretório base de downloads do navegador")
+    parser.add_argument("--analytics-dir", help="Diretório de destino dos CSVs extraídos")
+    parser.add_argument(
+        "--lean", action="store_true", default=None,
+        help="Bloqueia imagens, fontes, mídia e rastreadores para carregar as páginas mais rápido"
+    )
+    parser.add_argument(
+        "--backfill-dataset", action="store_true",
+        help="Converte os CSVs já existentes em analytics para o conjunto de dados Parquet e encerra"
+    )
+    parser.add_argument(
+        "--log-level", type=str.upper, choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+        help="Nível mínimo de log (padrão: VTURB_LOG_LEVEL ou DEBUG)"
+    )
+    parser.add_argument(
+        "--no-headless", dest="headless", action="store_false", default=None,
+        help="Abre o navegador com interface gráfica"
+    )
+    return parser.parse_args(argv)
@@ -0,0 +1,340 @@
+import os
+import re
+import csv
+import glob
+import datetime
+import threading
+import unicodedata
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Dependência opcional: sem ela apenas os CSVs brutos são gravados
+    pa = None
+    pq = None
+
+try:
+    import fcntl  # Trava entre processos (extrator e backfill gravando o esquema)
+except ImportError:
+    fcntl = None
+
+from files import file_sha256
+from query import COMMON_METADATA_FILENAME
+
+# Colunas de partição (diretórios no estilo hive: video=<nome>/extracted_date=<AAAA-MM-DD>)
+PARTITION_COLUMNS = ("video", "extracted_date")
+# Colunas acrescentadas a cada linha
+EXTRA_COLUMNS = ("extracted_at", "source_file", "source_sha256")
+
+DATETIME_FORMATS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+# Dimensões (utm_content, utm_source...) são sempre texto, mesmo quando os valores
+# do primeiro CSV parecem números: um valor como "abc" em outro CSV não pode virar nulo
+DIMENSION_COLUMN_PREFIXES = ("utm_",)
+
+_schema_lock = threading.Lock()
+
+
+def available():
+    """Indica se o pyarrow está instalado"""
+    return pa is not None
+
+
+def normalize_column_name(name, position):
+    """Converte o cabeçalho do CSV em snake_case ASCII ("Visualizações únicas" -> "visualizacoes_unicas")"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r"[^0-9a-zA-Z]+", "_", name).strip("_").lower()
+    return name or f"column_{position + 1}"
+
+
+def normalize_columns(header):
+    """Normaliza os cabeçalhos, evitando nomes repetidos e conflitos com as colunas reservadas"""
+    reserved = set(PARTITION_COLUMNS) | set(EXTRA_COLUMNS)
+    columns = []
+    for position, name in enumerate(header):
+        column = normalize_column_name(name, position)
+        candidate, suffix = column, 2
+        while candidate in reserved or candidate in columns:
+            candidate = f"{column}_{suffix}"
+            suffix += 1
+        columns.append(candidate)
+    return columns
+
+
+def parse_number(value):
+    """Lê números no formato exportado ("1234", "12.5", "1.234,5", "37,5%"); None se não for número"""
+    value = value.strip().rstrip("%").strip()
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_datetime(value):
+    """Lê datas ISO 8601 ou no formato brasileiro; None se não for data"""
+    value = value.strip()
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        parsed = None
+        for date_format in DATETIME_FORMATS:
+            try:
+                parsed = datetime.datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                continue
+    if parsed is not None and parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def is_dimension(column):
+    return column.startswith(DIMENSION_COLUMN_PREFIXES)
+
+
+def infer_type(values, column=None):
+    """
+    Tipo de uma coluna a partir dos valores não vazios: números viram float64,
+    datas viram timestamp e o restante (e as dimensões) fica como texto.
+    """
+    if column is not None and is_dimension(column):
+        return pa.string()
+    filled = [value for value in values if value.strip()]
+    if not filled:
+        return pa.string()
+    if all(parse_number(value) is not None for value in filled):
+        return pa.float64()
+    if all(parse_datetime(value) is not None for value in filled):
+        return pa.timestamp("s")
+    return pa.string()
+
+
+def fits_type(values, column_type):
+    """Indica se todos os valores não vazios podem ser convertidos para o tipo da coluna"""
+    if pa.types.is_floating(column_type):
+        parse = parse_number
+    elif pa.types.is_timestamp(column_type):
+        parse = parse_datetime
+    else:
+        return True
+    return all(parse(value) is not None for value in values if value.strip())
+
+
+def convert_column(values, column_type):
+    """
+    Converte os valores brutos para o tipo da coluna (valores vazios viram
+    nulos). O tipo deve comportar os valores (ver `fits_type`).
+    """
+    if pa.types.is_floating(column_type):
+        converted = [parse_number(value) if value.strip() else None for value in values]
+    elif pa.types.is_timestamp(column_type):
+        converted = [parse_datetime(value) if value.strip() else None for value in values]
+    else:
+        converted = [value if value.strip() else None for value in values]
+    return pa.array(converted, type=column_type)
+
+
+def read_csv(csv_path):
+    """
+    Lê o CSV exportado pelo VTurb, detectando o delimitador.
+
+    Returns:
+        tuple: (cabeçalho, linhas)
+    """
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = next(reader, [])
+        rows = [row for row in reader if any(cell.strip() for cell in row)]
+    return header, rows
+
+
+def load_schema(dataset_dir):
+    """Esquema unificado do conjunto de dados, ou None se ainda não há dados"""
+    path = os.path.join(dataset_dir, COMMON_METADATA_FILENAME)
+    if not os.path.exists(path):
+        return None
+    return pq.read_schema(path)
+
+
+def _save_schema(dataset_dir, schema):
+    path = os.path.join(dataset_dir, COMMON_METADATA_FILENAME)
+    temp_path = os.path.join(dataset_dir, f".{COMMON_METADATA_FILENAME}.tmp")
+    pq.write_metadata(schema, temp_path)
+    os.replace(temp_path, path)
+
+
+def _widen_to_string(dataset_dir, schema, columns):
+    """
+    Converte colunas para texto no esquema unificado e nos arquivos já gravados
+    (um valor não numérico apareceu em uma coluna numérica, ou uma dimensão foi
+    gravada como número antes de ser tratada como texto). Chamado com a trava
+    do esquema: nenhum arquivo novo é gravado durante a conversão.
+    """
+    for column in columns:
+        schema = schema.set(schema.get_field_index(column), pa.field(column, pa.string()))
+    pattern = os.path.join(glob.escape(dataset_dir), "video=*", "extracted_date=*", "part-*.parquet")
+    for path in glob.glob(pattern):
+        file_schema = pq.read_schema(path)
+        to_cast = [
+            column for column in columns
+            if file_schema.get_field_index(column) != -1 and file_schema.field(column).type != pa.string()
+        ]
+        if not to_cast:
+            continue
+        table = pq.read_table(path)
+        for column in to_cast:
+            index = table.schema.get_field_index(column)
+            table = table.set_column(index, column, table[column].cast(pa.string()))
+        temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        pq.write_table(table, temp_path, compression="zstd")
+        os.replace(temp_path, path)
+    _save_schema(dataset_dir, schema)
+    return schema
+
+
+def _base_schema():
+    return pa.schema(
+        [pa.field(column, pa.string()) for column in PARTITION_COLUMNS]
+        + [
+            pa.field("extracted_at", pa.timestamp("s")),
+            pa.field("source_file", pa.string()),
+            pa.field("source_sha256", pa.string()),
+        ]
+    )
+
+
+def video_dir(dataset_dir, video_name):
+    # O nome do vídeo é codificado como URI, que é como os leitores (pyarrow/pandas) decodificam as partições
+    return os.path.join(dataset_dir, f"video={quote(video_name, safe='')}")
+
+
+def partition_dir(dataset_dir, video_name, extracted_date):
+    return os.path.join(video_dir(dataset_dir, video_name), f"extracted_date={extracted_date.isoformat()}")
+
+
+def part_filename(sha256):
+    return f"part-{sha256[:16]}.parquet"
+
+
+def find_part(dataset_dir, video_name, sha256):
+    """Arquivo Parquet já gravado para o mesmo conteúdo do vídeo, em qualquer data de extração"""
+    pattern = os.path.join(glob.escape(video_dir(dataset_dir, video_name)), "extracted_date=*", part_filename(sha256))
+    matches = glob.glob(pattern)
+    return matches[0] if matches else None
+
+
+def append_csv(dataset_dir, video_name, csv_path, sha256=None, extracted_at=None):
+    """
+    Normaliza um CSV do VTurb para o esquema tipado e o acrescenta ao conjunto
+    de dados Parquet particionado por vídeo e data de extração.
+
+    Cada CSV gera um único arquivo nomeado pelo hash do conteúdo, e um
+    conteúdo já gravado para o vídeo (em qualquer data de extração) não é
+    gravado de novo: novas tentativas, backfills repetidos e extrações sem
+    alteração em dias seguintes não duplicam linhas.
+
+    Returns:
+        dict: "path" do arquivo Parquet, "rows" gravadas e "written" (False se já existia)
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow não está instalado; instale-o para gravar o conjunto de dados colunar")
+
+    sha256 = sha256 or file_sha256(csv_path)
+    if extracted_at is None:
+        extracted_at = datetime.datetime.fromtimestamp(os.stat(csv_path).st_mtime)
+    extracted_at = extracted_at.replace(microsecond=0)
+
+    existing = find_part(dataset_dir, video_name, sha256)
+    if existing:
+        return {"path": existing, "rows": None, "written": False}
+    folder = partition_dir(dataset_dir, video_name, extracted_at.date())
+    parquet_path = os.path.join(folder, part_filename(sha256))
+
+    header, rows = read_csv(csv_path)
+    columns = normalize_columns(header)
+    raw_columns = {
+        column: [row[position] if position < len(row) else "" for row in rows]
+        for position, column in enumerate(columns)
+    }
+
+    os.makedirs(dataset_dir, exist_ok=True)
+    lock_path = os.path.join(dataset_dir, ".schema.lock")
+    with _schema_lock, open(lock_path, "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        # Colunas novas entram no esquema unificado com o tipo inferido deste CSV
+        schema = load_schema(dataset_dir) or _base_schema()
+        new_fields = [
+            pa.field(column, infer_type(values, column))
+            for column, values in raw_columns.items()
+            if schema.get_field_index(column) == -1
+        ]
+        if new_fields:
+            schema = pa.schema(list(schema) + new_fields)
+            _save_schema(dataset_dir, schema)
+
+        # Colunas já existentes cujo tipo não comporta os valores deste CSV viram texto
+        widen = [
+            column for column, values in raw_columns.items()
+            if schema.field(column).type != pa.string()
+            and (is_dimension(column) or not fits_type(values, schema.field(column).type))
+        ]
+        if widen:
+            schema = _widen_to_string(dataset_dir, schema, widen)
+
+        arrays = {
+            column: convert_column(values, schema.field(column).type)
+            for column, values in raw_columns.items()
+        }
+        arrays["extracted_at"] = pa.array([extracted_at] * len(rows), type=pa.timestamp("s"))
+        arrays["source_file"] = pa.array([os.path.basename(csv_path)] * len(rows), type=pa.string())
+        arrays["source_sha256"] = pa.array([sha256] * len(rows), type=pa.string())
+        table = pa.table(arrays)
+
+        # O arquivo é gravado com a trava: uma conversão de colunas para texto não pode
+        # acontecer entre a leitura do esquema e a gravação
+        os.makedirs(folder, exist_ok=True)
+        # Temporário com ponto no início: os leitores ignoram arquivos ocultos
+        temp_path = os.path.join(folder, f".part-{sha256[:16]}.tmp")
+        pq.write_table(table, temp_path, compression="zstd")
+        os.replace(temp_path, parquet_path)
+    # O mtime da raiz do conjunto de dados funciona como versão para os caches da API
+    os.utime(dataset_dir)
+    return {"path": parquet_path, "rows": len(rows), "written": True}
+
+
+def backfill(analytics_dir, dataset_dir):
+    """
+    Converte todos os CSVs já existentes em `analytics_dir` (inclusive os de
+    extrações anteriores) para o conjunto de dados colunar. Arquivos já
+    convertidos são ignorados, então o comando pode ser repetido.
+
+    Yields:
+        tuple: (nome do vídeo, caminho do CSV, resultado de append_csv ou a exceção)
+    """
+    with os.scandir(analytics_dir) as it:
+        folders = sorted(
+            (entry for entry in it if entry.is_dir() and not entry.name.startswith(".")),
+            key=lambda entry: entry.name,
+        )
+    for folder in folders:
+        csv_files = sorted(
+            (entry for entry in os.scandir(folder.path) if entry.is_file() and entry.name.lower().endswith(".csv")),
+            key=lambda entry: (entry.stat().st_mtime, entry.name),
+        )
+        for entry in csv_files:
+            try:
+                yield folder.name, entry.path, append_csv(dataset_dir, folder.name, entry.path)
+            except Exception as e:
+                yield folder.name, entry.path, e
@@ -1,12 +1,131 @@
+import os
+import socket
 import datetime
-from tinydb import TinyDB, Query
+import threading
+
+from store import DEFAULT_DB_PATH, LEGACY_EXECUTION_DB_PATH, connect, transaction, migrate_once
+
+# Período da manhã: [05:00, 17:00). O restante do dia é o período da tarde.
+# Horários no formato HH:MM:SS: a comparação de texto respeita a ordem cronológica
+MORNING_START = "05:00:00"
+MORNING_END = "17:00:00"
+
+
+# Uma execução em andamento de outro computador, sem checkpoints há mais que este
+# tempo, é considerada abandonada e pode ser retomada
+RUN_HEARTBEAT_TIMEOUT = datetime.timedelta(minutes=15)
+
+
+def _process_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner):
+    """
+    Indica se o processo dono de uma execução ainda está vivo: True/False para
+    processos deste computador, None se não é possível verificar.
+    """
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_morning(current_time):
+    return datetime.time(5, 0) <= current_time < datetime.time(17, 0)
+
+
+def _period_condition(column, inside_morning):
+    """Condição SQL (parâmetros: início e fim da manhã) para horários dentro ou fora do período da manhã"""
+    if inside_morning:
+        return f"{column} >= ? AND {column} < ?"
+    return f"({column} < ? OR {column} >= ?)"
+
+
+class RunProgress:
+    """
+    Progresso de uma execução: vídeos concluídos e com falha.
+
+    Cada alteração é gravada imediatamente no banco (uma linha por item), para
+    que uma execução interrompida possa ser retomada a partir do primeiro item
+    não concluído.
+    """
+    def __init__(self, manager, run_id, done=None, failed=None, resumed=False):
+        self.manager = manager
+        self.run_id = run_id
+        self.done = set(done or [])
+        self.failed = dict(failed or {})
+        self.resumed = resumed
+        self.lock = threading.Lock()
+
+    def is_done(self, key):
+        with self.lock:
+            return key in self.done
+
+    def mark_done(self, key):
+        with self.lock:
+            self.done.add(key)
+            self.failed.pop(key, None)
+            self.manager.save_item(self.run_id, key, "done")
+
+    def mark_failed(self, key, error):
+        with self.lock:
+            self.failed[key] = str(error)
+            self.manager.save_item(self.run_id, key, "failed", error=str(error))
+
+
+def _migrate_tinydb(connection, tables):
+    """Copia execuções e checkpoints do TinyDB, mantendo os ids dos checkpoints (run_id, referenciado no histórico de versões)"""
+    for _, execution in tables.get("executions", []):
+        connection.execute(
+            "INSERT INTO executions (date, time, success, timestamp) VALUES (?, ?, ?, ?)",
+            (execution["date"], execution["time"], int(bool(execution["success"])), execution.get("timestamp") or ""),
+        )
+    for run_id, run in tables.get("runs", []):
+        connection.execute(
+            "INSERT OR IGNORE INTO runs (id, date, started_at, finished_at, status, attempts) VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, run["date"], run["started_at"], run.get("finished_at"), run["status"], run.get("attempts", 1)),
+        )
+        updated_at = run.get("finished_at") or run["started_at"]
+        connection.executemany(
+            "INSERT OR IGNORE INTO run_items (run_id, key, status, error, updated_at) VALUES (?, ?, 'done', NULL, ?)",
+            [(run_id, key, updated_at) for key in run.get("done", [])],
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO run_items (run_id, key, status, error, updated_at) VALUES (?, ?, 'failed', ?, ?)",
+            [(run_id, key, error, updated_at) for key, error in (run.get("failed") or {}).items()],
+        )
+
 
 class ExecutionManager:
-    def __init__(self, db_path="./execution_db.json"):
-        self.db = TinyDB(db_path)
-        self.executions = self.db.table('executions')
-        self.Execution = Query()
-    
+    """
+    Histórico de execuções e checkpoints, em SQLite (modo WAL). As regras de
+    agendamento e a limpeza são consultas indexadas, e vários processos podem
+    usar o mesmo banco.
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH, legacy_db_path=LEGACY_EXECUTION_DB_PATH):
+        self.connection = connect(db_path)
+        # A conexão é compartilhada pelos workers, que gravam checkpoints em paralelo
+        self.lock = threading.Lock()
+        if legacy_db_path:
+            with self.lock:
+                migrate_once(self.connection, legacy_db_path, _migrate_tinydb)
+
+    def _has_execution(self, date, inside_morning):
+        """Há execução bem-sucedida na data dentro (ou fora) do período da manhã?"""
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT 1 FROM executions WHERE date = ? AND success = 1 AND {_period_condition('time', inside_morning)} LIMIT 1",
+                (date, MORNING_START, MORNING_END),
+            ).fetchone()
+        return row is not None
+
     def should_execute(self):
         """
         Determina se o script deve ser executado com base nas regras:
@@ -15,54 +134,116 @@ class ExecutionManager:
         """
         now = datetime.datetime.now()
         current_time = now.time()
-        current_date = now.date()
-        
-        # Obtém a última execução bem-sucedida
-        last_successful = self.executions.search(
-            (self.Execution.success == True) & 
-            (self.Execution.date == str(current_date))
-        )
-        
-        # Verifica se estamos no período da manhã (entre 5:00 e 16:59)
-        morning_period = datetime.time(5, 0) <= current_time < datetime.time(17, 0)
-        
-        # Verifica se já houve execução no período da manhã
-        morning_execution = False
-        # Verifica se já houve execução no período da tarde
-        afternoon_execution = False
-        
-        for execution in last_successful:
-            exec_time = datetime.datetime.strptime(execution['time'], '%H:%M:%S').time()
-            if datetime.time(5, 0) <= exec_time < datetime.time(17, 0):
-                morning_execution = True
-            else:
-                afternoon_execution = True
-        
-        # Se estamos no período da manhã e ainda não houve execução pela manhã
-        if morning_period and not morning_execution:
-            return True
-        
-        # Se estamos no período da tarde e ainda não houve execução pela tarde
-        if not morning_period and not afternoon_execution:
-            return True
-        
-        return False
-    
+        current_date = str(now.date())
+
+        # Período da manhã: executa se ainda não houve execução bem-sucedida pela manhã
+        # Período da tarde: executa se ainda não houve execução bem-sucedida fora do período da manhã
+        return not self._has_execution(current_date, _is_morning(current_time))
+
     def register_execution(self, success=True):
         """
         Registra uma execução no banco de dados
         """
         now = datetime.datetime.now()
-        self.executions.insert({
-            'date': str(now.date()),
-            'time': now.time().strftime('%H:%M:%S'),
-            'success': success,
-            'timestamp': datetime.datetime.now().isoformat()
-        })
-    
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO executions (date, time, success, timestamp) VALUES (?, ?, ?, ?)",
+                (str(now.date()), now.time().strftime('%H:%M:%S'), int(success), now.isoformat()),
+            )
+
+    def start_run(self):
+        """
+        Inicia uma execução ou retoma a última execução não concluída, se ela
+        começou no mesmo período agendado (manhã ou tarde do mesmo dia). Uma
+        execução de outro período nunca é retomada: os vídeos já concluídos
+        nela seriam pulados e os dados do período atual não seriam atualizados.
+
+        Execuções ainda em andamento em outro processo não são retomadas; só as
+        que falharam ou foram abandonadas (processo dono encerrado ou, em outro
+        computador, sem checkpoints há mais de RUN_HEARTBEAT_TIMEOUT).
+
+        Returns:
+            RunProgress: Progresso da execução (com os itens já concluídos, se retomada)
+        """
+        now = datetime.datetime.now()
+        # Horário de início (HH:MM:SS) extraído de started_at, no formato ISO
+        started_time = "substr(started_at, 12, 8)"
+        owner = _process_owner()
+        with self.lock, transaction(self.connection):
+            candidates = self.connection.execute(
+                "SELECT id, attempts, status, owner, heartbeat_at FROM runs WHERE date = ? AND status != 'success' "
+                f"AND {_period_condition(started_time, _is_morning(now.time()))} "
+                "ORDER BY started_at DESC",
+                (str(now.date()), MORNING_START, MORNING_END),
+            ).fetchall()
+            run = next((candidate for candidate in candidates if self._can_take_over(candidate, now)), None)
+            if run:
+                self.connection.execute(
+                    "UPDATE runs SET status = 'running', attempts = ?, owner = ?, heartbeat_at = ? WHERE id = ?",
+                    (run["attempts"] + 1, owner, now.isoformat(), run["id"]),
+                )
+                # As falhas anteriores serão tentadas novamente nesta retomada
+                self.connection.execute("DELETE FROM run_items WHERE run_id = ? AND status = 'failed'", (run["id"],))
+                done = [
+                    row["key"] for row in self.connection.execute(
+                        "SELECT key FROM run_items WHERE run_id = ? AND status = 'done'", (run["id"],)
+                    )
+                ]
+                return RunProgress(self, run["id"], done, resumed=True)
+
+            cursor = self.connection.execute(
+                "INSERT INTO runs (date, started_at, finished_at, status, attempts, owner, heartbeat_at) "
+                "VALUES (?, ?, NULL, 'running', 1, ?, ?)",
+                (str(now.date()), now.isoformat(), owner, now.isoformat()),
+            )
+            return RunProgress(self, cursor.lastrowid)
+
+    @staticmethod
+    def _can_take_over(run, now):
+        """A execução falhou ou foi abandonada pelo processo que a iniciou?"""
+        if run["status"] != 'running':
+            return True
+        alive = _owner_alive(run["owner"])
+        if alive is not None:
+            return not alive
+        heartbeat_at = run["heartbeat_at"]
+        return heartbeat_at is None or now - datetime.datetime.fromisoformat(heartbeat_at) > RUN_HEARTBEAT_TIMEOUT
+
+    def save_item(self, run_id, key, status, error=None):
+        """
+        Grava o checkpoint de um item da execução em andamento (concluído ou com
+        falha). Ao concluir, a falha registrada para o mesmo item é substituída.
+        """
+        now = datetime.datetime.now().isoformat()
+        with self.lock, transaction(self.connection):
+            self.connection.execute(
+                "INSERT INTO run_items (run_id, key, status, error, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (run_id, key) DO UPDATE SET status = excluded.status, error = excluded.error, "
+                "updated_at = excluded.updated_at",
+                (run_id, key, status, error, now),
+            )
+            # Cada checkpoint também é o sinal de vida da execução (ver RUN_HEARTBEAT_TIMEOUT)
+            self.connection.execute("UPDATE runs SET heartbeat_at = ? WHERE id = ?", (now, run_id))
+
+    def finish_run(self, progress, success=True):
+        """
+        Encerra uma execução e a registra no histórico de execuções
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE id = ?",
+                ('success' if success else 'failed', datetime.datetime.now().isoformat(), progress.run_id),
+            )
+        self.register_execution(success=success)
+
     def clear_old_records(self, days=7):
         """
         Remove registros antigos para manter o banco de dados organizado
         """
-        cutoff_date = datetime.datetime.now().date() - datetime.timedelta(days=days)
-        self.executions.remove(self.Execution.date < str(cutoff_date))
+        cutoff_date = str(datetime.datetime.now().date() - datetime.timedelta(days=days))
+        with self.lock, transaction(self.connection):
+            self.connection.execute("DELETE FROM executions WHERE date < ?", (cutoff_date,))
+            self.connection.execute(
+                "DELETE FROM run_items WHERE run_id IN (SELECT id FROM runs WHERE date < ?)", (cutoff_date,)
+            )
+            self.connection.execute("DELETE FROM runs WHERE date < ?", (cutoff_date,))
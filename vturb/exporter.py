@@ -0,0 +1,112 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from logger import log, LogType
+
+# Códigos de status que justificam uma nova tentativa
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def _filename_from_response(response, fallback):
+    """Extrai o nome do arquivo do cabeçalho Content-Disposition"""
+    disposition = response.headers.get("Content-Disposition", "")
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)", disposition)
+    if match:
+        return os.path.basename(unquote(match.group(1).strip('"')))
+    match = re.search(r'filename="?([^";]+)"?', disposition)
+    if match:
+        return os.path.basename(match.group(1))
+    return fallback
+
+
+class HttpExporter:
+    """
+    Baixa os CSVs de analytics diretamente pelos endpoints de exportação, sem
+    passar pela interface.
+
+    Reaproveita os cookies da sessão autenticada do navegador e usa um pool de
+    conexões compartilhado entre várias threads.
+    """
+    def __init__(self, cookies, url_template, concurrency=8, timeout=60, user_agent=None, retries=3):
+        self.url_template = url_template
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"], cookie["value"],
+                domain=cookie.get("domain"), path=cookie.get("path", "/")
+            )
+
+    def export_url(self, video):
+        return self.url_template.format(video_id=video["id"], video_url=video.get("url", ""))
+
+    def _download(self, video, analytics_dir):
+        url = self.export_url(video)
+        destination_folder = os.path.join(analytics_dir, video["name"])
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                    if response.status_code in RETRY_STATUS_CODES and attempt < self.retries:
+                        raise requests.HTTPError(f"status {response.status_code}", response=response)
+                    response.raise_for_status()
+
+                    file_name = _filename_from_response(response, f"{video['id']}.csv")
+                    os.makedirs(destination_folder, exist_ok=True)
+                    destination_path = os.path.join(destination_folder, file_name)
+                    temp_path = os.path.join(destination_folder, f".{file_name}.part")
+                    try:
+                        with open(temp_path, "wb") as f:
+                            for chunk in response.iter_content(chunk_size=64 * 1024):
+                                f.write(chunk)
+                        os.replace(temp_path, destination_path)
+                    except BaseException:
+                        # Download interrompido: não deixa o arquivo parcial na pasta de analytics
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
+                        raise
+                    return destination_path
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                status = getattr(e.response, "status_code", None)
+                if attempt >= self.retries or (status and status not in RETRY_STATUS_CODES):
+                    raise
+                log(f"Falha ao exportar '{video['name']}' ({e}). Tentativa {attempt + 1}/{self.retries}...", LogType.WARNING, indent_level=1)
+                time.sleep(2 ** (attempt - 1))
+
+    def export_all(self, videos, analytics_dir):
+        """
+        Exporta os CSVs de todos os vídeos em paralelo.
+
+        Returns:
+            tuple: (lista de (vídeo, caminho salvo), lista de (vídeo, erro) das falhas)
+        """
+        saved, failed = [], []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="export") as pool:
+            futures = {pool.submit(self._download, video, analytics_dir): video for video in videos}
+            for future in as_completed(futures):
+                video = futures[future]
+                try:
+                    path = future.result()
+                    saved.append((video, path))
+                    log(f"CSV de '{video['name']}' salvo em {path}", LogType.SUCCESS, indent_level=1, video=video["name"])
+                except Exception as e:
+                    failed.append((video, e))
+                    log(f"ERRO ao exportar '{video['name']}': {str(e)}", LogType.ERROR, indent_level=1, video=video["name"])
+        return saved, failed
+
+    def close(self):
+        self.session.close()
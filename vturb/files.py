@@ -1,13 +1,119 @@
 import os
+import time
+import errno
 import shutil
+import hashlib
+import tempfile
 
-def move_csv_files(source_folder, destination_folder):
-    files = os.listdir(source_folder)
+# Extensões de arquivos de download ainda incompletos (Chrome/Firefox)
+PARTIAL_DOWNLOAD_SUFFIXES = (".crdownload", ".part", ".tmp")
+
+
+class DownloadTracker:
+    """
+    Acompanha o diretório de download do navegador para identificar exatamente
+    o arquivo gerado por um clique de download.
+
+    Uso:
+        tracker = DownloadTracker(download_dir)
+        tracker.start()          # antes do clique
+        ...clique no botão de download...
+        path = tracker.wait_for_file(timeout=30)
+    """
+    def __init__(self, directory, suffix=".csv", poll_interval=0.2):
+        self.directory = directory
+        self.suffix = suffix
+        self.poll_interval = poll_interval
+        self.snapshot = {}
+
+    def _scan(self):
+        entries = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return entries
+
+    def start(self):
+        """Registra o estado atual do diretório; arquivos já existentes são ignorados"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.snapshot = self._scan()
+
+    def _candidates(self, entries):
+        partials = [name for name in entries if name.endswith(PARTIAL_DOWNLOAD_SUFFIXES)]
+        for name, signature in entries.items():
+            if name.endswith(PARTIAL_DOWNLOAD_SUFFIXES):
+                continue
+            if self.suffix and not name.lower().endswith(self.suffix):
+                continue
+            if self.snapshot.get(name) == signature:
+                continue
+            # Ainda existe um parcial com o mesmo nome: o navegador não terminou de escrever
+            if any(partial.startswith(name) for partial in partials):
+                continue
+            yield name, signature
+
+    def wait_for_file(self, timeout=30):
+        """
+        Aguarda um arquivo novo e completo aparecer no diretório.
+
+        O arquivo é considerado completo quando não há parcial correspondente e o
+        tamanho permanece estável entre duas verificações consecutivas.
+
+        Returns:
+            str: Caminho do arquivo baixado, ou None se o tempo esgotar
+        """
+        deadline = time.monotonic() + timeout
+        seen = {}
+        while time.monotonic() < deadline:
+            for name, signature in self._candidates(self._scan()):
+                if signature[1] > 0 and seen.get(name) == signature:
+                    self.snapshot[name] = signature
+                    return os.path.join(self.directory, name)
+                seen[name] = signature
+            time.sleep(self.poll_interval)
+        return None
+
+
+def move_file_atomic(source_path, destination_folder):
+    """
+    Move um arquivo para `destination_folder` de forma atômica: o destino nunca
+    fica com um arquivo pela metade, mesmo entre sistemas de arquivos diferentes.
+
+    Returns:
+        str: Caminho final do arquivo
+    """
+    os.makedirs(destination_folder, exist_ok=True)
+    file_name = os.path.basename(source_path)
+    destination_path = os.path.join(destination_folder, file_name)
+
+    try:
+        os.replace(source_path, destination_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Sistemas de arquivos diferentes: copia para um temporário no destino e renomeia
+        # Temporário único: outro worker pode estar movendo um arquivo de mesmo nome para a mesma pasta
+        fd, temp_path = tempfile.mkstemp(dir=destination_folder, prefix=f".{file_name}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copy2(source_path, temp_path)
+            os.replace(temp_path, destination_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        os.remove(source_path)
+
+    return destination_path
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash SHA-256 do conteúdo de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    for file in files:
-        if file.lower().endswith(".csv"):
-            os.makedirs(destination_folder, exist_ok=True)
-            source_path = os.path.join(source_folder, file)
-            destination_path = os.path.join(destination_folder, file)
-            shutil.move(source_path, destination_path)
-            print(f"File {file} moved to {destination_folder}")
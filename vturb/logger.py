@@ -1,7 +1,13 @@
 import os
-import time
+import json
+import queue
+import atexit
 import datetime
 import glob
+import threading
+from contextlib import contextmanager
+
+from tracing import start_span, finish_span
 
 # Criar a pasta de logs se não existir
 if not os.path.exists("logs"):
@@ -10,19 +16,22 @@ if not os.path.exists("logs"):
 # Configure logging to file with timestamp
 current_time = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 log_filename = f"logs/{current_time}.txt"
+# Mesmos eventos em JSON (uma linha por evento), para ferramentas de análise
+json_log_filename = f"logs/{current_time}.jsonl"
 
 # Função para limitar o número de arquivos de log
 def limit_log_files(max_files=10):
-    log_files = glob.glob("logs/*.txt")
-    if len(log_files) > max_files:
-        # Ordena os arquivos por data de modificação (mais antigos primeiro)
-        log_files.sort(key=os.path.getmtime)
-        # Remove os arquivos mais antigos, deixando apenas os 'max_files' mais recentes
-        for file_to_remove in log_files[:-max_files]:
-            try:
-                os.remove(file_to_remove)
-            except Exception as e:
-                print(f"Erro ao remover arquivo de log antigo {file_to_remove}: {e}")
+    for pattern in ("logs/*.txt", "logs/*.jsonl"):
+        log_files = glob.glob(pattern)
+        if len(log_files) > max_files:
+            # Ordena os arquivos por data de modificação (mais antigos primeiro)
+            log_files.sort(key=os.path.getmtime)
+            # Remove os arquivos mais antigos, deixando apenas os 'max_files' mais recentes
+            for file_to_remove in log_files[:-max_files]:
+                try:
+                    os.remove(file_to_remove)
+                except Exception as e:
+                    print(f"Erro ao remover arquivo de log antigo {file_to_remove}: {e}")
 
 # Limitar o número de arquivos de log para 10
 limit_log_files(10)
@@ -48,30 +57,146 @@ class LogType:
     STEP = "ETAPA"
     DEBUG = "DEBUG"
 
-# Variáveis para controle de tempo
+# Níveis de log: mensagens abaixo do nível configurado não são exibidas nem gravadas
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+_type_levels = {
+    LogType.DEBUG: 10,
+    LogType.INFO: 20,
+    LogType.STEP: 20,
+    LogType.SUCCESS: 20,
+    LogType.WARNING: 30,
+    LogType.ERROR: 40,
+}
+_min_level = LOG_LEVELS.get(os.getenv("VTURB_LOG_LEVEL", "DEBUG").upper(), 10)
+
+def _level_name(log_type):
+    level = _type_levels.get(log_type, 20)
+    return next(name for name, value in LOG_LEVELS.items() if value == level)
+
+def set_log_level(level):
+    """Define o nível mínimo (DEBUG, INFO, WARNING ou ERROR); INFO omite a listagem linha a linha"""
+    global _min_level
+    if level.upper() not in LOG_LEVELS:
+        raise ValueError(f"Nível de log inválido: {level} (use {', '.join(LOG_LEVELS)})")
+    _min_level = LOG_LEVELS[level.upper()]
+
+# Variáveis para controle de tempo (chaveadas por thread, para que workers em paralelo não se sobrescrevam)
 start_times = {}
 
-# Função para iniciar timer de uma operação
+# Campos de contexto (ex.: vídeo em processamento) incluídos nos eventos JSON da thread
+_context = threading.local()
+
+@contextmanager
+def log_context(**fields):
+    """Anexa os campos informados a todos os eventos JSON gerados dentro do bloco"""
+    previous = getattr(_context, "fields", {})
+    _context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+class _LogWriter(threading.Thread):
+    """
+    Grava os logs em segundo plano: `log()` apenas enfileira as linhas, e esta
+    thread as escreve em lotes, mantendo os arquivos abertos.
+    """
+    def __init__(self, text_path, json_path):
+        super().__init__(name="log-writer", daemon=True)
+        self.text_path = text_path
+        self.json_path = json_path
+        self.queue = queue.Queue()
+
+    def run(self):
+        with open(self.text_path, "a", encoding="utf-8") as text_file, open(self.json_path, "a", encoding="utf-8") as json_file:
+            while True:
+                batch = [self.queue.get()]
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = False
+                for item in batch:
+                    if item is None:
+                        stop = True
+                        continue
+                    text_lines, record = item
+                    for line in text_lines:
+                        text_file.write(line + "\n")
+                    if record is not None:
+                        json_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                text_file.flush()
+                json_file.flush()
+                for _ in batch:
+                    self.queue.task_done()
+                if stop:
+                    return
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def _enqueue(text_lines, record=None):
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _LogWriter(log_filename, json_log_filename)
+                _writer.start()
+    _writer.queue.put((text_lines, record))
+
+def flush_logs():
+    """Aguarda a gravação de tudo o que já foi enfileirado"""
+    if _writer is not None:
+        _writer.queue.join()
+
+@atexit.register
+def close_logs():
+    """Grava as linhas pendentes e encerra a thread de gravação"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None and writer.is_alive():
+        writer.queue.put(None)
+        writer.join(timeout=10)
+
+def _timer_key(operation_name):
+    return (threading.get_ident(), operation_name)
+
+# Função para iniciar timer de uma operação (registrado como span da etapa, filho do span atual)
 def start_timer(operation_name):
-    start_times[operation_name] = time.time()
+    start_times[_timer_key(operation_name)] = start_span(operation_name)
 
 # Função para encerrar timer e retornar tempo decorrido
 def end_timer(operation_name):
-    if operation_name in start_times:
-        elapsed = time.time() - start_times[operation_name]
-        del start_times[operation_name]
+    key = _timer_key(operation_name)
+    if key in start_times:
+        elapsed = finish_span(start_times.pop(key))
         return elapsed
     return 0
 
+# Identifica o worker que gerou a linha de log (vazio na thread principal)
+def _worker_tag():
+    thread = threading.current_thread()
+    if thread is threading.main_thread():
+        return ""
+    return f"[{thread.name}] "
+
 # Create a custom logging function
-def log(message, log_type=LogType.INFO, indent_level=0, show_time=False, operation_name=None, add_timestamp=True, write_to_file=True):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def log(message, log_type=LogType.INFO, indent_level=0, show_time=False, operation_name=None, add_timestamp=True, write_to_file=True, **fields):
+    now = datetime.datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
     
     # Adiciona informação de tempo decorrido se solicitado
     time_info = ""
-    if show_time and operation_name and operation_name in start_times:
+    elapsed = None
+    if show_time and operation_name and _timer_key(operation_name) in start_times:
         elapsed = end_timer(operation_name)
         time_info = f" [{elapsed:.2f}s]"
+
+    if _type_levels.get(log_type, 20) < _min_level:
+        return
     
     # Formatação de indentação
     indent = "  " * indent_level
@@ -101,15 +226,29 @@ def log(message, log_type=LogType.INFO, indent_level=0, show_time=False, operati
     
     # Formatar a mensagem completa com alinhamento adequado
     timestamp_part = f"[{timestamp}] " if add_timestamp else ""
-    log_message = f"{timestamp_part}{indent}{prefix:<{prefix_width}} {message}{time_info}"
+    log_message = f"{timestamp_part}{_worker_tag()}{indent}{prefix:<{prefix_width}} {message}{time_info}"
     
     # Mostrar no terminal com cores
     print(f"{terminal_color}{log_message}{TermColors.ENDC}")
     
-    # Salvar no arquivo (sem cores) apenas se write_to_file for True
+    # Salvar no arquivo (sem cores) apenas se write_to_file for True; a gravação é feita em segundo plano
     if write_to_file:
-        with open(log_filename, "a") as log_file:
-            log_file.write(log_message + "\n")
+        record = {
+            "time": now.isoformat(timespec="milliseconds"),
+            "level": _level_name(log_type),
+            "type": log_type,
+            "message": message,
+            **getattr(_context, "fields", {}),
+            **fields,
+        }
+        thread = threading.current_thread()
+        if thread is not threading.main_thread():
+            record["worker"] = thread.name
+        if operation_name:
+            record["step"] = operation_name
+        if elapsed is not None:
+            record["duration"] = round(elapsed, 3)
+        _enqueue([log_message], record)
 
 # Função para criar cabeçalho de seção
 def log_section(title, level=1):
@@ -123,10 +262,10 @@ def log_section(title, level=1):
         log(separator, LogType.INFO, add_timestamp=False, write_to_file=False)
         
         # Escrever no arquivo com timestamp apenas uma vez
-        with open(log_filename, "a") as log_file:
-            log_file.write(f"[{timestamp}] {separator}\n")
-            log_file.write(f"[{timestamp}]  {title.upper()} \n")
-            log_file.write(f"[{timestamp}] {separator}\n")
+        _enqueue(
+            [f"[{timestamp}] {separator}", f"[{timestamp}]  {title.upper()} ", f"[{timestamp}] {separator}"],
+            {"time": datetime.datetime.now().isoformat(timespec="milliseconds"), "level": "INFO", "type": "SECAO", "message": title},
+        )
     elif level == 2:
         separator = "-" * 70
         # Exibir no terminal, mas não escrever no arquivo
@@ -135,10 +274,10 @@ def log_section(title, level=1):
         log(separator, LogType.INFO, add_timestamp=False, write_to_file=False)
         
         # Escrever no arquivo com timestamp apenas uma vez
-        with open(log_filename, "a") as log_file:
-            log_file.write(f"[{timestamp}] {separator}\n")
-            log_file.write(f"[{timestamp}]  {title} \n")
-            log_file.write(f"[{timestamp}] {separator}\n")
+        _enqueue(
+            [f"[{timestamp}] {separator}", f"[{timestamp}]  {title} ", f"[{timestamp}] {separator}"],
+            {"time": datetime.datetime.now().isoformat(timespec="milliseconds"), "level": "INFO", "type": "SECAO", "message": title},
+        )
     else:
         # Para outros níveis, usar o método simples
         log_message = "\n" + f"--- {title} ---"
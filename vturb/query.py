@@ -0,0 +1,199 @@
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Dependência opcional: sem ela o endpoint de consultas fica indisponível
+    pa = None
+
+# Esquema unificado do conjunto de dados, gravado pelo extrator (dataset.py) na raiz do
+# conjunto de dados: todas as colunas já vistas, com o tipo fixado na primeira vez em que
+# apareceram. Deve ser passado aos leitores: os arquivos de cada partição só contêm as
+# próprias colunas.
+COMMON_METADATA_FILENAME = "_common_metadata"
+
+AGGREGATIONS = ("sum", "mean", "min", "max", "count")
+DEFAULT_ROW_LIMIT = 1000
+
+
+class QueryError(ValueError):
+    """Consulta inválida para o esquema do conjunto de dados"""
+
+
+class QueryEngine:
+    """
+    Consultas vetorizadas (pyarrow) sobre o conjunto de dados Parquet gerado
+    pelo extrator.
+
+    O conjunto de dados e os resultados ficam em cache até que o extrator grave
+    novos dados (o mtime da raiz do conjunto de dados funciona como versão).
+    """
+    def __init__(self, dataset_dir, cache_size=256):
+        self.dataset_dir = dataset_dir
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.version = None
+        self.dataset = None
+        self.lock = threading.Lock()
+
+    def available(self):
+        return pa is not None
+
+    def _current_version(self):
+        try:
+            return os.stat(self.dataset_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        """Conjunto de dados da versão atual; descarta os resultados em cache se mudou"""
+        version = self._current_version()
+        with self.lock:
+            if version != self.version:
+                self.cache.clear()
+                self.dataset = None
+                schema_path = os.path.join(self.dataset_dir, COMMON_METADATA_FILENAME)
+                if version is not None and os.path.exists(schema_path):
+                    self.dataset = ds.dataset(
+                        self.dataset_dir, schema=pq.read_schema(schema_path),
+                        format="parquet", partitioning="hive",
+                    )
+                self.version = version
+            return self.dataset, version
+
+    def _value_set(self, schema, column, values):
+        """Valores do filtro convertidos para o tipo da coluna (o filtro do pyarrow exige o mesmo tipo)"""
+        column_type = schema.field(column).type
+        try:
+            return pa.array(list(values), type=pa.string()).cast(column_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise QueryError(f"Valores inválidos para a coluna '{column}' ({column_type}): {', '.join(values)}")
+
+    def _check_columns(self, schema, columns):
+        unknown = [column for column in columns if schema.get_field_index(column) == -1]
+        if unknown:
+            raise QueryError(f"Colunas inexistentes: {', '.join(unknown)}")
+
+    @staticmethod
+    def _extraction_keys(table):
+        """Chave (vídeo, horário da extração) de cada linha"""
+        return pc.binary_join_element_wise(table["video"], pc.cast(table["extracted_at"], pa.string()), "\x00")
+
+    def _latest_extractions(self, dataset, base_filter):
+        """
+        Chaves (vídeo, horário) da extração mais recente de cada vídeo dentro do
+        filtro. O mesmo conteúdo pode estar em mais de uma partição (extrações
+        sem alteração em dias diferentes), então filtrar pelo hash do CSV
+        contaria todas as cópias.
+        """
+        sources = dataset.to_table(columns=["video", "extracted_at"], filter=base_filter)
+        latest = sources.group_by("video").aggregate([("extracted_at", "max")])
+        latest = latest.rename_columns({"extracted_at_max": "extracted_at"})
+        return self._extraction_keys(latest)
+
+    def _read(self, dataset, columns, row_filter, latest_keys):
+        """Lê as colunas com o filtro, mantendo (se `latest_keys`) apenas as linhas das extrações mais recentes"""
+        if latest_keys is None:
+            return dataset.to_table(columns=columns, filter=row_filter)
+        table = dataset.to_table(columns=list(dict.fromkeys(columns + ["video", "extracted_at"])), filter=row_filter)
+        table = table.filter(pc.is_in(self._extraction_keys(table), value_set=latest_keys))
+        return table.select(columns)
+
+    def run(self, videos=None, utm=None, start=None, end=None, columns=None,
+            group_by=None, metrics=None, agg="sum", top=None, latest=True, limit=DEFAULT_ROW_LIMIT):
+        """
+        Executa uma consulta.
+
+        Args:
+            videos: Nomes dos vídeos (todos se ausente)
+            utm: Valores de utm_content
+            start, end: Intervalo de datas de extração (datetime.date, inclusivo)
+            columns: Colunas retornadas quando não há agregação
+            group_by: Coluna de agrupamento (ex.: "utm_content")
+            metrics: Colunas agregadas com `agg`
+            top: Mantém apenas os N grupos com maior valor da primeira métrica
+            latest: Usa apenas a extração mais recente de cada vídeo (os CSVs são
+                acumulados, então somar extrações diferentes contaria em dobro)
+            limit: Máximo de linhas retornadas sem agregação
+
+        Returns:
+            dict: "columns", "rows" (lista de registros) e "count"
+
+        Raises:
+            QueryError: Se alguma coluna ou agregação for inválida
+        """
+        if agg not in AGGREGATIONS:
+            raise QueryError(f"Agregação inválida: {agg} (use {', '.join(AGGREGATIONS)})")
+
+        dataset, version = self._load()
+        key = (
+            tuple(videos or ()), tuple(utm or ()), start, end, tuple(columns or ()),
+            group_by, tuple(metrics or ()), agg, top, latest, limit,
+        )
+        with self.lock:
+            if key in self.cache and self.version == version:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        result = self._execute(dataset, videos, utm, start, end, columns, group_by, metrics, agg, top, latest, limit)
+
+        with self.lock:
+            if self.version == version:
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return result
+
+    def _execute(self, dataset, videos, utm, start, end, columns, group_by, metrics, agg, top, latest, limit):
+        if dataset is None:
+            return {"columns": [], "rows": [], "count": 0}
+        schema = dataset.schema
+        metrics = list(metrics or [])
+        if group_by and not metrics:
+            metrics = [
+                column for column in schema.names
+                if column != group_by and pa.types.is_floating(schema.field(column).type)
+            ]
+        needed = list(columns or []) + ([group_by] if group_by else []) + metrics + (["utm_content"] if utm else [])
+        self._check_columns(schema, needed)
+        if agg in ("sum", "mean"):
+            not_numeric = [column for column in metrics if not pa.types.is_floating(schema.field(column).type)]
+            if not_numeric:
+                raise QueryError(f"Colunas não numéricas para '{agg}': {', '.join(not_numeric)}")
+
+        # Filtros de partição: o pyarrow ignora os diretórios que não correspondem
+        base_filter = ds.scalar(True)
+        if videos:
+            base_filter &= ds.field("video").isin(list(videos))
+        if start:
+            base_filter &= ds.field("extracted_date") >= start.isoformat()
+        if end:
+            base_filter &= ds.field("extracted_date") <= end.isoformat()
+
+        row_filter = base_filter
+        latest_keys = self._latest_extractions(dataset, base_filter) if latest else None
+        if utm:
+            row_filter &= ds.field("utm_content").isin(self._value_set(schema, "utm_content", utm))
+
+        if group_by or metrics:
+            # Leitura apenas das colunas usadas na agregação
+            table = self._read(dataset, list(dict.fromkeys(([group_by] if group_by else []) + metrics)), row_filter, latest_keys)
+            aggregations = [(metric, agg) for metric in metrics]
+            if group_by:
+                table = table.group_by(group_by).aggregate(aggregations)
+            else:
+                table = table.group_by([]).aggregate(aggregations)
+            if top and metrics:
+                table = table.sort_by([(f"{metrics[0]}_{agg}", "descending")]).slice(0, top)
+        else:
+            projection = list(columns or schema.names)
+            table = self._read(dataset, projection, row_filter, latest_keys)
+            count = table.num_rows
+            table = table.slice(0, limit)
+            return {"columns": table.column_names, "rows": table.to_pylist(), "count": count}
+
+        return {"columns": table.column_names, "rows": table.to_pylist(), "count": table.num_rows}
@@ -0,0 +1,176 @@
+import os
+import csv
+import json
+import uuid
+import errno
+import shutil
+import datetime
+import threading
+from urllib.parse import quote
+
+try:
+    import fcntl  # Trava entre processos (vários extratores gravando o histórico)
+except ImportError:
+    fcntl = None
+
+# Histórico de extrações, em um subdiretório oculto de `analytics_dir` (ignorado pelo catálogo):
+#   objects/<hash[:2]>/<hash>.csv  conteúdo de cada CSV, gravado uma única vez por hash
+#   history/<vídeo>.json           versões de cada vídeo (execução, hash, horário)
+SNAPSHOTS_DIRNAME = ".snapshots"
+
+_history_lock = threading.Lock()
+
+
+def snapshots_dir(analytics_dir):
+    return os.path.join(analytics_dir, SNAPSHOTS_DIRNAME)
+
+
+def object_path(analytics_dir, sha256):
+    return os.path.join(snapshots_dir(analytics_dir), "objects", sha256[:2], f"{sha256}.csv")
+
+
+def history_path(analytics_dir, video_name):
+    return os.path.join(snapshots_dir(analytics_dir), "history", f"{quote(video_name, safe='')}.json")
+
+
+def load_history(analytics_dir, video_name):
+    """Versões registradas de um vídeo, da mais antiga para a mais recente"""
+    try:
+        with open(history_path(analytics_dir, video_name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def get_snapshot(analytics_dir, video_name, version):
+    """Versão `version` do vídeo, ou None se não existe"""
+    for entry in load_history(analytics_dir, video_name):
+        if entry["version"] == version:
+            return entry
+    return None
+
+
+def _store_object(csv_path, destination):
+    """
+    Guarda o conteúdo do CSV no armazenamento por hash. Usa um link físico
+    quando possível: o arquivo em `analytics_dir` é sempre substituído com
+    os.replace (novo inode), então o link preserva o conteúdo antigo sem ocupar
+    espaço extra enquanto os dois forem iguais.
+    """
+    if os.path.exists(destination):
+        return
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    # Nome temporário único: workers diferentes podem guardar o mesmo hash ao mesmo tempo
+    temp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+    try:
+        try:
+            os.link(csv_path, temp_path)
+        except OSError as e:
+            # Sem suporte a links físicos (outro sistema de arquivos ou sem permissão): copia
+            if e.errno not in (errno.EXDEV, errno.EPERM):
+                raise
+            shutil.copy2(csv_path, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def record_snapshot(analytics_dir, video_name, csv_path, sha256, run_id=None):
+    """
+    Registra o CSV extraído como uma nova versão do vídeo. Conteúdos repetidos
+    são gravados uma única vez; a mesma execução registrando o mesmo conteúdo
+    novamente (retomada) não cria uma versão nova.
+
+    Returns:
+        dict: Versão registrada
+    """
+    _store_object(csv_path, object_path(analytics_dir, sha256))
+
+    path = history_path(analytics_dir, video_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _history_lock, open(f"{path}.lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        history = load_history(analytics_dir, video_name)
+        if history and history[-1]["sha256"] == sha256 and history[-1]["run_id"] == run_id:
+            return history[-1]
+
+        entry = {
+            "version": history[-1]["version"] + 1 if history else 1,
+            "run_id": run_id,
+            "sha256": sha256,
+            "file": os.path.basename(csv_path),
+            "size": os.stat(csv_path).st_size,
+            "extracted_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        history.append(entry)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    return entry
+
+
+def _parse_number(value):
+    try:
+        return float(value.strip().rstrip("%"))
+    except ValueError:
+        return None
+
+
+def _read_rows(path, key):
+    """Linhas do CSV indexadas pela coluna-chave"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        key = key or (reader.fieldnames[0] if reader.fieldnames else None)
+        if key and key not in (reader.fieldnames or []):
+            raise KeyError(key)
+        return key, {row[key]: row for row in reader}
+
+
+def compute_delta(from_path, to_path, key=None):
+    """
+    Diferença entre duas versões de um CSV, linha a linha pela coluna-chave
+    (por padrão a primeira, ex.: utm_content). Cada arquivo é lido uma única vez.
+
+    Returns:
+        dict: Linhas adicionadas e removidas, colunas alteradas (com a diferença
+        numérica quando os dois valores são números) e a quantidade de linhas
+        inalteradas
+
+    Raises:
+        KeyError: Se a coluna-chave não existir nos arquivos
+    """
+    key, old_rows = _read_rows(from_path, key)
+    _, new_rows = _read_rows(to_path, key)
+
+    changed, unchanged = [], 0
+    for row_key, new_row in new_rows.items():
+        old_row = old_rows.get(row_key)
+        if old_row is None:
+            continue
+        changes = {}
+        for column, new_value in new_row.items():
+            old_value = old_row.get(column)
+            if column == key or old_value == new_value:
+                continue
+            old_number, new_number = _parse_number(old_value or ""), _parse_number(new_value or "")
+            changes[column] = {
+                "from": old_value,
+                "to": new_value,
+                "delta": new_number - old_number if old_number is not None and new_number is not None else None,
+            }
+        if changes:
+            changed.append({"key": row_key, "changes": changes})
+        else:
+            unchanged += 1
+
+    return {
+        "key": key,
+        "added": [row for row_key, row in new_rows.items() if row_key not in old_rows],
+        "removed": [row for row_key, row in old_rows.items() if row_key not in new_rows],
+        "changed": changed,
+        "unchanged": unchanged,
+    }
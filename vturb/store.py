@@ -0,0 +1,161 @@
+import os
+import json
+import sqlite3
+import datetime
+from contextlib import contextmanager
+
+# Banco SQLite com as execuções, os checkpoints e o estado de cada vídeo. Em modo
+# WAL, leitores (ex.: a API consultando o status das execuções) não bloqueiam o
+# extrator, e vários processos podem gravar com segurança.
+DEFAULT_DB_PATH = "./vturb_state.db"
+
+# Bancos TinyDB usados antes do SQLite, importados na primeira execução
+LEGACY_EXECUTION_DB_PATH = "./execution_db.json"
+LEGACY_VIDEO_STATE_DB_PATH = "./video_state_db.json"
+
+# Tempo que uma gravação aguarda outro processo liberar o banco antes de falhar
+BUSY_TIMEOUT_MS = 30_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS executions_date_success_time ON executions (date, success, time);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    owner TEXT,
+    heartbeat_at TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+CREATE INDEX IF NOT EXISTS runs_date ON runs (date);
+
+CREATE TABLE IF NOT EXISTS run_items (
+    run_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS videos (
+    name TEXT PRIMARY KEY,
+    views TEXT,
+    downloads TEXT,
+    csv_path TEXT,
+    csv_hash TEXT,
+    extracted_at TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    migrated_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+# Colunas acrescentadas a `runs` depois da criação do banco (processo dono da execução e
+# último sinal de vida), aplicadas aos bancos já existentes
+RUNS_ADDED_COLUMNS = (("owner", "TEXT"), ("heartbeat_at", "TEXT"))
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """
+    Abre o banco (criando as tabelas se necessário) em modo WAL.
+
+    A conexão fica em modo autocommit: instruções isoladas são gravadas
+    imediatamente e as que precisam ser atômicas usam `transaction`. Pode ser
+    compartilhada entre threads, desde que o chamador serialize o acesso.
+    """
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    connection.executescript(SCHEMA)
+    _add_missing_columns(connection, "runs", RUNS_ADDED_COLUMNS)
+    return connection
+
+
+def _add_missing_columns(connection, table, columns):
+    """Acrescenta colunas criadas depois da primeira versão do banco"""
+    existing = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+    for column, definition in columns:
+        if column in existing:
+            continue
+        try:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        except sqlite3.OperationalError as e:
+            # Outro processo acrescentou a coluna ao mesmo tempo
+            if "duplicate column" not in str(e):
+                raise
+
+
+@contextmanager
+def transaction(connection):
+    """Transação que reserva a escrita desde o início (leituras seguidas de gravação sem corrida entre processos)"""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def load_tinydb_tables(json_path):
+    """
+    Tabelas de um banco TinyDB antigo: {tabela: [(id, documento), ...]}, em
+    ordem de id. Retorna None se o arquivo não existe ou já foi migrado.
+    """
+    if not os.path.exists(json_path):
+        return None
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except ValueError:
+        return {}
+    return {
+        table: sorted(((int(doc_id), document) for doc_id, document in documents.items()), key=lambda item: item[0])
+        for table, documents in (data or {}).items()
+    }
+
+
+def migrate_once(connection, json_path, apply):
+    """
+    Importa uma única vez um banco TinyDB antigo. `apply(connection, tabelas)`
+    grava os registros dentro da mesma transação que marca a migração como
+    feita; depois o arquivo é renomeado para `<arquivo>.migrated`.
+
+    Returns:
+        bool: True se a migração foi feita agora
+    """
+    name = os.path.basename(json_path)
+    tables = load_tinydb_tables(json_path)
+    if tables is None:
+        return False
+    with transaction(connection):
+        if connection.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+            return False
+        apply(connection, tables)
+        connection.execute(
+            "INSERT INTO migrations (name, migrated_at) VALUES (?, ?)",
+            (name, datetime.datetime.now().isoformat()),
+        )
+    try:
+        os.replace(json_path, f"{json_path}.migrated")
+    except OSError:
+        pass  # A marcação no banco já impede uma segunda importação
+    return True
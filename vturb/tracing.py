@@ -0,0 +1,196 @@
+import os
+import glob
+import json
+import math
+import time
+import datetime
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Diretório dos relatórios de desempenho (um JSON por execução)
+REPORTS_DIR = "./perf_reports"
+
+# Uma etapa regrediu se o p95 cresceu mais que 25% e mais que meio segundo em relação à execução anterior
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_SECONDS = 0.5
+
+# Span atual do contexto (thread ou tarefa assíncrona); threads novas devem ser
+# iniciadas com contextvars.copy_context().run para herdar o span do criador
+_current_span = contextvars.ContextVar("vturb_current_span", default=None)
+
+
+class Span:
+    """Intervalo de tempo de uma operação, com o span que a contém"""
+    def __init__(self, span_id, name, parent, attrs):
+        self.id = span_id
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.path = f"{parent.path}/{name}" if parent else name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = False
+
+
+def percentile(sorted_values, fraction):
+    """Percentil pelo método do posto mais próximo (valores já ordenados)"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Tracer:
+    """
+    Registra spans hierárquicos (execução -> pasta -> vídeo -> etapa) de várias
+    threads e agrega as durações por caminho ("run/video/download").
+    """
+    def __init__(self):
+        self.spans = []
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def start_span(self, name, **attrs):
+        """Abre um span filho do span atual, sem torná-lo o atual (usado pelas etapas)"""
+        with self.lock:
+            span_id = next(self.ids)
+        return Span(span_id, name, _current_span.get(), attrs)
+
+    def finish_span(self, span, error=False):
+        """
+        Fecha o span e o registra.
+
+        Returns:
+            float: Duração em segundos
+        """
+        span.duration = time.perf_counter() - span.start
+        span.error = error
+        with self.lock:
+            self.spans.append(span)
+        return span.duration
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Span que contém os spans abertos dentro do bloco (inclusive em threads criadas com o contexto copiado)"""
+        span = self.start_span(name, **attrs)
+        token = _current_span.set(span)
+        error = False
+        try:
+            yield span
+        except BaseException:
+            error = True
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish_span(span, error=error)
+
+    def finished(self):
+        """Cópia dos spans já encerrados"""
+        with self.lock:
+            return list(self.spans)
+
+    def summary(self):
+        """Estatísticas por caminho: quantidade, total, média, p50, p95, máximo e erros"""
+        spans = self.finished()
+        durations, errors = {}, {}
+        for span in spans:
+            durations.setdefault(span.path, []).append(span.duration)
+            errors[span.path] = errors.get(span.path, 0) + int(span.error)
+
+        steps = {}
+        for path, values in sorted(durations.items()):
+            values.sort()
+            steps[path] = {
+                "count": len(values),
+                "total": round(sum(values), 3),
+                "mean": round(sum(values) / len(values), 3),
+                "p50": round(percentile(values, 0.50), 3),
+                "p95": round(percentile(values, 0.95), 3),
+                "max": round(values[-1], 3),
+                "errors": errors[path],
+            }
+        return steps
+
+    def slowest(self, limit=10):
+        """Spans individuais mais lentos, com os atributos (ex.: o vídeo)"""
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span.duration, reverse=True)[:limit]
+        return [
+            {"path": span.path, "duration": round(span.duration, 3), "attrs": span.attrs, "error": span.error}
+            for span in spans
+        ]
+
+    def reset(self):
+        with self.lock:
+            self.spans = []
+
+
+def compare_reports(previous, current):
+    """
+    Compara o p95 de cada etapa com o relatório anterior.
+
+    Returns:
+        dict: Por caminho, p95 anterior/atual, razão e se é uma regressão
+    """
+    comparison = {}
+    for path, stats in current["steps"].items():
+        before = previous.get("steps", {}).get(path)
+        if not before or not before.get("p95"):
+            continue
+        ratio = stats["p95"] / before["p95"]
+        comparison[path] = {
+            "previous_p95": before["p95"],
+            "p95": stats["p95"],
+            "ratio": round(ratio, 2),
+            "regression": ratio > REGRESSION_RATIO and stats["p95"] - before["p95"] > REGRESSION_MIN_SECONDS,
+        }
+    return comparison
+
+
+def latest_report(directory=REPORTS_DIR):
+    reports = sorted(glob.glob(os.path.join(directory, "*.json")))
+    if not reports:
+        return None
+    try:
+        with open(reports[-1], "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_report(run_name, directory=REPORTS_DIR, **metadata):
+    """
+    Grava o relatório de desempenho da execução, comparado com o relatório
+    anterior do mesmo diretório.
+
+    Returns:
+        tuple: (caminho do relatório, relatório)
+    """
+    report = {
+        "run": run_name,
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        **metadata,
+        "steps": tracer.summary(),
+        "slowest": tracer.slowest(),
+    }
+    previous = latest_report(directory)
+    if previous:
+        report["previous_run"] = previous.get("run")
+        report["comparison"] = compare_reports(previous, report)
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{run_name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    return path, report
+
+
+# Rastreador da execução, compartilhado por todos os módulos do bot
+tracer = Tracer()
+span = tracer.span
+finished_spans = tracer.finished
+start_span = tracer.start_span
+finish_span = tracer.finish_span
@@ -0,0 +1,68 @@
+import os
+import datetime
+import threading
+
+from store import DEFAULT_DB_PATH, LEGACY_VIDEO_STATE_DB_PATH, connect, migrate_once
+
+
+def _migrate_tinydb(connection, tables):
+    connection.executemany(
+        "INSERT OR REPLACE INTO videos (name, views, downloads, csv_path, csv_hash, extracted_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (
+                video["name"], _text(video.get("views")), _text(video.get("downloads")),
+                video.get("csv_path"), video.get("csv_hash"), video.get("extracted_at"),
+            )
+            for _, video in tables.get("videos", [])
+        ],
+    )
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+class VideoStateStore:
+    """
+    Guarda o estado da última extração bem-sucedida de cada vídeo: contadores
+    de visualizações/downloads da listagem, hash do CSV e horário da extração.
+
+    Permite pular vídeos cujos contadores não mudaram desde a última execução.
+    Os registros ficam no mesmo banco SQLite das execuções, um por vídeo.
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH, legacy_db_path=LEGACY_VIDEO_STATE_DB_PATH):
+        self.connection = connect(db_path)
+        # A conexão é compartilhada entre os workers
+        self.lock = threading.Lock()
+        if legacy_db_path:
+            with self.lock:
+                migrate_once(self.connection, legacy_db_path, _migrate_tinydb)
+
+    def get(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT * FROM videos WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row else None
+
+    def is_unchanged(self, name, views, downloads):
+        """
+        Verifica se o vídeo já foi extraído com os mesmos contadores e se o CSV
+        extraído ainda está no disco
+        """
+        state = self.get(name)
+        if not state:
+            return False
+        return (
+            state['views'] == _text(views)
+            and state['downloads'] == _text(downloads)
+            and os.path.exists(state.get('csv_path') or "")
+        )
+
+    def record(self, name, views, downloads, csv_path, csv_hash):
+        """
+        Registra uma extração bem-sucedida do vídeo
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO videos (name, views, downloads, csv_path, csv_hash, extracted_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, _text(views), _text(downloads), csv_path, csv_hash, datetime.datetime.now().isoformat()),
+            )